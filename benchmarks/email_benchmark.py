@@ -0,0 +1,115 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Email composition benchmark.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.email_benchmark -n 5000
+"""
+
+
+# standard library imports
+import time
+import argparse
+import tempfile
+
+# third party imports
+# library specific imports
+import src.email
+
+
+def get_argument_parser():
+    """Get argument parser.
+
+    :returns: argument parser
+    :rtype: ArgumentParser
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n", type=int, default=5000, help="number of messages"
+    )
+    parser.add_argument(
+        "--templates", default="templates_sample", help="template directory"
+    )
+    return parser
+
+
+def compose(n, environment):
+    """Compose email bodies.
+
+    :param int n: number of messages
+    :param Environment environment: email template environment
+
+    :returns: messages per second
+    :rtype: float
+    """
+    src.email.set_environment(environment)
+    names = ["submitted", "confirmed", "accepted", "denied", "expired"]
+    start = time.perf_counter()
+    for i in range(n):
+        src.email.compose_body(
+            names[i % len(names)],
+            ticket="ticket{}".format(i),
+            username="username",
+            password="password",
+            reply_to="reply_to@example.org"
+        )
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    """Main routine."""
+    args = get_argument_parser().parse_args()
+    with tempfile.TemporaryDirectory() as bytecode_cache:
+        environments = [
+            (
+                "no template cache",
+                src.email.create_environment(
+                    path=args.templates, cache_size=0
+                )
+            ),
+            (
+                "template cache",
+                src.email.create_environment(path=args.templates)
+            ),
+            (
+                "template cache, no auto reload",
+                src.email.create_environment(
+                    path=args.templates, auto_reload=False
+                )
+            ),
+            (
+                "bytecode cache",
+                src.email.create_environment(
+                    path=args.templates,
+                    cache_size=0,
+                    bytecode_cache=bytecode_cache
+                )
+            )
+        ]
+        for label, environment in environments:
+            rate = compose(args.n, environment)
+            print("{label:32} {rate:10.0f} messages/s".format(
+                label=label, rate=rate
+            ))
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Metadata export benchmark.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.export_benchmark -n 10000
+"""
+
+
+# standard library imports
+import time
+import argparse
+
+# third party imports
+# library specific imports
+import src.export
+
+
+def get_argument_parser():
+    """Get argument parser.
+
+    :returns: argument parser
+    :rtype: ArgumentParser
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n", type=int, default=10000, help="number of tickets"
+    )
+    parser.add_argument(
+        "--keywords", type=int, default=10, help="keywords per ticket"
+    )
+    return parser
+
+
+def get_metadata(i, keywords):
+    """Get synthetic WARC archive metadata.
+
+    :param int i: ticket number
+    :param int keywords: number of keywords
+
+    :returns: WARC archive metadata
+    :rtype: dict
+    """
+    return {
+        "url": "http://example.org/{}.html".format(i),
+        "resourceType": "ELEC",
+        "creator": [
+            {"romanization": "Creator {}".format(j), "script": ""}
+            for j in range(3)
+        ],
+        "publicationDate": "20181113",
+        "subjectHeading": [
+            "subject {}".format(j) for j in range(keywords)
+        ],
+        "personHeading": ["person {}".format(j) for j in range(keywords)],
+        "publisher": {"romanization": "Publisher", "script": ""},
+        "title": {"romanization": "Title {}".format(i), "script": "Title"}
+    }
+
+
+def main():
+    """Main routine."""
+    args = get_argument_parser().parse_args()
+    tickets = [
+        ("ticket{}".format(i), get_metadata(i, args.keywords))
+        for i in range(args.n)
+    ]
+    for name in ["plaintext", "ris", "bibtex", "csl_json"]:
+        start = time.perf_counter()
+        size = 0
+        for id_, metadata in tickets:
+            size += len(src.export.render(name, metadata, id_=id_))
+        elapsed = time.perf_counter() - start
+        print("{name:10} {rate:10.0f} tickets/s {size:12d} characters".format(
+            name=name, rate=args.n / elapsed, size=size
+        ))
+    return
+
+
+if __name__ == "__main__":
+    main()
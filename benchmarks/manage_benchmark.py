@@ -0,0 +1,311 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: End-to-end ticket management load benchmark.
+
+Brings up a local FTP over TLS stand-in, a local SMTP sink and a local
+fixture Web site (see benchmarks.standins and benchmarks.site), uses a
+temporary SQLite database and stubs the Webrecorder API call with a fixed
+latency. N pending tickets are submitted in a first run of manage(), then
+confirmed, accepted and denied in turns in a second run. Throughput and
+per-stage latency percentiles are reported for both runs.
+
+Requires pyftpdlib, pyOpenSSL and the openssl command line tool.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.manage_benchmark -n 300
+"""
+
+
+# standard library imports
+import os
+import json
+import time
+import types
+import argparse
+import tempfile
+import collections
+import configparser
+
+# third party imports
+# library specific imports
+import src.ftp
+import src.email
+import src.ticket_manager
+import benchmarks.site
+import benchmarks.standins
+
+
+STAGES = [
+    "submit", "archive", "confirm_many", "accept_many", "deny_many",
+    "remove_expired", "call_api", "sendmail"
+]
+FLAGS = ["confirmed", "accepted", "denied"]
+
+
+def get_argument_parser():
+    """Get argument parser.
+
+    :returns: argument parser
+    :rtype: ArgumentParser
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n", type=int, default=300, help="number of tickets"
+    )
+    parser.add_argument(
+        "--api-latency", type=float, default=0.01,
+        help="latency of stubbed Webrecorder API call in seconds"
+    )
+    parser.add_argument(
+        "--resources", type=int, default=5,
+        help="number of resources per page"
+    )
+    parser.add_argument(
+        "--templates", default="templates_sample", help="template directory"
+    )
+    return parser
+
+
+def timed(function, timings):
+    """Wrap function to record its latency.
+
+    Generators are consumed within the measurement.
+
+    :param callable function: function
+    :param list timings: latencies in seconds
+
+    :returns: wrapped function
+    :rtype: callable
+    """
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+            if isinstance(result, types.GeneratorType):
+                result = list(result)
+        finally:
+            timings.append(time.perf_counter() - start)
+        return result
+    return wrapper
+
+
+class BenchmarkTicketManager(src.ticket_manager.TicketManager):
+    """Ticket manager with stubbed Webrecorder API call and timed stages.
+
+    :ivar float api_latency: latency of stubbed Webrecorder API call
+    :ivar dict timings: latencies in seconds (stage as key)
+    """
+
+    def __init__(self, *args, api_latency=0.01, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.api_latency = api_latency
+        self.timings = collections.defaultdict(list)
+        for stage in STAGES:
+            setattr(
+                self, stage, timed(getattr(self, stage), self.timings[stage])
+            )
+        return
+
+    def call_api(self):
+        """Stub Webrecorder API call."""
+        time.sleep(self.api_latency)
+        return
+
+
+def get_configs(ftp_standin, smtp_sink, database):
+    """Get FTP, SMTP and SQLite configuration.
+
+    :param FTPStandIn ftp_standin: local FTP over TLS stand-in
+    :param SMTPSink smtp_sink: local SMTP sink
+    :param str database: SQLite database
+
+    :returns: FTP, SMTP and SQLite configuration
+    :rtype: tuple
+    """
+    ftp = configparser.ConfigParser()
+    ftp.read_dict({
+        "FTP": {
+            "host": "127.0.0.1",
+            "port": str(ftp_standin.port),
+            "user": ftp_standin.user,
+            "passwd": ftp_standin.passwd
+        },
+        "cmd": {"RETR": ""}
+    })
+    smtp = configparser.ConfigParser()
+    smtp.read_dict({
+        "SMTP": {
+            "host": "127.0.0.1",
+            "port": str(smtp_sink.server_address[1]),
+            "pool_size": "2"
+        },
+        "header_fields": {
+            "from": "opendachs@example.org",
+            "reply_to": "operator@example.org"
+        }
+    })
+    sqlite = configparser.ConfigParser()
+    sqlite.read_dict({
+        "SQLite": {"database": database, "table": "tickets"},
+        "column_defs": {
+            "ticket": "TEXT PRIMARY KEY",
+            "user": "TEXT",
+            "archive": "TEXT",
+            "metadata": "TEXT",
+            "flag": "TEXT",
+            "timestamp": "TIMESTAMP"
+        }
+    })
+    return ftp, smtp, sqlite
+
+
+def put_tickets(home, datas):
+    """Put ticket files on FTP stand-in.
+
+    :param str home: home directory of FTP user
+    :param list datas: OpenDACHS tickets
+    """
+    for data in datas:
+        filename = os.path.join(home, "{}.json".format(data["ticket"]))
+        with open(filename, mode="w") as fp:
+            json.dump(data, fp)
+    return
+
+
+def get_data(i, flag, url):
+    """Get synthetic OpenDACHS ticket.
+
+    :param int i: ticket number
+    :param str flag: flag
+    :param str url: URL
+
+    :returns: OpenDACHS ticket
+    :rtype: dict
+    """
+    return {
+        "ticket": "ticket{}".format(i),
+        "email": "user{}@example.org".format(i),
+        "flag": flag,
+        "url": url,
+        "resourceType": "ELEC",
+        "title": {"romanization": "Title {}".format(i), "script": ""},
+        "creator": [{"romanization": "Creator", "script": ""}],
+        "publisher": {"romanization": "Publisher", "script": ""},
+        "publicationDate": "20180101",
+        "subjectHeading": ["subject"],
+        "personHeading": []
+    }
+
+
+def percentile(values, q):
+    """Get percentile (nearest rank).
+
+    :param list values: values
+    :param float q: percentile
+
+    :returns: percentile
+    :rtype: float
+    """
+    values = sorted(values)
+    return values[max(0, int(round(q / 100 * len(values))) - 1)]
+
+
+def run(ticket_manager, label, n):
+    """Run ticket management once and report.
+
+    :param BenchmarkTicketManager ticket_manager: ticket manager
+    :param str label: label
+    :param int n: number of tickets
+    """
+    retrieve_files = src.ftp.retrieve_files
+    timings = ticket_manager.timings
+    for values in timings.values():
+        del values[:]
+    src.ftp.retrieve_files = timed(retrieve_files, timings["retrieve_files"])
+    start = time.perf_counter()
+    try:
+        ticket_manager.manage()
+    finally:
+        src.ftp.retrieve_files = retrieve_files
+    seconds = time.perf_counter() - start
+    print("{label}: {n} tickets in {seconds:.2f} s ({rate:.1f} tickets/s)"
+          .format(label=label, n=n, seconds=seconds, rate=n / seconds))
+    print("  {:16} {:>6} {:>9} {:>9} {:>9} {:>9}".format(
+        "stage", "calls", "p50 ms", "p95 ms", "p99 ms", "max ms"
+    ))
+    for stage in ["retrieve_files"] + STAGES:
+        values = timings[stage]
+        if not values:
+            continue
+        print("  {:16} {:6d} {:9.2f} {:9.2f} {:9.2f} {:9.2f}".format(
+            stage, len(values),
+            *(1000 * percentile(values, q) for q in [50, 95, 99, 100])
+        ))
+    return
+
+
+def main():
+    """Main routine."""
+    args = get_argument_parser().parse_args()
+    templates = os.path.abspath(args.templates)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        for directory in ["tmp/warcs", "tmp/json_files", "storage", "ftp"]:
+            os.makedirs(directory)
+        home = os.path.join(tmpdir, "ftp")
+        site = benchmarks.site.FixtureSite()
+        smtp_sink = benchmarks.standins.SMTPSink()
+        ftp_standin = benchmarks.standins.FTPStandIn(home)
+        servers = [site, smtp_sink, ftp_standin]
+        for server in servers:
+            server.start()
+        try:
+            src.email.set_environment(
+                src.email.create_environment(path=templates)
+            )
+            ftp, smtp, sqlite = get_configs(
+                ftp_standin, smtp_sink, os.path.join(tmpdir, "tickets.db")
+            )
+            ticket_manager = BenchmarkTicketManager(
+                ftp, smtp, sqlite, api_latency=args.api_latency
+            )
+            put_tickets(home, [
+                get_data(
+                    i, "pending",
+                    site.get_url(i, resources=args.resources)
+                ) for i in range(args.n)
+            ])
+            run(ticket_manager, "submit", args.n)
+            put_tickets(home, [
+                get_data(i, FLAGS[i % len(FLAGS)], "")
+                for i in range(args.n)
+            ])
+            run(ticket_manager, "confirm/accept/deny", args.n)
+            print("{} emails sent".format(smtp_sink.messages))
+        finally:
+            for server in servers:
+                server.stop()
+            os.chdir(cwd)
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Web scraper capture benchmark.
+
+Captures synthetic pages served by a local fixture Web site (see
+benchmarks.site) end to end and reports pages/s, requests/s, bytes/s,
+peak RSS and WARC archive size per scenario. Peak RSS is the peak of the
+whole process, run one scenario at a time (--scenario) to compare it.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.scraper_benchmark -n 50
+"""
+
+
+# standard library imports
+import os
+import time
+import argparse
+import datetime
+import resource
+import tempfile
+import collections
+
+# third party imports
+# library specific imports
+import src.ticket
+import src.scraper
+import benchmarks.site
+
+
+Scenario = collections.namedtuple(
+    "Scenario", ["size", "resources", "shared", "slow"]
+)
+SCENARIOS = collections.OrderedDict([
+    ("small", Scenario(4*1024, 0, 0, 0)),
+    ("large", Scenario(1024*1024, 0, 0, 0)),
+    ("resources", Scenario(16*1024, 20, 0, 0)),
+    ("shared", Scenario(16*1024, 20, 15, 0)),
+    ("slow", Scenario(16*1024, 20, 0, 5))
+])
+
+
+def get_argument_parser():
+    """Get argument parser.
+
+    :returns: argument parser
+    :rtype: ArgumentParser
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n", type=int, default=50, help="number of pages per scenario"
+    )
+    parser.add_argument(
+        "--scenario", choices=list(SCENARIOS), action="append",
+        help="scenario (default all)"
+    )
+    parser.add_argument(
+        "--resource-size", type=int, default=16*1024,
+        help="resource size in bytes"
+    )
+    parser.add_argument(
+        "--delay", type=float, default=0.05,
+        help="delay of slow resources in seconds"
+    )
+    return parser
+
+
+def get_ticket(i, url, archive):
+    """Get synthetic OpenDACHS ticket.
+
+    :param int i: ticket number
+    :param str url: URL
+    :param str archive: WARC archive filename
+
+    :returns: OpenDACHS ticket
+    :rtype: Ticket
+    """
+    return src.ticket.Ticket(
+        "ticket{}".format(i),
+        src.ticket.User("user", "archivist", "password", "foo@example.org"),
+        archive,
+        {"url": url},
+        "pending",
+        datetime.datetime.now()
+    )
+
+
+def capture(site, scenario, n, tmpdir):
+    """Capture pages.
+
+    :param FixtureSite site: local fixture Web site
+    :param Scenario scenario: scenario
+    :param int n: number of pages
+    :param str tmpdir: temporary directory
+
+    :returns: seconds, requests, bytes and WARC archive size in bytes
+    :rtype: tuple
+    """
+    site.requests = site.bytes = 0
+    warc_size = 0
+    start = time.perf_counter()
+    for i in range(n):
+        archive = os.path.join(tmpdir, "ticket{}.warc".format(i))
+        ticket = get_ticket(i, site.get_url(i, *scenario), archive)
+        scraper = src.scraper.Scraper(ticket)
+        scraper.archive()
+        warc_size += os.path.getsize(archive)
+        os.unlink(archive)
+    return (
+        time.perf_counter() - start, site.requests, site.bytes, warc_size
+    )
+
+
+def main():
+    """Main routine."""
+    args = get_argument_parser().parse_args()
+    site = benchmarks.site.FixtureSite(
+        resource_size=args.resource_size, delay=args.delay
+    )
+    site.start()
+    try:
+        for label in args.scenario or list(SCENARIOS):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                seconds, requests, size, warc_size = capture(
+                    site, SCENARIOS[label], args.n, tmpdir
+                )
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            print(
+                "{label:10} {pages:8.1f} pages/s {requests:8.1f} requests/s "
+                "{bytes:8.2f} MiB/s {rss:8.1f} MiB peak RSS "
+                "{warc:8.2f} MiB WARC".format(
+                    label=label,
+                    pages=args.n / seconds,
+                    requests=requests / seconds,
+                    bytes=size / seconds / 2**20,
+                    rss=rss / 2**10,
+                    warc=warc_size / 2**20
+                )
+            )
+    finally:
+        site.stop()
+    return
+
+
+if __name__ == "__main__":
+    main()
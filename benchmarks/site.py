@@ -0,0 +1,202 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Local fixture Web site for benchmarks.
+
+Pages are generated on the fly from their path::
+
+    /page/<page>.html?size=<bytes>&resources=<n>&shared=<n>&slow=<n>
+
+Each page has <n> <img> tags: <shared> of them refer to resources shared
+by all pages, <slow> of them to resources delayed by the site's delay, the
+remaining ones to resources unique to the page. Resources are <resource
+size> bytes long.
+"""
+
+
+# standard library imports
+import os
+import time
+import threading
+import http.server
+import socketserver
+import urllib.parse
+
+# third party imports
+# library specific imports
+
+
+class HTTPRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Fixture Web site HTTP request handler."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _send(self, content_type, body):
+        """Send response.
+
+        :param str content_type: Content-Type
+        :param bytes body: body
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count(len(body))
+        return
+
+    def do_GET(self):
+        """Serve GET request."""
+        parse_result = urllib.parse.urlsplit(self.path)
+        if parse_result.path.startswith("/page/"):
+            query = urllib.parse.parse_qs(parse_result.query)
+            self._send(
+                "text/html; charset=utf-8",
+                self.server.get_page(
+                    parse_result.path,
+                    *(
+                        int(query.get(key, ["0"])[0])
+                        for key in ["size", "resources", "shared", "slow"]
+                    )
+                )
+            )
+        else:
+            if parse_result.path.startswith("/slow/"):
+                time.sleep(self.server.delay)
+            self._send(
+                "application/octet-stream",
+                self.server.resource
+            )
+        return
+
+    def log_message(self, *args):
+        """Suppress logging."""
+        return
+
+
+class FixtureSite(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """Local fixture Web site.
+
+    http.server.ThreadingHTTPServer is not available before Python 3.7.
+
+    :ivar float delay: delay of slow resources in seconds
+    :ivar bytes resource: resource body (random, i.e. incompressible)
+    :ivar int requests: number of requests served
+    :ivar int bytes: number of body bytes served
+    """
+
+    daemon_threads = True
+
+    def __init__(self, resource_size=16*1024, delay=0.05):
+        """Initialize local fixture Web site.
+
+        :param int resource_size: resource size in bytes
+        :param float delay: delay of slow resources in seconds
+        """
+        super().__init__(("127.0.0.1", 0), HTTPRequestHandler)
+        self.delay = delay
+        self.resource = os.urandom(resource_size)
+        self.requests = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        return
+
+    @property
+    def base(self):
+        """Base URL.
+
+        :returns: base URL
+        :rtype: str
+        """
+        return "http://127.0.0.1:{port}".format(port=self.server_port)
+
+    def get_url(self, page, size=4096, resources=0, shared=0, slow=0):
+        """Get page URL.
+
+        :param int page: page number
+        :param int size: page size in bytes
+        :param int resources: number of resources
+        :param int shared: number of shared resources
+        :param int slow: number of slow resources
+
+        :returns: URL
+        :rtype: str
+        """
+        return (
+            "{base}/page/{page}.html"
+            "?size={size}&resources={resources}&shared={shared}&slow={slow}"
+        ).format(
+            base=self.base, page=page, size=size, resources=resources,
+            shared=shared, slow=slow
+        )
+
+    def get_page(self, path, size, resources, shared, slow):
+        """Generate page.
+
+        :param str path: page path
+        :param int size: page size in bytes
+        :param int resources: number of resources
+        :param int shared: number of shared resources
+        :param int slow: number of slow resources
+
+        :returns: page
+        :rtype: bytes
+        """
+        page = path.rsplit("/", 1)[-1].split(".")[0]
+        tags = []
+        for i in range(resources):
+            if i < shared:
+                src = "/shared/{i}.bin".format(i=i)
+            elif i < shared + slow:
+                src = "/slow/{page}/{i}.bin".format(page=page, i=i)
+            else:
+                src = "/resource/{page}/{i}.bin".format(page=page, i=i)
+            tags.append("<img src='{base}{src}'>".format(
+                base=self.base, src=src
+            ))
+        body = "<html><body>{}".format("".join(tags))
+        padding = max(0, size - len(body) - len("</body></html>"))
+        body += "<p>{}</p>".format("x" * max(0, padding - 7))
+        body += "</body></html>"
+        return body.encode()
+
+    def count(self, size):
+        """Count served request.
+
+        :param int size: body size in bytes
+        """
+        with self._lock:
+            self.requests += 1
+            self.bytes += size
+        return
+
+    def start(self):
+        """Serve in background thread."""
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return
+
+    def stop(self):
+        """Stop serving."""
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+        return
@@ -0,0 +1,207 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Local FTP and SMTP stand-ins for benchmarks.
+
+The FTP stand-in requires pyftpdlib and pyOpenSSL (FTP over TLS) and the
+openssl command line tool (self-signed certificate).
+"""
+
+
+# standard library imports
+import os
+import logging
+import socketserver
+import subprocess
+import threading
+
+# third party imports
+# library specific imports
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP session handler discarding messages."""
+
+    disable_nagle_algorithm = True
+
+    def _reply(self, line):
+        """Send reply.
+
+        :param str line: reply line
+        """
+        self.wfile.write("{}\r\n".format(line).encode())
+        return
+
+    def handle(self):
+        """Handle SMTP session."""
+        self._reply("220 localhost ESMTP")
+        data = False
+        for line in self.rfile:
+            if data:
+                if line.rstrip(b"\r\n") == b".":
+                    self.server.count()
+                    data = False
+                    self._reply("250 OK")
+                continue
+            command = line[:4].decode().upper()
+            if command in ("HELO", "EHLO"):
+                self._reply("250 localhost")
+            elif command in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self._reply("250 OK")
+            elif command == "DATA":
+                data = True
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                break
+            else:
+                self._reply("502 Command not implemented")
+        return
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Local SMTP sink.
+
+    :ivar int messages: number of received messages
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        """Initialize local SMTP sink."""
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.messages = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        return
+
+    def count(self):
+        """Count received message."""
+        with self._lock:
+            self.messages += 1
+        return
+
+    def start(self):
+        """Serve in background thread."""
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return
+
+    def stop(self):
+        """Stop serving."""
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+        return
+
+
+def create_certificate(directory):
+    """Create self-signed certificate.
+
+    :param str directory: directory
+
+    :returns: PEM file (certificate and key)
+    :rtype: str
+    """
+    keyfile = os.path.join(directory, "key.pem")
+    certfile = os.path.join(directory, "cert.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-days", "1", "-subj", "/CN=127.0.0.1",
+            "-keyout", keyfile, "-out", certfile
+        ],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    pemfile = os.path.join(directory, "ftp.pem")
+    with open(pemfile, mode="w") as fp:
+        for filename in [certfile, keyfile]:
+            with open(filename) as pem:
+                fp.write(pem.read())
+    return pemfile
+
+
+class FTPStandIn(object):
+    """Local FTP over TLS stand-in.
+
+    :ivar str home: home directory of FTP user
+    :ivar str user: FTP user
+    :ivar str passwd: FTP password
+    :ivar FTPServer server: FTP server
+    """
+
+    def __init__(self, home, user="opendachs", passwd="opendachs"):
+        """Initialize local FTP over TLS stand-in.
+
+        :param str home: home directory of FTP user
+        :param str user: FTP user
+        :param str passwd: FTP password
+        """
+        import pyftpdlib.handlers
+        import pyftpdlib.servers
+        import pyftpdlib.authorizers
+        self.home = home
+        self.user = user
+        self.passwd = passwd
+        authorizer = pyftpdlib.authorizers.DummyAuthorizer()
+        authorizer.add_user(user, passwd, home, perm="elrdw")
+
+        class Handler(pyftpdlib.handlers.TLS_FTPHandler):
+            pass
+
+        Handler.authorizer = authorizer
+        Handler.certfile = create_certificate(
+            os.path.dirname(os.path.abspath(home))
+        )
+        Handler.tls_control_required = True
+        Handler.tls_data_required = True
+        logger = logging.getLogger("pyftpdlib")
+        if not logger.handlers:
+            logger.addHandler(logging.NullHandler())
+        self.server = pyftpdlib.servers.ThreadedFTPServer(
+            ("127.0.0.1", 0), Handler
+        )
+        self._thread = None
+        return
+
+    @property
+    def port(self):
+        """Port.
+
+        :returns: port
+        :rtype: int
+        """
+        return self.server.address[1]
+
+    def start(self):
+        """Serve in background thread."""
+        self._thread = threading.Thread(
+            target=self.server.serve_forever,
+            kwargs={"timeout": 0.1, "blocking": True, "handle_exit": False}
+        )
+        self._thread.daemon = True
+        self._thread.start()
+        return
+
+    def stop(self):
+        """Stop serving."""
+        self.server.close_all()
+        self._thread.join()
+        return
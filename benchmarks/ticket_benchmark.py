@@ -0,0 +1,153 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: OpenDACHS ticket memory and serialization benchmark.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.ticket_benchmark -n 100000
+"""
+
+
+# standard library imports
+import time
+import argparse
+import datetime
+import tracemalloc
+
+# third party imports
+# library specific imports
+import src.codec
+import src.ticket
+
+
+class PlainTicket(object):
+    """OpenDACHS ticket with per-instance __dict__ (for comparison)."""
+
+    def __init__(self, id_, user, archive, metadata, flag, timestamp):
+        self.id_ = id_
+        self.user = user
+        self.archive = archive
+        self.metadata = metadata
+        self.flag = flag
+        self.timestamp = timestamp
+
+
+def get_argument_parser():
+    """Get argument parser.
+
+    :returns: argument parser
+    :rtype: ArgumentParser
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n", type=int, default=100000, help="number of tickets"
+    )
+    return parser
+
+
+def get_args(i):
+    """Get synthetic OpenDACHS ticket arguments.
+
+    :param int i: ticket number
+
+    :returns: arguments
+    :rtype: tuple
+    """
+    user = src.ticket.User(
+        "user{}".format(i), "archivist", "password", "foo@example.org"
+    )
+    metadata = {
+        "url": "http://example.org/{}.html".format(i),
+        "title": {"romanization": "Title {}".format(i), "script": ""},
+        "creator": [{"romanization": "Creator", "script": ""}],
+        "subjectHeading": ["subject {}".format(j) for j in range(10)]
+    }
+    return (
+        "ticket{}".format(i), user, "tmp/warcs/ticket{}.warc".format(i),
+        metadata, "pending", datetime.datetime.now()
+    )
+
+
+def measure_memory(cls, args):
+    """Measure memory allocated by ticket instances.
+
+    :param type cls: ticket class
+    :param list args: ticket arguments
+
+    :returns: allocated memory in bytes
+    :rtype: int
+    """
+    tracemalloc.start()
+    tickets = [cls(*arg) for arg in args]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tickets
+    return size
+
+
+def measure_rate(function, items):
+    """Measure throughput.
+
+    :param callable function: function
+    :param list items: function arguments
+
+    :returns: calls per second
+    :rtype: float
+    """
+    start = time.perf_counter()
+    for item in items:
+        function(item)
+    return len(items) / (time.perf_counter() - start)
+
+
+def main():
+    """Main routine."""
+    args = get_argument_parser().parse_args()
+    ticket_args = [get_args(i) for i in range(args.n)]
+    for cls in [PlainTicket, src.ticket.Ticket]:
+        size = measure_memory(cls, ticket_args)
+        print("{name:12} {size:8.1f} MiB ({per:.0f} bytes/ticket)".format(
+            name=cls.__name__, size=size / 2**20, per=size / args.n
+        ))
+    backends = ["json", "orjson"] if src.codec.orjson else ["json"]
+    for backend in backends:
+        src.codec.set_backend(backend)
+        tickets = [src.ticket.Ticket(*arg) for arg in ticket_args]
+        results = [
+            ("get_row (cold)", measure_rate(
+                src.ticket.Ticket.get_row, tickets
+            )),
+            ("get_row (cached)", measure_rate(
+                src.ticket.Ticket.get_row, tickets
+            )),
+            ("get_json", measure_rate(src.ticket.Ticket.get_json, tickets))
+        ]
+        rows = [ticket.get_row() for ticket in tickets]
+        results.append(
+            ("get_ticket", measure_rate(src.ticket.Ticket.get_ticket, rows))
+        )
+        for label, rate in results:
+            print("{backend:7} {label:18} {rate:10.0f} tickets/s".format(
+                backend=backend, label=label, rate=rate
+            ))
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,9 @@ import logging
 
 # third party imports
 # library specific imports
+import src.aio
+import src.metrics
+import src.profiling
 import src.ticket_manager
 
 
@@ -41,6 +44,38 @@ def get_argument_parser():
         parser.add_argument("ftp", help="FTP configuration")
         parser.add_argument("smtp", help="SMTP configuration")
         parser.add_argument("sqlite", help="SQLite configuration")
+        parser.add_argument(
+            "--storage", help="storage configuration", default=None
+        )
+        parser.add_argument(
+            "--scraper", help="scraper configuration", default=None
+        )
+        parser.add_argument(
+            "--asyncio", action="store_true",
+            help="manage tickets concurrently with asyncio"
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=4,
+            help="maximum number of tickets managed concurrently (asyncio "
+            "only)"
+        )
+        parser.add_argument(
+            "--spans", help="append timing spans to JSON lines file",
+            default=None
+        )
+        parser.add_argument(
+            "--textfile",
+            help="write timing spans to Prometheus text file",
+            default=None
+        )
+        parser.add_argument(
+            "--profile", choices=["cprofile", "sampling"],
+            help="profile run, write profile to storage/", default=None
+        )
+        parser.add_argument(
+            "--profile-interval", type=float, default=0.005,
+            help="sampling interval in seconds (sampling profiler only)"
+        )
     except Exception as exception:
         msg = "failed to get argument parser:{}".format(exception)
         raise SystemExit(msg)
@@ -80,8 +115,46 @@ def main():
         ftp = read_config(args.ftp)
         smtp = read_config(args.smtp)
         sqlite = read_config(args.sqlite)
-        ticket_manager = src.ticket_manager.TicketManager(ftp, smtp, sqlite)
-        ticket_manager.manage()
+        if args.storage:
+            storage = read_config(args.storage)
+        else:
+            storage = None
+        if args.scraper:
+            scraper = read_config(args.scraper)
+        else:
+            scraper = None
+        ticket_manager = src.ticket_manager.TicketManager(
+            ftp, smtp, sqlite, storage=storage, scraper=scraper
+        )
+        if args.spans or args.textfile or args.profile:
+            src.metrics.enable()
+        profiler = None
+        if args.profile:
+            kwargs = {}
+            if args.profile == "sampling":
+                kwargs["interval"] = args.profile_interval
+            profiler = src.profiling.get_profiler(args.profile, **kwargs)
+            profiler.start()
+        try:
+            if args.asyncio:
+                async_ticket_manager = src.aio.AsyncTicketManager(
+                    ticket_manager, concurrency=args.concurrency,
+                    api=src.ticket_manager.WEBRECORDER_API
+                )
+                try:
+                    src.aio.run(async_ticket_manager.manage())
+                finally:
+                    async_ticket_manager.close()
+            else:
+                ticket_manager.manage()
+        finally:
+            if profiler:
+                profiler.stop()
+                profiler.dump(src.profiling.get_directory())
+            if args.spans:
+                src.metrics.write_jsonl(args.spans)
+            if args.textfile:
+                src.metrics.write_prometheus(args.textfile)
     except Exception as exception:
         msg = "an exception was raised:{}".format(exception)
         raise SystemExit(msg)
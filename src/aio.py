@@ -0,0 +1,535 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Asyncio OpenDACHS ticket manager.
+
+The ticket lifecycle as coroutines on top of a TicketManager. The FTP,
+HTTP (scraping), SMTP and SQLite clients are blocking and run in a thread
+pool executor, the Webrecorder API is called as asyncio subprocess if its
+command line is given. The number of tickets managed concurrently is
+bounded by a semaphore. TicketManager.manage runs the same workflow with
+a concurrency of 1 and the blocking clients called inline, i.e. on the
+calling thread.
+"""
+
+
+# standard library imports
+import asyncio
+import logging
+import functools
+import collections
+import concurrent.futures
+
+# third party imports
+# library specific imports
+import src.ftp
+import src.lease
+import src.metrics
+import src.outbox
+import src.scheduler
+import src.ticket_manager
+
+
+def run(coroutine):
+    """Run coroutine in a new event loop.
+
+    asyncio.run is not available before Python 3.7.
+
+    :param coroutine: coroutine
+
+    :returns: return value
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(coroutine)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+class AsyncTicketManager(object):
+    """Asyncio OpenDACHS ticket manager.
+
+    :ivar TicketManager ticket_manager: OpenDACHS ticket manager
+    :ivar int concurrency: maximum number of tickets managed concurrently
+    :ivar api: Webrecorder API command line
+    :type: list or None
+    :ivar executor: executor for blocking I/O (None if called inline)
+    :type: ThreadPoolExecutor or None
+    """
+
+    def __init__(
+        self, ticket_manager, concurrency=4, api=None, inline=False
+    ):
+        """Initialize asyncio ticket manager.
+
+        :param TicketManager ticket_manager: OpenDACHS ticket manager
+        :param int concurrency: maximum number of tickets managed
+            concurrently
+        :param list api: Webrecorder API command line (default None,
+            i.e. the API is called by TicketManager.call_api in the
+            executor)
+        :param bool inline: toggle calling blocking functions on the
+            thread running the event loop instead of the executor (only
+            with a concurrency of 1)
+        """
+        try:
+            if concurrency < 1:
+                raise ValueError("concurrency < 1")
+            if inline and concurrency != 1:
+                raise ValueError("inline with concurrency != 1")
+            self.ticket_manager = ticket_manager
+            self.concurrency = concurrency
+            self.api = list(api) if api is not None else None
+            if inline:
+                self.executor = None
+            else:
+                self.executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=concurrency
+                )
+            self._semaphores = {}
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to initialize asyncio ticket manager"
+            ) from exception
+        return
+
+    def _get_semaphore(self):
+        """Get semaphore bounding the number of tickets managed
+        concurrently in the running event loop.
+
+        :returns: semaphore
+        :rtype: Semaphore
+        """
+        loop = asyncio.get_event_loop()
+        if loop not in self._semaphores:
+            self._semaphores.clear()
+            self._semaphores[loop] = asyncio.Semaphore(self.concurrency)
+        return self._semaphores[loop]
+
+    async def _run(self, function, *args, stage=None, tags=None):
+        """Run blocking function in executor (or inline).
+
+        Spans are recorded in the executor thread, so that spans of
+        concurrently managed tickets do not interleave.
+
+        :param callable function: function
+        :param args: positional arguments
+        :param str stage: stage to time function as
+        :param dict tags: tags
+
+        :returns: return value
+        """
+        if stage is not None:
+            function = functools.partial(
+                self._timed, stage, tags or {}, function
+            )
+        if self.executor is None:
+            return function(*args)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(function, *args)
+        )
+
+    @staticmethod
+    def _timed(stage, tags, function, *args):
+        """Call function timed as stage.
+
+        :param str stage: stage
+        :param dict tags: tags
+        :param callable function: function
+        :param args: positional arguments
+
+        :returns: return value
+        """
+        with src.metrics.span(stage, **tags):
+            return function(*args)
+
+    async def call_api(self):
+        """Call Webrecorder API."""
+        if self.api is None:
+            await self._run(self.ticket_manager.call_api)
+            return
+        child = await asyncio.create_subprocess_exec(
+            *self.api, stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await child.communicate()
+        if child.returncode != 0:
+            logger = logging.getLogger().getChild(self.call_api.__name__)
+            logger.warning(
+                "Webrecorder API: %s", stderr.decode(errors="replace")
+            )
+            raise RuntimeError(
+                "failed to call Webrecorder API (exit status {})".format(
+                    child.returncode
+                )
+            )
+        return
+
+    async def submit(self, data, ticket=None):
+        """Submit new OpenDACHS ticket.
+
+        :param dict data: OpenDACHS ticket
+        :param Ticket ticket: OpenDACHS ticket initialized and archived
+            beforehand
+
+        :returns: OpenDACHS ticket
+        :rtype: Ticket
+        """
+        return await self._run(
+            functools.partial(self.ticket_manager.submit, ticket=ticket),
+            data
+        )
+
+    async def confirm(self, data):
+        """Confirm ticket.
+
+        :param dict data: OpenDACHS ticket
+
+        :returns: OpenDACHS ticket
+        :rtype: Ticket
+        """
+        return await self._run(self.ticket_manager.confirm, data)
+
+    async def accept(self, data):
+        """Accept ticket.
+
+        :param dict data: OpenDACHS ticket
+
+        :returns: OpenDACHS ticket
+        :rtype: Ticket
+        """
+        return await self._run(self.ticket_manager.accept, data)
+
+    async def deny(self, data):
+        """Deny ticket.
+
+        :param dict data: OpenDACHS ticket
+
+        :returns: OpenDACHS ticket
+        :rtype: Ticket
+        """
+        return await self._run(self.ticket_manager.deny, data)
+
+    async def remove_expired(self):
+        """Remove expired OpenDACHS tickets.
+
+        :returns: removed OpenDACHS tickets
+        :rtype: list
+        """
+        return await self._run(
+            lambda: list(self.ticket_manager.remove_expired())
+        )
+
+    async def sendmail(self, ticket, name, tags=None):
+        """Send email.
+
+        :param Ticket ticket: OpenDACHS ticket
+        :param str name: name of email template
+        :param dict tags: tags
+        """
+        await self._run(
+            self.ticket_manager.sendmail, ticket, name,
+            stage="notify", tags=tags
+        )
+        return
+
+    async def _send_error(self, data):
+        """Send error notification for OpenDACHS ticket.
+
+        :param dict data: OpenDACHS ticket
+        """
+        await self._run(self.ticket_manager._send_error, data)
+        return
+
+    async def _manage_ticket(self, action, flag, data, coroutine):
+        """Manage OpenDACHS ticket.
+
+        :param str action: action
+        :param str flag: flag
+        :param dict data: OpenDACHS ticket
+        :param coroutine: coroutine returning the OpenDACHS ticket to
+            notify about (None if the ticket was spooled)
+
+        :returns: whether the ticket was managed (None if it was spooled)
+        :rtype: bool or None
+        """
+        logger = logging.getLogger().getChild("manage")
+        async with self._get_semaphore():
+            try:
+                ticket = await coroutine
+                if ticket is None:
+                    return None
+                await self.sendmail(
+                    ticket, flag, tags={"ticket": ticket.id_, "flag": flag}
+                )
+            except Exception:
+                logger.exception(
+                    "failed to %s ticket %s", action, data["ticket"]
+                )
+                await self._send_error(data)
+                return False
+        return True
+
+    async def _submit(self, data, result=None):
+        """Submit new OpenDACHS ticket and call Webrecorder API.
+
+        If the time budget of the ticket scheduler is exhausted, the
+        ticket is spooled for the next run unless it has been archived.
+
+        :param dict data: OpenDACHS ticket
+        :param Result result: result of archiving in worker processes
+
+        :returns: OpenDACHS ticket or None
+        :rtype: Ticket or None
+        """
+        ticket = None
+        if result is not None:
+            if result.exception:
+                raise result.exception
+            ticket = result.ticket
+        elif self.ticket_manager.scheduler.exhausted():
+            await self._run(self.ticket_manager.scheduler.write, [data])
+            return None
+        ticket = await self._run(
+            functools.partial(self.ticket_manager.submit, ticket=ticket),
+            data,
+            stage="submit",
+            tags={"ticket": data["ticket"], "flag": "pending"}
+        )
+        await self.call_api()
+        return ticket
+
+    async def _expire(self, ticket):
+        """Call Webrecorder API for expired OpenDACHS ticket.
+
+        :param Ticket ticket: OpenDACHS ticket
+
+        :returns: OpenDACHS ticket
+        :rtype: Ticket
+        """
+        await self.call_api()
+        return ticket
+
+    @staticmethod
+    async def _get_ticket(ticket):
+        """Get OpenDACHS ticket.
+
+        :param Ticket ticket: OpenDACHS ticket
+
+        :returns: OpenDACHS ticket
+        :rtype: Ticket
+        """
+        return ticket
+
+    async def submit_many(self, datas, archived=None):
+        """Submit new OpenDACHS tickets concurrently.
+
+        :param list datas: OpenDACHS tickets
+        :param dict archived: results of archiving in worker processes or
+            of claiming leases that failed (ticket ID as key)
+
+        :returns: whether the tickets were submitted (None if spooled)
+        :rtype: list
+        """
+        archived = archived or {}
+        return await asyncio.gather(*[
+            self._manage_ticket(
+                "submit", "submitted", data,
+                self._submit(data, result=archived.get(data["ticket"]))
+            )
+            for data in datas
+        ])
+
+    async def _transition(self, flag, transition, datas):
+        """Transition OpenDACHS tickets in bulk and notify users.
+
+        :param str flag: flag
+        :param callable transition: bulk state transition
+        :param list datas: OpenDACHS tickets
+
+        :returns: whether the tickets were managed
+        :rtype: list
+        """
+        claimed, unclaimed = await self._run(
+            self.ticket_manager.claim_many, datas
+        )
+        results = []
+        if claimed:
+            results = await self._run(
+                transition, claimed, stage="transition", tags={"flag": flag}
+            )
+        results += unclaimed
+        if any(result.ticket for result in results):
+            try:
+                await self.call_api()
+            except Exception as exception:
+                results = [
+                    src.ticket_manager.Result(result.data, None, exception)
+                    if result.ticket else result
+                    for result in results
+                ]
+        coroutines = []
+        for result in results:
+            if result.exception:
+                coroutine = self._fail(result.exception)
+            else:
+                coroutine = self._get_ticket(result.ticket)
+            coroutines.append(
+                self._manage_ticket(flag, flag, result.data, coroutine)
+            )
+        return await asyncio.gather(*coroutines)
+
+    @staticmethod
+    async def _fail(exception):
+        """Raise exception of failed state transition.
+
+        :param Exception exception: exception
+        """
+        raise exception
+
+    async def manage(self):
+        """Manage OpenDACHS tickets.
+
+        Bulk state transitions are managed first, then pending tickets in
+        the order of the ticket scheduler until its time budget is
+        exhausted; the remaining pending tickets are spooled for the next
+        run.
+        """
+        logger = logging.getLogger().getChild(self.manage.__name__)
+        ticket_manager = self.ticket_manager
+        ticket_manager.scheduler.start()
+        if ticket_manager.outbox:
+            sender = src.outbox.OutboxSender(
+                ticket_manager.outbox,
+                ticket_manager.smtp_pool,
+                workers=ticket_manager.sqlite["outbox"].getint(
+                    "workers", fallback=2
+                )
+            )
+            sender.start()
+        if ticket_manager.leases:
+            keeper = src.lease.LeaseKeeper(ticket_manager.leases)
+            keeper.start()
+        try:
+            logger.info("retrieve ticket files")
+            files = await self._run(
+                functools.partial(
+                    src.ftp.retrieve_files, leases=ticket_manager.leases
+                ),
+                ticket_manager.ftp,
+                stage="ftp.retrieve"
+            )
+            logger.info("retrieved %d tickets", len(files))
+            spooled, failed = await self._run(ticket_manager.read_spooled)
+            datas, unreadable = await self._run(
+                ticket_manager.read_files, files
+            )
+            failed += unreadable
+            for flag, flag_datas in spooled.items():
+                datas[flag] = flag_datas + datas[flag]
+            counter = collections.OrderedDict()
+            bulk_transitions = [
+                ("confirmed", ticket_manager.confirm_many),
+                ("accepted", ticket_manager.accept_many),
+                ("denied", ticket_manager.deny_many)
+            ]
+            for flag, transition in bulk_transitions:
+                managed = []
+                if datas[flag]:
+                    managed = await self._transition(
+                        flag, transition, datas[flag]
+                    )
+                counter[flag] = sum(managed)
+                failed += len(managed) - sum(managed)
+            await self._run(
+                ticket_manager.discard_spooled,
+                [
+                    data for flag, flag_datas in spooled.items()
+                    if flag != "pending" for data in flag_datas
+                ]
+            )
+            claimed, unclaimed = await self._run(
+                ticket_manager.claim_many,
+                src.scheduler.order(datas["pending"])
+            )
+            archived = {
+                result.data["ticket"]: result for result in unclaimed
+            }
+            if ticket_manager.worker_pool is not None:
+                results = await self._run(
+                    ticket_manager.archive_many,
+                    [data for data in claimed if "warc" not in data]
+                )
+                archived.update(
+                    (result.data["ticket"], result) for result in results
+                )
+            pending = claimed + [result.data for result in unclaimed]
+            managed = await self.submit_many(pending, archived)
+            ids = set(data["ticket"] for data in spooled["pending"])
+            await self._run(
+                ticket_manager.discard_spooled,
+                [
+                    data for data, submitted in zip(pending, managed)
+                    if submitted is not None and data["ticket"] in ids
+                ]
+            )
+            counter["submitted"] = managed.count(True)
+            failed += managed.count(False)
+            if None in managed:
+                logger.info(
+                    "time budget exhausted, spooled %d tickets",
+                    managed.count(None)
+                )
+            managed = await asyncio.gather(*[
+                self._manage_ticket(
+                    "remove expired", "expired", {"ticket": ticket.id_},
+                    self._expire(ticket)
+                )
+                for ticket in await self.remove_expired()
+            ])
+            counter["removed"] = sum(managed)
+            failed += len(managed) - sum(managed)
+            for key, value in counter.items():
+                logger.info("%s %d tickets", key, value)
+            if failed:
+                raise RuntimeError(
+                    "failed to manage {n} tickets".format(n=failed)
+                )
+        finally:
+            try:
+                await self._run(ticket_manager.send_digest)
+            except Exception:
+                logger.exception("failed to send digest")
+            if ticket_manager.outbox:
+                await self._run(sender.stop)
+            if ticket_manager.leases:
+                keeper.stop()
+                try:
+                    await self._run(ticket_manager.leases.release_all)
+                except Exception:
+                    logger.exception("failed to release leases")
+            ticket_manager.smtp_pool.close()
+        return
+
+    def close(self):
+        """Shut executor down."""
+        if self.executor is not None:
+            self.executor.shutdown()
+        return
@@ -0,0 +1,296 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Per-session WARC capture.
+
+Records the HTTP traffic of a requests session into a WARC archive by
+mounting a transport adapter that tees the request and the raw (still
+content- and transfer-encoded) response bytes into a WARC writer owned by
+the session. Unlike warcio.capture_http, nothing is patched process-wide,
+so several sessions can be captured into separate WARC archives at the
+same time, e.g. in threads.
+
+The request record is reconstructed from the prepared request (request
+line, Host header, request headers and body), the response record holds
+the status line, the response headers as received and the raw body,
+which is spooled to a temporary file while it is read.
+"""
+
+
+# standard library imports
+import io
+import tempfile
+import threading
+import contextlib
+import urllib.parse
+
+# third party imports
+import requests.adapters
+import warcio.warcwriter
+
+# library specific imports
+
+
+SPOOL_SIZE = 64*1024
+
+
+class _TeeFile(object):
+    """Socket file of HTTP response copying lines read to spool.
+
+    :ivar fp: socket file
+    :ivar SpooledTemporaryFile spool: spool
+    """
+
+    def __init__(self, fp, spool):
+        self.fp = fp
+        self.spool = spool
+
+    def readline(self, *args):
+        line = self.fp.readline(*args)
+        self.spool.write(line)
+        return line
+
+    def __getattr__(self, name):
+        return getattr(self.fp, name)
+
+
+class _TeeResponse(object):
+    """HTTP response (http.client) copying body bytes read to spool.
+
+    :ivar HTTPResponse response: HTTP response
+    :ivar SpooledTemporaryFile spool: spool
+    """
+
+    def __init__(self, response, spool):
+        self.__dict__["response"] = response
+        self.__dict__["spool"] = spool
+
+    @property
+    def fp(self):
+        """Socket file (used by urllib3 to read chunked bodies)."""
+        if self.response.fp is None:
+            return None
+        return _TeeFile(self.response.fp, self.spool)
+
+    def read(self, *args):
+        data = self.response.read(*args)
+        self.spool.write(data)
+        return data
+
+    def _safe_read(self, amt):
+        data = self.response._safe_read(amt)
+        self.spool.write(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.response, name, value)
+
+
+class _Exchange(object):
+    """Request and response of one HTTP exchange.
+
+    :ivar WARCAdapter adapter: WARC capture adapter
+    :ivar str url: URL
+    :ivar bytes request: raw request
+    :ivar SpooledTemporaryFile spool: raw response
+    :ivar bool done: toggle
+    """
+
+    def __init__(self, adapter, url, request):
+        self.adapter = adapter
+        self.url = url
+        self.request = request
+        self.spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        self.done = False
+        self._lock = threading.Lock()
+
+    def finish(self):
+        """Write request and response record (once)."""
+        with self._lock:
+            if self.done:
+                return
+            self.done = True
+        try:
+            self.adapter.write(self)
+        finally:
+            self.spool.close()
+        return
+
+
+def _get_raw_request(request):
+    """Get raw HTTP request.
+
+    :param PreparedRequest request: prepared request
+
+    :returns: raw HTTP request
+    :rtype: bytes
+    """
+    parse_result = urllib.parse.urlsplit(request.url)
+    lines = ["{method} {path} HTTP/1.1".format(
+        method=request.method, path=request.path_url
+    )]
+    if "Host" not in request.headers:
+        lines.append("Host: {}".format(parse_result.netloc))
+    for key, value in request.headers.items():
+        lines.append("{}: {}".format(key, value))
+    raw = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+    body = request.body
+    if isinstance(body, str):
+        body = body.encode()
+    if isinstance(body, bytes):
+        raw += body
+    return raw
+
+
+def _get_raw_headers(response):
+    """Get raw status line and headers of HTTP response.
+
+    :param HTTPResponse response: HTTP response (urllib3)
+
+    :returns: status line and headers
+    :rtype: bytes
+    """
+    version = {10: "HTTP/1.0"}.get(response.version, "HTTP/1.1")
+    lines = ["{version} {status} {reason}".format(
+        version=version, status=response.status, reason=response.reason
+    )]
+    original = getattr(response, "_original_response", None)
+    if original is not None:
+        items = original.msg.items()
+    else:
+        items = response.headers.items()
+    for key, value in items:
+        lines.append("{}: {}".format(key, value))
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+class WARCAdapter(requests.adapters.BaseAdapter):
+    """Transport adapter recording HTTP exchanges into WARC archive.
+
+    Requests are sent by the wrapped transport adapter. The records of an
+    exchange are written when the response has been read or is closed.
+
+    :ivar BaseAdapter adapter: wrapped transport adapter
+    :ivar WARCWriter warc_writer: WARC writer
+    :ivar callable filter_func: called with request and response record
+        and the adapter before they are written, returns both records
+        (possibly modified) or None for either to drop the exchange
+    """
+
+    def __init__(self, adapter, warc_writer, filter_func=None):
+        """Initialize WARC capture adapter.
+
+        :param BaseAdapter adapter: wrapped transport adapter
+        :param WARCWriter warc_writer: WARC writer
+        :param callable filter_func: record filter
+        """
+        super().__init__()
+        self.adapter = adapter
+        self.warc_writer = warc_writer
+        self.filter_func = filter_func
+        self._lock = threading.Lock()
+        return
+
+    def send(self, request, **kwargs):
+        """Send request, tee response into WARC archive.
+
+        :param PreparedRequest request: prepared request
+
+        :returns: response
+        :rtype: Response
+        """
+        response = self.adapter.send(request, **kwargs)
+        raw = response.raw
+        exchange = _Exchange(self, request.url, _get_raw_request(request))
+        exchange.spool.write(_get_raw_headers(raw))
+        raw._fp = _TeeResponse(raw._fp, exchange.spool)
+        for name in ["release_conn", "close"]:
+            method = getattr(raw, name)
+
+            def hook(method=method):
+                try:
+                    return method()
+                finally:
+                    exchange.finish()
+            setattr(raw, name, hook)
+        if raw._fp.isclosed():
+            exchange.finish()
+        return response
+
+    def write(self, exchange):
+        """Write request and response record of exchange.
+
+        :param _Exchange exchange: HTTP exchange
+        """
+        length = exchange.spool.tell()
+        exchange.spool.seek(0)
+        warc_headers_dict = {}
+        request = self.warc_writer.create_warc_record(
+            exchange.url, "request",
+            payload=io.BytesIO(exchange.request),
+            length=len(exchange.request),
+            warc_headers_dict=warc_headers_dict
+        )
+        response = self.warc_writer.create_warc_record(
+            exchange.url, "response",
+            payload=exchange.spool,
+            length=length,
+            warc_headers_dict=warc_headers_dict
+        )
+        if self.filter_func:
+            request, response = self.filter_func(request, response, self)
+            if not request or not response:
+                return
+        with self._lock:
+            self.warc_writer.write_request_response_pair(request, response)
+        return
+
+    def close(self):
+        """Close wrapped transport adapter."""
+        self.adapter.close()
+        return
+
+
+@contextlib.contextmanager
+def capture(session, filename, filter_func=None, append=True, **kwargs):
+    """Record HTTP traffic of session into WARC archive.
+
+    :param Session session: requests session
+    :param str filename: WARC archive filename
+    :param callable filter_func: record filter (see WARCAdapter)
+    :param bool append: toggle appending to existing WARC archive
+    :param kwargs: WARC writer parameters (e.g. gzip)
+
+    :returns: WARC writer
+    :rtype: WARCWriter
+    """
+    adapters = session.adapters.copy()
+    with open(filename, mode="ab" if append else "xb") as fp:
+        warc_writer = warcio.warcwriter.WARCWriter(fp, **kwargs)
+        for prefix, adapter in adapters.items():
+            session.mount(
+                prefix, WARCAdapter(adapter, warc_writer, filter_func)
+            )
+        try:
+            yield warc_writer
+        finally:
+            session.adapters = adapters
+    return
@@ -0,0 +1,240 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Character encoding of HTML documents.
+
+The character encoding is taken from the byte order mark, the charset
+parameter of the HTTP Content-Type header or the <meta> charset
+declaration in the first 1024 bytes, in this order. Only undeclared
+encodings are detected: the document is decoded as UTF-8 if it is valid
+UTF-8, otherwise charset_normalizer (if it is installed) detects the
+encoding from a sample. Detected encodings are cached per host, so the
+detector runs once for a site without declarations. bs4 gets the decoded
+document and skips its own (slow) encoding detection.
+"""
+
+
+# standard library imports
+import re
+import codecs
+import threading
+import urllib.parse
+
+# third party imports
+try:
+    import charset_normalizer
+except ImportError:
+    charset_normalizer = None
+
+# library specific imports
+
+
+PREFIX_SIZE = 1024
+SAMPLE_SIZE = 65536
+CACHE_SIZE = 4096
+DEFAULT = "cp1252"
+
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be")
+)
+# encodings treated as windows-1252 by browsers
+SUPERSETS = {"ascii": "cp1252", "iso8859-1": "cp1252"}
+
+_HTTP_CHARSET = re.compile(r"charset\s*=\s*[\"']?([^\s;\"']+)", re.I)
+_META_CHARSET = re.compile(
+    rb"<meta[^>]+?charset\s*=\s*[\"']?\s*([a-z0-9_:.+-]+)", re.I
+)
+_NON_ASCII = re.compile(rb"[\x80-\xff]")
+
+_lock = threading.Lock()
+_hosts = {}
+
+
+def normalize(name):
+    """Normalize name of character encoding.
+
+    :param str name: name of character encoding
+
+    :returns: Python codec name or None if the encoding is unknown
+    :rtype: str or None
+    """
+    if isinstance(name, bytes):
+        name = name.decode("ascii", errors="ignore")
+    try:
+        name = codecs.lookup(name.strip()).name
+    except LookupError:
+        return None
+    return SUPERSETS.get(name, name)
+
+
+def get_bom_charset(content):
+    """Get character encoding of byte order mark.
+
+    :param bytes content: document
+
+    :returns: character encoding or None
+    :rtype: str or None
+    """
+    for bom, encoding in BOMS:
+        if content.startswith(bom):
+            return encoding
+    return None
+
+
+def get_http_charset(content_type):
+    """Get character encoding of HTTP Content-Type header.
+
+    :param content_type: Content-Type header
+    :type: str or None
+
+    :returns: character encoding or None
+    :rtype: str or None
+    """
+    if not content_type:
+        return None
+    match = _HTTP_CHARSET.search(content_type)
+    return normalize(match.group(1)) if match else None
+
+
+def get_meta_charset(content):
+    """Get character encoding of <meta> charset declaration.
+
+    Both <meta charset> and <meta http-equiv="Content-Type"> are
+    recognized in the first PREFIX_SIZE bytes. As in browsers, a declared
+    UTF-16 encoding means UTF-8 (the declaration itself is ASCII).
+
+    :param bytes content: document
+
+    :returns: character encoding or None
+    :rtype: str or None
+    """
+    match = _META_CHARSET.search(content[:PREFIX_SIZE])
+    if not match:
+        return None
+    encoding = normalize(match.group(1))
+    if encoding and encoding.startswith("utf-16"):
+        encoding = "utf-8"
+    return encoding
+
+
+def is_decodable(content, encoding):
+    """Check whether content can be decoded.
+
+    Content may end within a multibyte character (e.g. a sample).
+
+    :param bytes content: content
+    :param str encoding: character encoding
+
+    :returns: toggle
+    :rtype: bool
+    """
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(content)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def detect(content):
+    """Detect character encoding of undeclared document that is not UTF-8.
+
+    The detector only sees a sample starting just before the first
+    non-ASCII byte, which is where the encodings differ.
+
+    :param bytes content: document
+
+    :returns: character encoding
+    :rtype: str
+    """
+    match = _NON_ASCII.search(content)
+    if charset_normalizer is not None and match:
+        start = max(match.start() - PREFIX_SIZE, 0)
+        best = charset_normalizer.from_bytes(
+            content[start:start + SAMPLE_SIZE]
+        ).best()
+        if best is not None:
+            encoding = normalize(best.encoding)
+            if encoding:
+                return encoding
+    return DEFAULT
+
+
+def get_charset(content, content_type=None, host=None):
+    """Get character encoding of document.
+
+    :param bytes content: document
+    :param content_type: HTTP Content-Type header
+    :type: str or None
+    :param host: host the document was retrieved from
+    :type: str or None
+
+    :returns: character encoding
+    :rtype: str
+    """
+    encoding = (
+        get_bom_charset(content)
+        or get_http_charset(content_type)
+        or get_meta_charset(content)
+    )
+    if encoding:
+        return encoding
+    if not _NON_ASCII.search(content) or is_decodable(content, "utf-8"):
+        return "utf-8"
+    with _lock:
+        encoding = _hosts.get(host)
+    if encoding and is_decodable(content[:SAMPLE_SIZE], encoding):
+        return encoding
+    encoding = detect(content)
+    if host:
+        with _lock:
+            if host not in _hosts and len(_hosts) >= CACHE_SIZE:
+                del _hosts[next(iter(_hosts))]
+            _hosts[host] = encoding
+    return encoding
+
+
+def decode(response):
+    """Decode body of HTTP response.
+
+    :param Response response: HTTP response
+
+    :returns: document
+    :rtype: str
+    """
+    content = response.content or b""
+    if isinstance(content, str):
+        return content
+    host = urllib.parse.urlsplit(response.url or "").hostname
+    encoding = get_charset(
+        content,
+        content_type=response.headers.get("Content-Type"),
+        host=host
+    )
+    text = content.decode(encoding, errors="replace")
+    if text.startswith("\ufeff"):
+        text = text[1:]
+    return text
+
+
+def clear_cache():
+    """Clear per-host cache of detected character encodings."""
+    with _lock:
+        _hosts.clear()
+    return
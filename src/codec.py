@@ -0,0 +1,73 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: JSON codec.
+
+orjson is used if it is installed, otherwise the standard library json
+module. Either backend can be selected explicitly with set_backend.
+"""
+
+
+# standard library imports
+import json
+
+# third party imports
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# library specific imports
+
+
+def _dumps_orjson(obj):
+    """Serialize obj to JSON formatted string with orjson.
+
+    :param obj: object
+
+    :returns: JSON formatted string
+    :rtype: str
+    """
+    return orjson.dumps(obj).decode()
+
+
+_backends = {
+    "json": (json.dumps, json.loads)
+}
+if orjson:
+    _backends["orjson"] = (_dumps_orjson, orjson.loads)
+
+
+backend = "orjson" if orjson else "json"
+dumps, loads = _backends[backend]
+
+
+def set_backend(name):
+    """Set JSON codec backend.
+
+    :param str name: name of backend ('json' or 'orjson')
+    """
+    global backend, dumps, loads
+    try:
+        dumps, loads = _backends[name]
+        backend = name
+    except KeyError as exception:
+        raise RuntimeError(
+            "JSON codec backend {name} is not available".format(name=name)
+        ) from exception
+    return
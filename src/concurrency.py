@@ -0,0 +1,156 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Adaptive per-host concurrency.
+
+The number of requests in flight to a host is controlled AIMD-style:
+every response within latency_tolerance times the host's baseline
+latency increases the limit additively (by one per limit responses),
+429 and 503 responses, failed requests and slow responses decrease it
+multiplicatively (at most once per round trip). Changes of the limit
+are recorded as scrape.limit events with the flag increase or decrease.
+"""
+
+
+# standard library imports
+import time
+import threading
+
+# third party imports
+# library specific imports
+import src.metrics
+
+
+CONCURRENCY = {
+    "workers": 8,
+    "initial_limit": 2.0,
+    "min_limit": 1.0,
+    "max_limit": 8.0,
+    "decrease": 0.5,
+    "latency_tolerance": 3.0
+}
+CONGESTION_STATUS_CODES = (429, 503)
+
+
+class AdaptiveLimit(object):
+    """AIMD limit of requests in flight to a host.
+
+    :ivar str host: host
+    :ivar float limit: limit
+    :ivar float min_limit: minimum limit
+    :ivar float max_limit: maximum limit
+    :ivar float decrease: factor of multiplicative decrease
+    :ivar float latency_tolerance: tolerated latency relative to baseline
+    :ivar float baseline: baseline latency in seconds
+    """
+
+    def __init__(
+            self, host, initial_limit=2.0, min_limit=1.0, max_limit=8.0,
+            decrease=0.5, latency_tolerance=3.0
+    ):
+        """Initialize AIMD limit of requests in flight to a host.
+
+        :param str host: host
+        :param float initial_limit: initial limit
+        :param float min_limit: minimum limit
+        :param float max_limit: maximum limit
+        :param float decrease: factor of multiplicative decrease
+        :param float latency_tolerance: tolerated latency relative to
+            baseline
+        """
+        try:
+            if not 0 < decrease < 1:
+                raise ValueError("decrease not in (0, 1)")
+            if not 1 <= min_limit <= max_limit:
+                raise ValueError("min_limit not in [1, max_limit]")
+            self.host = host
+            self.min_limit = min_limit
+            self.max_limit = max_limit
+            self.limit = min(max(initial_limit, min_limit), max_limit)
+            self.decrease = decrease
+            self.latency_tolerance = latency_tolerance
+            self.baseline = None
+            self._decreased = 0.0
+            self._lock = threading.Lock()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to initialize adaptive limit"
+            ) from exception
+        return
+
+    def get_limit(self):
+        """Get number of requests that may be in flight.
+
+        :returns: limit
+        :rtype: int
+        """
+        return int(self.limit)
+
+    def _is_congested(self, latency, status_code):
+        """Check whether response signals congestion.
+
+        :param float latency: latency in seconds (None if the request
+            failed)
+        :param int status_code: status code (None if the request failed)
+
+        :returns: toggle
+        :rtype: bool
+        """
+        if latency is None or status_code in CONGESTION_STATUS_CODES:
+            return True
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += (latency - self.baseline) * 0.01
+        return latency > self.baseline * self.latency_tolerance
+
+    def update(self, started, latency=None, status_code=None):
+        """Update limit with observed response.
+
+        Responses to requests started before the last decrease do not
+        decrease the limit again.
+
+        :param float started: start of request (monotonic clock)
+        :param float latency: latency in seconds (None if the request
+            failed)
+        :param int status_code: status code (None if the request failed)
+
+        :returns: limit
+        :rtype: int
+        """
+        with self._lock:
+            previous = self.limit
+            if self._is_congested(latency, status_code):
+                if started < self._decreased:
+                    return int(self.limit)
+                self.limit = max(self.limit * self.decrease, self.min_limit)
+                self._decreased = time.monotonic()
+                flag = "decrease"
+            else:
+                self.limit = min(
+                    self.limit + 1 / self.limit, self.max_limit
+                )
+                flag = "increase"
+            limit = self.limit
+        if int(limit) != int(previous):
+            src.metrics.event(
+                "scrape.limit", host=self.host, flag=flag,
+                limit=int(limit), previous=int(previous),
+                latency=latency, status_code=status_code
+            )
+        return int(limit)
@@ -21,9 +21,14 @@
 
 
 # standard library imports
+import os
+import ssl
+import time
 import logging
 import smtplib
 import datetime
+import threading
+import collections
 import email.mime.text
 import email.mime.multipart
 
@@ -48,17 +53,87 @@ def _load_templates(path="templates"):
     return loader
 
 
+_environments = {}
+
+
+def create_environment(
+        path="templates", cache_size=50, auto_reload=True,
+        bytecode_cache=None
+):
+    """Create email template environment.
+
+    Compiled templates are kept in a bounded LRU cache. If auto_reload is
+    set, cached templates are recompiled once the modification time of the
+    template file changes.
+
+    :param str path: email template directory
+    :param int cache_size: maximum number of cached templates
+    :param bool auto_reload: check template files for modifications
+    :param str bytecode_cache: on-disk bytecode cache directory if any
+
+    :returns: email template environment
+    :rtype: Environment
+    """
+    try:
+        if bytecode_cache:
+            os.makedirs(bytecode_cache, exist_ok=True)
+            bytecode_cache = jinja2.FileSystemBytecodeCache(bytecode_cache)
+        environment = jinja2.Environment(
+            loader=_load_templates(path=path),
+            cache_size=cache_size,
+            auto_reload=auto_reload,
+            bytecode_cache=bytecode_cache or None
+        )
+    except Exception as exception:
+        raise RuntimeError(
+            "failed to create email template environment"
+        ) from exception
+    return environment
+
+
+def set_environment(environment, path="templates"):
+    """Set email template environment.
+
+    :param Environment environment: email template environment
+    :param str path: email template directory
+    """
+    _environments[path] = environment
+    return
+
+
+def get_environment(path="templates"):
+    """Get email template environment.
+
+    The environment is created on first use and shared afterwards.
+
+    :param str path: email template directory
+
+    :returns: email template environment
+    :rtype: Environment
+    """
+    try:
+        if path not in _environments:
+            set_environment(create_environment(path=path), path=path)
+        environment = _environments[path]
+    except Exception as exception:
+        raise RuntimeError(
+            "failed to get email template environment"
+        ) from exception
+    return environment
+
+
 def load_template(name, path="templates"):
     """Load email template.
 
     :param str name: name of email template
+    :param str path: email template directory
 
     :returns: email template
     :rtype: Template
     """
     try:
-        loader = _load_templates(path=path)
-        template = loader.load(jinja2.Environment(), name)
+        environment = get_environment(path=path)
+        template = environment.get_template(name)
     except Exception as exception:
         raise RuntimeError(
             "failed to load email template {name}".format(name=name)
@@ -137,8 +212,8 @@ def compose_msg(smtp, to_addrs, subject, body, attachment=None):
     :param str to_addrs: email recipient
     :param str subject: email subject
     :param MIMEText body: email body
-    :param attachment: email attachment if any
-    :type: MIMEText or None
+    :param attachment: email attachment(s) if any
+    :type: MIMEText or list or None
 
     :returns: email message
     :rtype: MIMEMultipart
@@ -147,7 +222,10 @@ def compose_msg(smtp, to_addrs, subject, body, attachment=None):
         msg = email.mime.multipart.MIMEMultipart()
         _add_header_fields(smtp, to_addrs, subject, msg)
         msg.attach(body)
-        if attachment:
+        if isinstance(attachment, list):
+            for item in attachment:
+                msg.attach(item)
+        elif attachment:
             msg.attach(attachment)
     except Exception as exception:
         raise RuntimeError(
@@ -156,21 +234,188 @@ def compose_msg(smtp, to_addrs, subject, body, attachment=None):
     return msg
 
 
-def sendmail(smtp, to_addrs, msg):
+def _disconnect(smtp_client):
+    """Close SMTP connection.
+
+    :param SMTP smtp_client: SMTP client
+    """
+    try:
+        smtp_client.quit()
+    except Exception:
+        smtp_client.close()
+    return
+
+
+class SMTPPool(object):
+    """Pool of persistent SMTP connections.
+
+    Idle connections are kept open for at most keepalive seconds and checked
+    with NOOP before they are reused, a dead one is replaced. Once the
+    transaction has started, an email is never sent once more, since the
+    server may have accepted it before the connection was lost.
+
+    :ivar ConfigParser smtp: SMTP configuration
+    :ivar int size: maximum number of idle connections
+    :ivar float keepalive: maximum idle time in seconds
+    """
+
+    def __init__(self, smtp, size=None, keepalive=None):
+        """Initialize pool of persistent SMTP connections.
+
+        :param ConfigParser smtp: SMTP configuration
+        :param int size: maximum number of idle connections
+        :param float keepalive: maximum idle time in seconds
+        """
+        try:
+            self.smtp = smtp
+            if size is None:
+                size = smtp["SMTP"].getint("pool_size", fallback=2)
+            self.size = size
+            if keepalive is None:
+                keepalive = smtp["SMTP"].getfloat("keepalive", fallback=60.0)
+            self.keepalive = keepalive
+            self._idle = collections.deque()
+            self._lock = threading.Lock()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to initialize pool of SMTP connections"
+            ) from exception
+        return
+
+    def connect(self):
+        """Open SMTP connection.
+
+        STARTTLS and authentication are used if configured.
+
+        :returns: SMTP client
+        :rtype: SMTP
+        """
+        try:
+            logger = logging.getLogger().getChild(self.connect.__name__)
+            section = self.smtp["SMTP"]
+            smtp_client = smtplib.SMTP(
+                host=section["host"],
+                port=section["port"],
+                timeout=section.getfloat("timeout", fallback=30.0)
+            )
+            if section.getboolean("starttls", fallback=False):
+                smtp_client.starttls(context=ssl.create_default_context())
+            if section.get("user"):
+                smtp_client.login(section["user"], section["password"])
+            logger.debug("opened SMTP connection to %s", section["host"])
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to open SMTP connection"
+            ) from exception
+        return smtp_client
+
+    @staticmethod
+    def _is_alive(smtp_client):
+        """Check SMTP connection with NOOP.
+
+        :param SMTP smtp_client: SMTP client
+
+        :returns: toggle
+        :rtype: bool
+        """
+        try:
+            alive = smtp_client.noop()[0] == 250
+        except Exception:
+            alive = False
+        return alive
+
+    def acquire(self):
+        """Acquire SMTP connection.
+
+        :returns: SMTP client
+        :rtype: SMTP
+        """
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    smtp_client, last_used = self._idle.pop()
+                idle = time.monotonic() - last_used
+                if idle <= self.keepalive and self._is_alive(smtp_client):
+                    return smtp_client
+                _disconnect(smtp_client)
+            smtp_client = self.connect()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to acquire SMTP connection"
+            ) from exception
+        return smtp_client
+
+    def release(self, smtp_client):
+        """Release SMTP connection.
+
+        :param SMTP smtp_client: SMTP client
+        """
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((smtp_client, time.monotonic()))
+                return
+        _disconnect(smtp_client)
+        return
+
+    def sendmail(self, to_addrs, msg):
+        """Send email.
+
+        :param str to_addrs: email recipient
+        :param str msg: email message
+        """
+        try:
+            from_addr = self.smtp["header_fields"]["from"]
+            smtp_client = self.acquire()
+            try:
+                smtp_client.sendmail(from_addr, to_addrs, msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                smtp_client.close()
+                raise
+            except Exception:
+                _disconnect(smtp_client)
+                raise
+            self.release(smtp_client)
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to send email"
+            ) from exception
+        return
+
+    def close(self):
+        """Close idle SMTP connections."""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for smtp_client, _ in idle:
+            _disconnect(smtp_client)
+        return
+
+
+def sendmail(smtp, to_addrs, msg, pool=None):
     """Send email.
 
     :param ConfigParser smtp: SMTP configuration file
     :param str to_addrs: email recipient
     :param MIMEMultipart msg: email message
+    :param pool: pool of SMTP connections if any
+    :type: SMTPPool or None
     """
     try:
         logger = logging.getLogger().getChild(sendmail.__name__)
-        smtp_client = smtplib.SMTP(
-            host=smtp["SMTP"]["host"], port=smtp["SMTP"]["port"]
-        )
-        smtp_client.sendmail(
-            smtp["header_fields"]["from"], to_addrs, msg.as_string()
-        )
+        if pool:
+            pool.sendmail(to_addrs, msg.as_string())
+        else:
+            smtp_client = smtplib.SMTP(
+                host=smtp["SMTP"]["host"], port=smtp["SMTP"]["port"]
+            )
+            try:
+                smtp_client.sendmail(
+                    smtp["header_fields"]["from"], to_addrs, msg.as_string()
+                )
+            finally:
+                _disconnect(smtp_client)
         logger.info("sent email to %s", to_addrs)
     except Exception as exception:
         raise RuntimeError(
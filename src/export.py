@@ -0,0 +1,295 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Metadata export formats.
+"""
+
+
+# standard library imports
+import re
+import json
+import collections
+
+# third party imports
+# library specific imports
+
+
+Format = collections.namedtuple("Format", ["render", "filename"])
+
+
+_formats = collections.OrderedDict()
+
+
+_PUBLICATION_DATE = re.compile("([0-9]{4})([0-9]{2})([0-9]{2})")
+
+
+_BIBTEX_SPECIAL = re.compile(r"([\\&%$#_{}])")
+
+
+_RIS_FIELD = "{tag}  - {value}\n"
+
+
+_CSL_TYPES = {
+    "BLOG": "post-weblog",
+    "ELEC": "webpage",
+    "NEWS": "article-newspaper",
+    "VIDEO": "motion_picture"
+}
+
+
+def register(name, render, filename):
+    """Register metadata export format.
+
+    :param str name: name of export format
+    :param callable render: function rendering metadata and ticket ID to str
+    :param str filename: attachment filename
+    """
+    _formats[name] = Format(render, filename)
+    return
+
+
+def get_format(name):
+    """Get metadata export format.
+
+    :param str name: name of export format
+
+    :returns: metadata export format
+    :rtype: Format
+    """
+    try:
+        format_ = _formats[name]
+    except KeyError as exception:
+        raise ValueError(
+            "unknown export format {name}".format(name=name)
+        ) from exception
+    return format_
+
+
+def render(name, metadata, id_=""):
+    """Render metadata.
+
+    :param str name: name of export format
+    :param dict metadata: WARC archive metadata
+    :param str id_: ticket ID
+
+    :returns: rendered metadata
+    :rtype: str
+    """
+    try:
+        text = get_format(name).render(metadata, id_)
+    except Exception as exception:
+        raise RuntimeError(
+            "failed to render metadata as {name}".format(name=name)
+        ) from exception
+    return text
+
+
+def _split_date(value):
+    """Split publication date YYYYMMDD.
+
+    :param str value: publication date
+
+    :returns: year, month and day
+    :rtype: tuple
+    """
+    match = _PUBLICATION_DATE.match(value)
+    return match.group(1), match.group(2), match.group(3)
+
+
+def _prettyprint(value, level, parts):
+    """Append prettyprint of value to parts.
+
+    :param value: value
+    :param int level: level of nesting
+    :param list parts: prettyprint parts
+    """
+    if type(value) == dict:
+        for k, v in value.items():
+            index = len(parts)
+            parts.append("")
+            _prettyprint(v, level+1, parts)
+            if len(parts) > index+1:
+                parts[index] = "{level}{k}:\n".format(
+                    level=level*"-", k=k.title()
+                )
+            else:
+                parts.pop()
+    elif type(value) == list:
+        for v in value:
+            _prettyprint(v, level+1, parts)
+    elif type(value) == str:
+        if value:
+            parts.append("{level}{v}\n".format(level=level*"-", v=value))
+    return
+
+
+def render_plaintext(metadata, id_=""):
+    """Render metadata as indented plaintext.
+
+    :param dict metadata: WARC archive metadata
+    :param str id_: ticket ID
+
+    :returns: plaintext
+    :rtype: str
+    """
+    parts = []
+    _prettyprint(metadata, 0, parts)
+    return "".join(parts)
+
+
+def render_ris(metadata, id_=""):
+    """Render metadata as RIS.
+
+    RIS file format see https://en.wikipedia.org/wiki/RIS_(file_format)
+
+    :param dict metadata: WARC archive metadata
+    :param str id_: ticket ID
+
+    :returns: RIS
+    :rtype: str
+    """
+    field = _RIS_FIELD.format
+    parts = [field(tag="TY", value=metadata["resourceType"])]
+    for count, creator in enumerate(metadata["creator"]):
+        parts.append(
+            field(tag="A{}".format(count), value=creator["romanization"])
+        )
+    date = _split_date(metadata["publicationDate"])
+    parts.append(field(tag="DA", value="/".join(date)))
+    for key in ("subjectHeading", "personHeading"):
+        for keyword in metadata[key]:
+            if keyword:
+                parts.append(field(tag="KW", value=keyword))
+    parts.append(field(tag="PB", value=metadata["publisher"]["romanization"]))
+    parts.append(field(tag="T1", value=metadata["title"]["romanization"]))
+    if metadata["title"]["script"]:
+        parts.append(field(tag="T2", value=metadata["title"]["script"]))
+    parts.append(field(tag="UR", value=metadata["url"]))
+    return "".join(parts)
+
+
+def _escape_bibtex(value):
+    """Escape BibTeX special characters.
+
+    :param str value: value
+
+    :returns: escaped value
+    :rtype: str
+    """
+    return _BIBTEX_SPECIAL.sub(r"\\\1", value)
+
+
+def render_bibtex(metadata, id_=""):
+    """Render metadata as BibTeX @misc entry.
+
+    :param dict metadata: WARC archive metadata
+    :param str id_: ticket ID
+
+    :returns: BibTeX
+    :rtype: str
+    """
+    fields = []
+    title = metadata.get("title") or {}
+    if title.get("romanization"):
+        fields.append(("title", title["romanization"]))
+    authors = [
+        creator["romanization"] for creator in metadata.get("creator", [])
+        if creator.get("romanization")
+    ]
+    if authors:
+        fields.append(("author", " and ".join(authors)))
+    if metadata.get("publicationDate"):
+        year, month, day = _split_date(metadata["publicationDate"])
+        fields.append(("year", year))
+        fields.append(("month", month))
+        fields.append(("day", day))
+    publisher = metadata.get("publisher") or {}
+    if publisher.get("romanization"):
+        fields.append(("publisher", publisher["romanization"]))
+    keywords = [
+        keyword
+        for key in ("subjectHeading", "personHeading")
+        for keyword in metadata.get(key, [])
+        if keyword
+    ]
+    if keywords:
+        fields.append(("keywords", ", ".join(keywords)))
+    if metadata.get("url"):
+        fields.append(("url", metadata["url"]))
+    parts = ["@misc{{{id},\n".format(id=id_)]
+    parts.append(",\n".join(
+        "  {key} = {{{value}}}".format(
+            key=key,
+            value=value if key == "url" else _escape_bibtex(value)
+        )
+        for key, value in fields
+    ))
+    parts.append("\n}\n")
+    return "".join(parts)
+
+
+def render_csl_json(metadata, id_=""):
+    """Render metadata as CSL-JSON.
+
+    :param dict metadata: WARC archive metadata
+    :param str id_: ticket ID
+
+    :returns: CSL-JSON
+    :rtype: str
+    """
+    item = collections.OrderedDict(
+        [
+            ("id", id_),
+            ("type", _CSL_TYPES.get(metadata.get("resourceType"), "webpage"))
+        ]
+    )
+    title = metadata.get("title") or {}
+    if title.get("romanization"):
+        item["title"] = title["romanization"]
+    if title.get("script"):
+        item["original-title"] = title["script"]
+    authors = [
+        {"literal": creator["romanization"]}
+        for creator in metadata.get("creator", [])
+        if creator.get("romanization")
+    ]
+    if authors:
+        item["author"] = authors
+    if metadata.get("publicationDate"):
+        date = _split_date(metadata["publicationDate"])
+        item["issued"] = {"date-parts": [[int(part) for part in date]]}
+    publisher = metadata.get("publisher") or {}
+    if publisher.get("romanization"):
+        item["publisher"] = publisher["romanization"]
+    keywords = [
+        keyword
+        for key in ("subjectHeading", "personHeading")
+        for keyword in metadata.get(key, [])
+        if keyword
+    ]
+    if keywords:
+        item["keyword"] = ", ".join(keywords)
+    if metadata.get("url"):
+        item["URL"] = metadata["url"]
+    return json.dumps([item], ensure_ascii=False)
+
+
+register("plaintext", render_plaintext, "info.txt")
+register("ris", render_ris, "info.ris")
+register("bibtex", render_bibtex, "info.bib")
+register("csl_json", render_csl_json, "info.json")
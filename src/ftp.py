@@ -32,13 +32,20 @@ import tempfile
 def get_ftp_client(ftp):
     """Get FTP client.
 
+    The port is optional (default 21).
+
     :param ConfigParser ftp: FTP configuration
 
     :returns: FTP client
     :rtype: FTP_TLS
     """
     try:
-        ftp_client = ftplib.FTP_TLS(**ftp["FTP"])
+        kwargs = dict(ftp["FTP"])
+        host = kwargs.pop("host")
+        port = kwargs.pop("port", "")
+        ftp_client = ftplib.FTP_TLS()
+        ftp_client.connect(host=host, port=int(port) if port else 0)
+        ftp_client.login(**kwargs)
         ftp_client.prot_p()
     except Exception as exception:
         raise RuntimeError(
@@ -68,10 +75,16 @@ def retrieve_file(ftp_client, filename):
     return fp.name
 
 
-def retrieve_files(ftp):
+def retrieve_files(ftp, leases=None):
     """Retrieve files.
 
+    If there are work-claiming leases, a file is only retrieved if its
+    lease can be claimed, so that ticket managers running in parallel do
+    not retrieve the same file.
+
     :param ConfigParser ftp: FTP configuration
+    :param leases: work-claiming leases
+    :type: Leases or None
 
     :returns: list of local file filenames
     :rtype: str
@@ -81,10 +94,17 @@ def retrieve_files(ftp):
         ftp_client = get_ftp_client(ftp)
         filenames = []
         for filename in ftp_client.nlst(ftp["cmd"]["RETR"]):
+            key = "ftp:{}".format(filename)
+            if leases is not None and not leases.claim(key):
+                logger.info("file %s is claimed", filename)
+                continue
             try:
                 filenames.append(retrieve_file(ftp_client, filename))
             except Exception as exception:
                 logger.warning("failed to retrieve file %s", filename)
+            finally:
+                if leases is not None:
+                    leases.release(key)
     except Exception as exception:
         raise RuntimeError(
             "failed to retrieve files"
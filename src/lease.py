@@ -0,0 +1,346 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Work-claiming leases.
+"""
+
+
+# standard library imports
+import os
+import time
+import socket
+import logging
+import threading
+
+# third party imports
+# library specific imports
+import src.sqlite
+
+
+class Leases(object):
+    """Work-claiming leases.
+
+    The leases are a table in the OpenDACHS database. A lease is held by
+    an owner (host name and process ID) until it expires; expired leases
+    of crashed owners can be claimed by any other owner. Claims are atomic
+    (BEGIN IMMEDIATE), so several ticket managers on one host, or on hosts
+    sharing a file system with working POSIX locks, do not process the
+    same ticket file or ticket twice.
+
+    :ivar ConfigParser sqlite: SQLite configuration
+    :ivar str table: table
+    :ivar float ttl: time to live in seconds
+    :ivar float wait: time to wait for leases held by other owners in
+        seconds
+    :ivar str owner: owner
+    :ivar set held: keys of leases held
+    """
+
+    def __init__(self, sqlite, owner=None):
+        """Initialize work-claiming leases.
+
+        :param ConfigParser sqlite: SQLite configuration
+        :param str owner: owner (default host name and process ID)
+        """
+        try:
+            self.sqlite = sqlite
+            leases = sqlite["leases"]
+            self.table = leases.get("table", fallback="leases")
+            self.ttl = leases.getfloat("ttl", fallback=300.0)
+            self.wait = leases.getfloat("wait", fallback=60.0)
+            if owner is None:
+                owner = "{}:{}".format(socket.gethostname(), os.getpid())
+            self.owner = owner
+            self.held = set()
+            self._lock = threading.Lock()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to initialize work-claiming leases"
+            ) from exception
+        return
+
+    def connect(self):
+        """Connect to OpenDACHS database.
+
+        :returns: connection
+        :rtype: Connection
+        """
+        return src.sqlite.SQLiteClient(self.sqlite).connect()
+
+    def create_table(self):
+        """Create table if not exists."""
+        try:
+            connection = self.connect()
+            sql = (
+                "CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, "
+                "owner TEXT, "
+                "expires REAL)"
+            ).format(table=self.table)
+            connection.execute(sql)
+            connection.commit()
+            connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to create work-claiming lease table"
+            ) from exception
+        return
+
+    def claim(self, key, ttl=None):
+        """Claim lease if it is free, expired or already held.
+
+        :param str key: key
+        :param float ttl: time to live in seconds (default ttl)
+
+        :returns: toggle (whether the lease was claimed)
+        :rtype: bool
+        """
+        try:
+            now = time.time()
+            expires = now + (self.ttl if ttl is None else ttl)
+            connection = self.connect()
+            connection.isolation_level = None
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                sql = "SELECT owner, expires FROM {table} WHERE key = ?"
+                sql = sql.format(table=self.table)
+                row = connection.execute(sql, (key,)).fetchone()
+                if row is None:
+                    sql = (
+                        "INSERT INTO {table} (key, owner, expires) "
+                        "VALUES (?, ?, ?)"
+                    ).format(table=self.table)
+                    connection.execute(sql, (key, self.owner, expires))
+                    claimed = True
+                elif row["owner"] == self.owner or row["expires"] <= now:
+                    sql = (
+                        "UPDATE {table} SET owner = ?, expires = ? "
+                        "WHERE key = ?"
+                    ).format(table=self.table)
+                    connection.execute(sql, (self.owner, expires, key))
+                    claimed = True
+                else:
+                    claimed = False
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            finally:
+                connection.close()
+            if claimed:
+                with self._lock:
+                    self.held.add(key)
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to claim lease {key}".format(key=key)
+            ) from exception
+        return claimed
+
+    def acquire(self, key, timeout=None, interval=1.0):
+        """Claim lease, waiting for it to be released or to expire.
+
+        :param str key: key
+        :param float timeout: timeout in seconds (default wait)
+        :param float interval: poll interval in seconds
+
+        :returns: toggle (whether the lease was claimed)
+        :rtype: bool
+        """
+        if timeout is None:
+            timeout = self.wait
+        deadline = time.monotonic() + timeout
+        while not self.claim(key):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(min(interval, max(deadline - time.monotonic(), 0)))
+        return True
+
+    def claim_many(self, keys, timeout=None, interval=1.0):
+        """Claim leases, waiting for leases held by other owners until a
+        deadline shared by all leases.
+
+        :param list keys: keys
+        :param float timeout: timeout in seconds (default wait)
+        :param float interval: poll interval in seconds
+
+        :returns: keys of leases claimed
+        :rtype: set
+        """
+        if timeout is None:
+            timeout = self.wait
+        deadline = time.monotonic() + timeout
+        claimed = set()
+        pending = list(keys)
+        while True:
+            held = []
+            for key in pending:
+                if self.claim(key):
+                    claimed.add(key)
+                else:
+                    held.append(key)
+            pending = held
+            remaining = deadline - time.monotonic()
+            if not pending or remaining <= 0:
+                break
+            time.sleep(min(interval, remaining))
+        return claimed
+
+    def renew(self, key, ttl=None):
+        """Renew lease held.
+
+        :param str key: key
+        :param float ttl: time to live in seconds (default ttl)
+
+        :returns: toggle (whether the lease is still held)
+        :rtype: bool
+        """
+        try:
+            expires = time.time() + (self.ttl if ttl is None else ttl)
+            connection = self.connect()
+            sql = (
+                "UPDATE {table} SET expires = ? WHERE key = ? AND owner = ?"
+            ).format(table=self.table)
+            cursor = connection.execute(sql, (expires, key, self.owner))
+            renewed = cursor.rowcount == 1
+            connection.commit()
+            connection.close()
+            if not renewed:
+                with self._lock:
+                    self.held.discard(key)
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to renew lease {key}".format(key=key)
+            ) from exception
+        return renewed
+
+    def release(self, key):
+        """Release lease held.
+
+        :param str key: key
+        """
+        try:
+            connection = self.connect()
+            sql = "DELETE FROM {table} WHERE key = ? AND owner = ?"
+            sql = sql.format(table=self.table)
+            connection.execute(sql, (key, self.owner))
+            connection.commit()
+            connection.close()
+            with self._lock:
+                self.held.discard(key)
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to release lease {key}".format(key=key)
+            ) from exception
+        return
+
+    def renew_all(self):
+        """Renew all leases held.
+
+        :returns: keys of leases lost
+        :rtype: list
+        """
+        with self._lock:
+            keys = sorted(self.held)
+        return [key for key in keys if not self.renew(key)]
+
+    def release_all(self):
+        """Release all leases held."""
+        with self._lock:
+            keys = sorted(self.held)
+        for key in keys:
+            self.release(key)
+        return
+
+    def get_owner(self, key):
+        """Get owner of lease if it has not expired.
+
+        :param str key: key
+
+        :returns: owner or None
+        :rtype: str or None
+        """
+        try:
+            connection = self.connect()
+            sql = (
+                "SELECT owner FROM {table} WHERE key = ? AND expires > ?"
+            ).format(table=self.table)
+            row = connection.execute(sql, (key, time.time())).fetchone()
+            connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to get owner of lease {key}".format(key=key)
+            ) from exception
+        return row["owner"] if row else None
+
+
+class LeaseKeeper(object):
+    """Background thread renewing the leases held.
+
+    :ivar Leases leases: work-claiming leases
+    :ivar float interval: renewal interval in seconds
+    """
+
+    def __init__(self, leases, interval=None):
+        """Initialize background thread renewing the leases held.
+
+        :param Leases leases: work-claiming leases
+        :param float interval: renewal interval in seconds (default a
+            third of the time to live)
+        """
+        try:
+            self.leases = leases
+            if interval is None:
+                interval = leases.ttl / 3
+            self.interval = interval
+            self._stopping = threading.Event()
+            self._thread = None
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to initialize lease keeper"
+            ) from exception
+        return
+
+    def _run(self):
+        """Renew leases held until stopped."""
+        logger = logging.getLogger().getChild(self._run.__name__)
+        while not self._stopping.wait(self.interval):
+            try:
+                for key in self.leases.renew_all():
+                    logger.warning("lost lease %s", key)
+            except Exception:
+                logger.exception("failed to renew leases")
+        return
+
+    def start(self):
+        """Start renewing leases."""
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        return
+
+    def stop(self, timeout=None):
+        """Stop renewing leases.
+
+        :param float timeout: timeout in seconds
+        """
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        return
@@ -0,0 +1,305 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Timing spans.
+
+Spans time stages of the ticket lifecycle (FTP retrieval, JSON parse,
+scrape, SQLite, Webrecorder API call, email composition and SMTP send).
+Spans are tagged, nested spans inherit the tags (e.g. ticket ID and flag)
+of the enclosing span of the same thread. Events (e.g. changes of the
+adaptive per-host concurrency limit) are recorded as spans without
+duration. Recording is disabled by default; recorded spans can be
+exported as JSON lines or as Prometheus text file for the node_exporter
+textfile collector.
+"""
+
+
+# standard library imports
+import os
+import time
+import threading
+import functools
+import contextlib
+import collections
+
+# third party imports
+# library specific imports
+import src.codec
+
+
+PROMETHEUS_LABELS = ("stage", "flag")
+
+enabled = False
+_spans = []
+_lock = threading.Lock()
+_stacks = {}
+_listeners = []
+
+
+def enable(toggle=True):
+    """Enable (or disable) recording of spans.
+
+    :param bool toggle: toggle
+    """
+    global enabled
+    enabled = toggle
+    return
+
+
+def reset():
+    """Discard recorded spans."""
+    with _lock:
+        del _spans[:]
+    return
+
+
+def add_listener(listener):
+    """Add span listener.
+
+    The listener's enter and exit methods are called with stage and tags
+    whenever a span is entered or exited (only while recording is enabled).
+
+    :param listener: span listener
+    """
+    _listeners.append(listener)
+    return
+
+
+def remove_listener(listener):
+    """Remove span listener.
+
+    :param listener: span listener
+    """
+    _listeners.remove(listener)
+    return
+
+
+def get_tags(ident=None):
+    """Get tags of innermost span of thread.
+
+    :param int ident: thread identifier (default current thread)
+
+    :returns: tags
+    :rtype: dict
+    """
+    if ident is None:
+        ident = threading.get_ident()
+    stack = _stacks.get(ident)
+    if not stack:
+        return {}
+    return stack[-1]
+
+
+def get_threads():
+    """Get identifiers of threads within a span.
+
+    :returns: thread identifiers
+    :rtype: list
+    """
+    return list(_stacks)
+
+
+def get_spans():
+    """Get recorded spans.
+
+    :returns: spans
+    :rtype: list
+    """
+    with _lock:
+        spans = list(_spans)
+    return spans
+
+
+@contextlib.contextmanager
+def span(stage, **tags):
+    """Time stage.
+
+    The span's tags are yielded, so that tags known only within the
+    stage (e.g. the ticket ID of a parsed ticket file) can be added.
+
+    :param str stage: stage
+    :param tags: tags
+    """
+    if not enabled:
+        yield tags
+        return
+    ident = threading.get_ident()
+    stack = _stacks.setdefault(ident, [])
+    if stack:
+        tags = dict(stack[-1], **tags)
+    stack.append(tags)
+    for listener in _listeners:
+        listener.enter(stage, tags)
+    timestamp = time.time()
+    start = time.perf_counter()
+    error = False
+    try:
+        yield tags
+    except BaseException:
+        error = True
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        for listener in _listeners:
+            listener.exit(stage, tags)
+        stack.pop()
+        if not stack:
+            _stacks.pop(ident, None)
+        record = dict(
+            tags, stage=stage, timestamp=timestamp, duration=duration,
+            error=error
+        )
+        with _lock:
+            _spans.append(record)
+
+
+def event(stage, **tags):
+    """Record event (span without duration), e.g. a change of a limit.
+
+    The event inherits the tags of the innermost span of the thread.
+
+    :param str stage: stage
+    :param tags: tags
+    """
+    if not enabled:
+        return
+    stack = _stacks.get(threading.get_ident())
+    if stack:
+        tags = dict(stack[-1], **tags)
+    record = dict(
+        tags, stage=stage, timestamp=time.time(), duration=0.0, error=False
+    )
+    with _lock:
+        _spans.append(record)
+    return
+
+
+def timed(stage):
+    """Decorate function to be timed as stage.
+
+    :param str stage: stage
+
+    :returns: decorator
+    :rtype: callable
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def write_jsonl(filename, spans=None):
+    """Append spans to JSON lines file.
+
+    :param str filename: filename
+    :param list spans: spans (default recorded spans)
+    """
+    try:
+        if spans is None:
+            spans = get_spans()
+        with open(filename, mode="a") as fp:
+            for record in spans:
+                fp.write(src.codec.dumps(record))
+                fp.write("\n")
+    except Exception as exception:
+        raise RuntimeError(
+            "failed to write spans to {}".format(filename)
+        ) from exception
+    return
+
+
+def _get_labels(record):
+    """Get Prometheus labels of span.
+
+    :param dict record: span
+
+    :returns: labels
+    :rtype: str
+    """
+    return ",".join(
+        '{key}="{value}"'.format(
+            key=key,
+            value=str(record[key]).replace("\\", "\\\\").replace('"', '\\"')
+        )
+        for key in PROMETHEUS_LABELS if record.get(key) is not None
+    )
+
+
+def write_prometheus(filename, spans=None):
+    """Write spans aggregated by stage and flag as Prometheus text file.
+
+    The file is replaced atomically, as required by the node_exporter
+    textfile collector. Ticket IDs are not used as labels.
+
+    :param str filename: filename
+    :param list spans: spans (default recorded spans)
+    """
+    try:
+        if spans is None:
+            spans = get_spans()
+        aggregates = collections.OrderedDict()
+        for record in spans:
+            labels = _get_labels(record)
+            aggregate = aggregates.setdefault(labels, [0.0, 0, 0])
+            aggregate[0] += record["duration"]
+            aggregate[1] += 1
+            aggregate[2] += int(record["error"])
+        lines = [
+            "# HELP opendachs_stage_duration_seconds "
+            "Time spent in ticket lifecycle stage.",
+            "# TYPE opendachs_stage_duration_seconds summary"
+        ]
+        for labels, (total, count, _) in aggregates.items():
+            lines.append(
+                "opendachs_stage_duration_seconds_sum{{{}}} {}".format(
+                    labels, repr(total)
+                )
+            )
+            lines.append(
+                "opendachs_stage_duration_seconds_count{{{}}} {}".format(
+                    labels, count
+                )
+            )
+        lines.extend([
+            "# HELP opendachs_stage_errors_total "
+            "Failed ticket lifecycle stages.",
+            "# TYPE opendachs_stage_errors_total counter"
+        ])
+        for labels, (_, _, errors) in aggregates.items():
+            lines.append("opendachs_stage_errors_total{{{}}} {}".format(
+                labels, errors
+            ))
+        lines.extend([
+            "# HELP opendachs_last_run_timestamp_seconds "
+            "End of last ticket management run.",
+            "# TYPE opendachs_last_run_timestamp_seconds gauge",
+            "opendachs_last_run_timestamp_seconds {}".format(
+                repr(time.time())
+            )
+        ])
+        with open("{}.tmp".format(filename), mode="w") as fp:
+            fp.write("\n".join(lines) + "\n")
+        os.replace("{}.tmp".format(filename), filename)
+    except Exception as exception:
+        raise RuntimeError(
+            "failed to write spans to {}".format(filename)
+        ) from exception
+    return
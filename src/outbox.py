@@ -0,0 +1,401 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Outbound email queue.
+"""
+
+
+# standard library imports
+import os
+import time
+import random
+import socket
+import logging
+import threading
+
+# third party imports
+# library specific imports
+import src.email
+import src.sqlite
+
+
+class Outbox(object):
+    """Durable outbound email queue.
+
+    The queue is a table in the OpenDACHS database. An email is either
+    'queued' (waiting to be sent, possibly after a failed attempt),
+    'sending' (claimed by a sender) or 'dead' (given up on after
+    max_attempts attempts). Claims record the owner (host name and
+    process ID) and time; claims older than lease_timeout are considered
+    abandoned by a crashed sender.
+
+    :ivar ConfigParser sqlite: SQLite configuration
+    :ivar str table: table
+    :ivar int max_attempts: maximum number of attempts
+    :ivar float backoff: delay after first failed attempt in seconds
+    :ivar float max_backoff: maximum delay in seconds
+    :ivar float lease_timeout: time after which a claim is considered
+        abandoned in seconds
+    :ivar str owner: owner
+    """
+
+    def __init__(self, sqlite, owner=None):
+        """Initialize outbound email queue.
+
+        :param ConfigParser sqlite: SQLite configuration
+        :param str owner: owner (default host name and process ID)
+        """
+        try:
+            self.sqlite = sqlite
+            outbox = sqlite["outbox"]
+            self.table = outbox.get("table", fallback="outbox")
+            self.max_attempts = outbox.getint("max_attempts", fallback=5)
+            self.backoff = outbox.getfloat("backoff", fallback=60.0)
+            self.max_backoff = outbox.getfloat("max_backoff", fallback=3600.0)
+            self.lease_timeout = outbox.getfloat(
+                "lease_timeout", fallback=600.0
+            )
+            if owner is None:
+                owner = "{}:{}".format(socket.gethostname(), os.getpid())
+            self.owner = owner
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to initialize outbound email queue"
+            ) from exception
+        return
+
+    def connect(self):
+        """Connect to OpenDACHS database.
+
+        :returns: connection
+        :rtype: Connection
+        """
+        return src.sqlite.SQLiteClient(self.sqlite).connect()
+
+    def create_table(self):
+        """Create table if not exists."""
+        try:
+            connection = self.connect()
+            sql = (
+                "CREATE TABLE IF NOT EXISTS {table} ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "to_addrs TEXT, "
+                "msg TEXT, "
+                "status TEXT, "
+                "attempts INTEGER, "
+                "next_attempt REAL, "
+                "error TEXT, "
+                "owner TEXT, "
+                "claimed_at REAL)"
+            ).format(table=self.table)
+            connection.execute(sql)
+            sql = "PRAGMA table_info({table})".format(table=self.table)
+            columns = [row[1] for row in connection.execute(sql)]
+            for column, column_def in (
+                    ("owner", "TEXT"), ("claimed_at", "REAL")
+            ):
+                if column not in columns:
+                    sql = "ALTER TABLE {table} ADD COLUMN {column} {type}"
+                    connection.execute(
+                        sql.format(
+                            table=self.table, column=column, type=column_def
+                        )
+                    )
+            sql = (
+                "CREATE INDEX IF NOT EXISTS {table}_status "
+                "ON {table} (status, next_attempt)"
+            ).format(table=self.table)
+            connection.execute(sql)
+            connection.commit()
+            connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to create outbound email queue table"
+            ) from exception
+        return
+
+    def enqueue(self, to_addrs, msg):
+        """Enqueue email.
+
+        :param str to_addrs: email recipient
+        :param MIMEMultipart msg: email message
+        """
+        try:
+            connection = self.connect()
+            sql = (
+                "INSERT INTO {table} "
+                "(to_addrs, msg, status, attempts, next_attempt) "
+                "VALUES (?, ?, 'queued', 0, ?)"
+            ).format(table=self.table)
+            connection.execute(sql, (to_addrs, msg.as_string(), time.time()))
+            connection.commit()
+            connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to enqueue email"
+            ) from exception
+        return
+
+    def claim(self):
+        """Claim next email that is due.
+
+        :returns: ID, email recipient, email message and number of attempts
+        or None
+        :rtype: tuple or None
+        """
+        try:
+            connection = self.connect()
+            connection.isolation_level = None
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                sql = (
+                    "SELECT id, to_addrs, msg, attempts FROM {table} "
+                    "WHERE status = 'queued' AND next_attempt <= ? "
+                    "ORDER BY next_attempt LIMIT 1"
+                ).format(table=self.table)
+                row = connection.execute(sql, (time.time(),)).fetchone()
+                if row:
+                    row = tuple(row)
+                    sql = (
+                        "UPDATE {table} SET status = 'sending', owner = ?, "
+                        "claimed_at = ? WHERE id = ?"
+                    ).format(table=self.table)
+                    connection.execute(
+                        sql, (self.owner, time.time(), row[0])
+                    )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            finally:
+                connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to claim email"
+            ) from exception
+        return row
+
+    def mark_sent(self, id_):
+        """Remove sent email from queue.
+
+        :param int id_: ID
+        """
+        try:
+            connection = self.connect()
+            sql = "DELETE FROM {table} WHERE id = ?".format(table=self.table)
+            connection.execute(sql, (id_,))
+            connection.commit()
+            connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to mark email {id} as sent".format(id=id_)
+            ) from exception
+        return
+
+    def get_backoff(self, attempts):
+        """Get jittered exponential delay before next attempt.
+
+        :param int attempts: number of attempts
+
+        :returns: delay in seconds
+        :rtype: float
+        """
+        backoff = min(self.backoff * 2**(attempts-1), self.max_backoff)
+        return random.uniform(backoff/2, backoff)
+
+    def mark_failed(self, id_, attempts, error):
+        """Reschedule failed email or move it to dead letters.
+
+        :param int id_: ID
+        :param int attempts: number of attempts (including failed attempt)
+        :param str error: error message
+
+        :returns: status
+        :rtype: str
+        """
+        try:
+            if attempts >= self.max_attempts:
+                status = "dead"
+                next_attempt = None
+            else:
+                status = "queued"
+                next_attempt = time.time() + self.get_backoff(attempts)
+            connection = self.connect()
+            sql = (
+                "UPDATE {table} SET status = ?, attempts = ?, "
+                "next_attempt = ?, error = ? WHERE id = ?"
+            ).format(table=self.table)
+            connection.execute(
+                sql, (status, attempts, next_attempt, error, id_)
+            )
+            connection.commit()
+            connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to mark email {id} as failed".format(id=id_)
+            ) from exception
+        return status
+
+    def requeue_claimed(self):
+        """Requeue emails claimed by a sender that did not finish.
+
+        Only claims older than lease_timeout are requeued, emails claimed
+        more recently may be being sent by another ticket manager.
+
+        :returns: number of emails requeued
+        :rtype: int
+        """
+        try:
+            connection = self.connect()
+            sql = (
+                "UPDATE {table} SET status = 'queued', owner = NULL, "
+                "claimed_at = NULL WHERE status = 'sending' "
+                "AND (claimed_at IS NULL OR claimed_at <= ?)"
+            ).format(table=self.table)
+            cursor = connection.execute(
+                sql, (time.time() - self.lease_timeout,)
+            )
+            count = cursor.rowcount
+            connection.commit()
+            connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to requeue claimed emails"
+            ) from exception
+        return count
+
+    def count(self, status):
+        """Count emails.
+
+        :param str status: status
+
+        :returns: number of emails
+        :rtype: int
+        """
+        try:
+            connection = self.connect()
+            sql = "SELECT COUNT(*) FROM {table} WHERE status = ?"
+            sql = sql.format(table=self.table)
+            count = connection.execute(sql, (status,)).fetchone()[0]
+            connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to count emails"
+            ) from exception
+        return count
+
+
+class OutboxSender(object):
+    """Background sender draining the outbound email queue.
+
+    :ivar Outbox outbox: outbound email queue
+    :ivar SMTPPool smtp_pool: pool of SMTP connections
+    :ivar int workers: number of sender threads
+    :ivar float poll_interval: poll interval in seconds
+    """
+
+    def __init__(self, outbox, smtp_pool, workers=2, poll_interval=1.0):
+        """Initialize background sender.
+
+        :param Outbox outbox: outbound email queue
+        :param SMTPPool smtp_pool: pool of SMTP connections
+        :param int workers: number of sender threads
+        :param float poll_interval: poll interval in seconds
+        """
+        try:
+            self.outbox = outbox
+            self.smtp_pool = smtp_pool
+            self.workers = workers
+            self.poll_interval = poll_interval
+            self._stopping = threading.Event()
+            self._threads = []
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to initialize background sender"
+            ) from exception
+        return
+
+    def send_next(self):
+        """Send next email that is due.
+
+        :returns: toggle (whether an email was due)
+        :rtype: bool
+        """
+        logger = logging.getLogger().getChild(self.send_next.__name__)
+        row = self.outbox.claim()
+        if not row:
+            return False
+        id_, to_addrs, msg, attempts = row
+        try:
+            self.smtp_pool.sendmail(to_addrs, msg)
+        except Exception as exception:
+            status = self.outbox.mark_failed(id_, attempts+1, str(exception))
+            if status == "dead":
+                logger.error(
+                    "gave up on email %d to %s after %d attempts",
+                    id_, to_addrs, attempts+1
+                )
+            else:
+                logger.warning("failed to send email %d to %s", id_, to_addrs)
+        else:
+            self.outbox.mark_sent(id_)
+            logger.info("sent email to %s", to_addrs)
+        return True
+
+    def _run(self):
+        """Send emails until stopped and no email is due."""
+        logger = logging.getLogger().getChild(self._run.__name__)
+        while True:
+            try:
+                if self.send_next():
+                    continue
+            except Exception:
+                logger.exception("failed to send email")
+            if self._stopping.is_set():
+                break
+            self._stopping.wait(self.poll_interval)
+        return
+
+    def start(self):
+        """Start sender threads."""
+        try:
+            self.outbox.requeue_claimed()
+            self._stopping.clear()
+            for _ in range(self.workers):
+                thread = threading.Thread(target=self._run)
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to start background sender"
+            ) from exception
+        return
+
+    def stop(self, timeout=None):
+        """Stop sender threads after emails that are due have been sent.
+
+        Emails scheduled for a later attempt remain in the queue.
+
+        :param float timeout: timeout in seconds per sender thread
+        """
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        return
@@ -0,0 +1,373 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Per-host politeness.
+
+Requests to a host are limited by a token bucket (rate requests per
+second, bursts of up to burst requests) and by a maximum number of
+concurrent connections, and are deferred while the host asked to retry
+later (Retry-After header of 429 and 503 responses). The limits are
+shared by all Web scrapers of a process and can be configured per domain
+in [politeness:<domain>] sections of the scraper configuration, which
+override the [politeness] section (see POLITENESS for the defaults).
+The number of concurrent connections is further bounded by an adaptive
+limit per host (see src.concurrency), configured in the [concurrency]
+section. Each host and port has a circuit breaker (see src.retry),
+configured in the [retry] section.
+"""
+
+
+# standard library imports
+import time
+import threading
+import contextlib
+import email.utils
+
+# third party imports
+# library specific imports
+import src.retry
+import src.concurrency
+
+
+POLITENESS = {
+    "rate": 0.0,
+    "burst": 1,
+    "max_connections": 0,
+    "retries": 1,
+    "retry_after": 5.0,
+    "max_retry_after": 120.0
+}
+RETRY_STATUS_CODES = (429, 503)
+
+_lock = threading.Lock()
+_politeness = {}
+
+
+def parse_retry_after(value):
+    """Parse Retry-After header field value.
+
+    :param str value: delay in seconds or HTTP date
+
+    :returns: delay in seconds or None
+    :rtype: float or None
+    """
+    value = (value or "").strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(date.timestamp() - time.time(), 0.0)
+
+
+class HostLimiter(object):
+    """Token bucket and connection limit of a host.
+
+    :ivar float rate: requests per second (0 for no limit)
+    :ivar int burst: maximum number of requests in a burst
+    :ivar int max_connections: maximum number of concurrent connections
+        (0 for no limit)
+    :ivar adaptive: adaptive limit of concurrent connections
+    :type: AdaptiveLimit or None
+    :ivar float tokens: tokens in bucket
+    :ivar int connections: number of concurrent connections
+    :ivar float not_before: requests are deferred until then (monotonic
+        clock)
+    """
+
+    def __init__(self, rate=0.0, burst=1, max_connections=0, adaptive=None):
+        """Initialize token bucket and connection limit of a host.
+
+        :param float rate: requests per second
+        :param int burst: maximum number of requests in a burst
+        :param int max_connections: maximum number of concurrent
+            connections
+        :param adaptive: adaptive limit of concurrent connections
+        :type: AdaptiveLimit or None
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_connections = max_connections
+        self.adaptive = adaptive
+        self.tokens = float(self.burst)
+        self.connections = 0
+        self.not_before = 0.0
+        self._updated = time.monotonic()
+        self._condition = threading.Condition()
+        return
+
+    def _get_wait(self, now):
+        """Get time to wait before a request can be sent.
+
+        :param float now: monotonic clock
+
+        :returns: time to wait in seconds (0 if a request can be sent,
+            None to wait for a connection to be released)
+        :rtype: float or None
+        """
+        if self.rate:
+            self.tokens = min(
+                self.tokens + (now - self._updated) * self.rate, self.burst
+            )
+        self._updated = now
+        limit = self.max_connections
+        if self.adaptive is not None:
+            if limit:
+                limit = min(limit, self.adaptive.get_limit())
+            else:
+                limit = self.adaptive.get_limit()
+        if limit and self.connections >= limit:
+            return None
+        if now < self.not_before:
+            return self.not_before - now
+        if self.rate and self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        return 0.0
+
+    def acquire(self, deadline=None):
+        """Wait for a token and a connection.
+
+        :param float deadline: deadline (monotonic clock)
+        """
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                wait = self._get_wait(now)
+                if wait == 0:
+                    if self.rate:
+                        self.tokens -= 1
+                    self.connections += 1
+                    return
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0 or (
+                            wait is not None and wait > remaining
+                    ):
+                        raise TimeoutError("host limit exceeds time budget")
+                    if wait is None:
+                        wait = remaining
+                self._condition.wait(wait)
+
+    def release(self):
+        """Release connection."""
+        with self._condition:
+            self.connections -= 1
+            self._condition.notify_all()
+        return
+
+    def observe(self, started, latency=None, status_code=None):
+        """Update adaptive limit with observed response.
+
+        :param float started: start of request (monotonic clock)
+        :param float latency: latency in seconds (None if the request
+            failed)
+        :param int status_code: status code (None if the request failed)
+        """
+        if self.adaptive is None:
+            return
+        self.adaptive.update(
+            started, latency=latency, status_code=status_code
+        )
+        with self._condition:
+            self._condition.notify_all()
+        return
+
+    def defer(self, delay):
+        """Defer requests.
+
+        :param float delay: delay in seconds
+        """
+        with self._condition:
+            self.not_before = max(self.not_before, time.monotonic() + delay)
+        return
+
+
+class Politeness(object):
+    """Per-host politeness.
+
+    :ivar dict defaults: default settings
+    :ivar dict domains: settings by domain
+    :ivar int retries: number of retries after Retry-After
+    :ivar float retry_after: delay if a 429 response has no Retry-After
+        header in seconds
+    :ivar float max_retry_after: maximum delay in seconds
+    :ivar dict concurrency: adaptive concurrency settings
+    :ivar int workers: number of resources fetched concurrently by a Web
+        scraper
+    :ivar dict breaker: circuit breaker settings
+    """
+
+    def __init__(self, config=None):
+        """Initialize per-host politeness.
+
+        :param config: scraper configuration
+        :type: ConfigParser or None
+        """
+        try:
+            self.defaults = dict(POLITENESS)
+            self.domains = {}
+            if config is not None:
+                if config.has_section("politeness"):
+                    self.defaults.update(config["politeness"])
+                for section in config.sections():
+                    if section.startswith("politeness:"):
+                        domain = section.split(":", 1)[1].lower()
+                        self.domains[domain] = dict(config[section])
+            self.retries = int(self.defaults["retries"])
+            self.retry_after = float(self.defaults["retry_after"])
+            self.max_retry_after = float(self.defaults["max_retry_after"])
+            self.concurrency = dict(src.concurrency.CONCURRENCY)
+            if config is not None and config.has_section("concurrency"):
+                self.concurrency.update(config["concurrency"])
+            self.workers = int(self.concurrency.pop("workers"))
+            if self.workers < 1:
+                raise ValueError("workers < 1")
+            self.concurrency = {
+                key: float(value) for key, value in self.concurrency.items()
+            }
+            settings = src.retry.get_settings(config)
+            self.breaker = {
+                "failures": int(settings["failures"]),
+                "reset_timeout": float(settings["reset_timeout"])
+            }
+            self._breakers = {}
+            self._limiters = {}
+            self._lock = threading.Lock()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to initialize per-host politeness"
+            ) from exception
+        return
+
+    def get_settings(self, host):
+        """Get settings of host.
+
+        The settings of the most specific domain the host belongs to
+        override the default settings.
+
+        :param str host: host
+
+        :returns: settings
+        :rtype: dict
+        """
+        settings = dict(self.defaults)
+        labels = (host or "").lower().split(".")
+        for index in reversed(range(len(labels))):
+            settings.update(self.domains.get(".".join(labels[index:]), {}))
+        return settings
+
+    def get_limiter(self, host):
+        """Get token bucket and connection limit of host.
+
+        :param str host: host
+
+        :returns: token bucket and connection limit
+        :rtype: HostLimiter
+        """
+        host = (host or "").lower()
+        with self._lock:
+            if host not in self._limiters:
+                settings = self.get_settings(host)
+                self._limiters[host] = HostLimiter(
+                    rate=float(settings["rate"]),
+                    burst=int(settings["burst"]),
+                    max_connections=int(settings["max_connections"]),
+                    adaptive=src.concurrency.AdaptiveLimit(
+                        host, **self.concurrency
+                    )
+                )
+            limiter = self._limiters[host]
+        return limiter
+
+    def get_breaker(self, netloc):
+        """Get circuit breaker of host and port.
+
+        :param str netloc: host and port
+
+        :returns: circuit breaker
+        :rtype: CircuitBreaker
+        """
+        netloc = (netloc or "").lower()
+        with self._lock:
+            if netloc not in self._breakers:
+                self._breakers[netloc] = src.retry.CircuitBreaker(
+                    netloc, **self.breaker
+                )
+            breaker = self._breakers[netloc]
+        return breaker
+
+    @contextlib.contextmanager
+    def slot(self, host, deadline=None):
+        """Hold a connection to host.
+
+        :param str host: host
+        :param float deadline: deadline (monotonic clock)
+        """
+        limiter = self.get_limiter(host)
+        limiter.acquire(deadline=deadline)
+        try:
+            yield limiter
+        finally:
+            limiter.release()
+
+    def defer(self, host, response):
+        """Defer requests to host if response asks to retry later.
+
+        :param str host: host
+        :param Response response: response to HTTP request
+
+        :returns: delay in seconds or None
+        :rtype: float or None
+        """
+        if response.status_code not in RETRY_STATUS_CODES:
+            return None
+        delay = parse_retry_after(response.headers.get("Retry-After"))
+        if delay is None:
+            if response.status_code != 429:
+                return None
+            delay = self.retry_after
+        delay = min(delay, self.max_retry_after)
+        self.get_limiter(host).defer(delay)
+        return delay
+
+
+def get_politeness(config=None):
+    """Get per-host politeness shared by all Web scrapers of the process.
+
+    :param config: scraper configuration
+    :type: ConfigParser or None
+
+    :returns: per-host politeness
+    :rtype: Politeness
+    """
+    key = ()
+    if config is not None:
+        key = tuple(
+            (section, tuple(sorted(config[section].items())))
+            for section in config.sections()
+            if section in ("politeness", "concurrency", "retry")
+            or section.startswith("politeness:")
+        )
+    with _lock:
+        if key not in _politeness:
+            _politeness[key] = Politeness(config)
+        politeness = _politeness[key]
+    return politeness
@@ -0,0 +1,303 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Profiling of ticket management runs.
+
+Two profilers are available, both with a per-ticket breakdown based on the
+ticket ID tag of the enclosing timing span (see src.metrics):
+
+* cprofile: deterministic profile (cProfile) of the managing thread and
+  of any thread within a span, written as pstats files, one for the whole
+  run and one per ticket.
+* sampling: statistical profile of the managing thread and of any thread
+  within a span, written as collapsed stacks (input of flamegraph.pl and
+  speedscope), the root frame of each stack is the ticket ID.
+
+Nothing is hooked unless a profiler is requested.
+"""
+
+
+# standard library imports
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import collections
+
+# third party imports
+# library specific imports
+import src.metrics
+
+
+class CProfiler(object):
+    """Deterministic profiler with per-ticket breakdown.
+
+    The thread starting the profiler is profiled for the whole run, any
+    other thread (e.g. executor or resource fetching threads) while it is
+    within a span.
+
+    :ivar int ident: identifier of thread starting the profiler
+    :ivar Profile profile: profile of the run outside of ticket spans
+    :ivar OrderedDict profiles: profiles (ticket ID and thread identifier
+        as key, ticket ID None outside of ticket spans)
+    """
+
+    def __init__(self):
+        """Initialize deterministic profiler."""
+        self.ident = None
+        self.profile = cProfile.Profile()
+        self.profiles = collections.OrderedDict()
+        self._active = {}
+        return
+
+    @staticmethod
+    def _switch(active, profile):
+        """Switch active profile of current thread.
+
+        :param list active: active profiles of current thread
+        :param Profile profile: profile to enable
+        """
+        if active and active[-1] is profile:
+            active.append(profile)
+            return
+        if active:
+            active[-1].disable()
+        profile.enable()
+        active.append(profile)
+        return
+
+    def enter(self, stage, tags):
+        """Enable profile of ticket on entering span.
+
+        :param str stage: stage
+        :param dict tags: tags
+        """
+        ident = threading.get_ident()
+        active = self._active.setdefault(ident, [])
+        ticket = tags.get("ticket")
+        if ticket is None and active:
+            profile = active[-1]
+        else:
+            profile = self.profiles.setdefault(
+                (ticket, ident), cProfile.Profile()
+            )
+        self._switch(active, profile)
+        return
+
+    def exit(self, stage, tags):
+        """Restore enclosing profile on exiting span.
+
+        :param str stage: stage
+        :param dict tags: tags
+        """
+        active = self._active.get(threading.get_ident())
+        if not active:
+            return
+        profile = active.pop()
+        if not active:
+            profile.disable()
+            self._active.pop(threading.get_ident(), None)
+        elif active[-1] is not profile:
+            profile.disable()
+            active[-1].enable()
+        return
+
+    def start(self):
+        """Start profiling current thread."""
+        try:
+            self.ident = threading.get_ident()
+            self._active = {self.ident: [self.profile]}
+            src.metrics.add_listener(self)
+            self.profile.enable()
+        except Exception as exception:
+            raise RuntimeError("failed to start profiler") from exception
+        return
+
+    def stop(self):
+        """Stop profiling."""
+        try:
+            src.metrics.remove_listener(self)
+            for profile in set(self._active.pop(self.ident, [])):
+                profile.disable()
+            self._active = {}
+        except Exception as exception:
+            raise RuntimeError("failed to stop profiler") from exception
+        return
+
+    def dump(self, directory):
+        """Write pstats files.
+
+        manage.pstats contains the whole run, ticket_<ticket ID>.pstats the
+        share of each ticket (summed over threads).
+
+        :param str directory: output directory
+        """
+        try:
+            os.makedirs(directory, exist_ok=True)
+            stats = pstats.Stats(self.profile)
+            tickets = collections.OrderedDict()
+            for (ticket, _), profile in self.profiles.items():
+                stats.add(profile)
+                if ticket is None:
+                    continue
+                if ticket in tickets:
+                    tickets[ticket].add(profile)
+                else:
+                    tickets[ticket] = pstats.Stats(profile)
+            for ticket, ticket_stats in tickets.items():
+                ticket_stats.dump_stats(
+                    os.path.join(directory, "ticket_{}.pstats".format(ticket))
+                )
+            stats.dump_stats(os.path.join(directory, "manage.pstats"))
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to write profile to {}".format(directory)
+            ) from exception
+        return
+
+
+class SamplingProfiler(object):
+    """Statistical profiler with per-ticket breakdown.
+
+    The thread starting the profiler is sampled for the whole run, any
+    other thread (e.g. executor or resource fetching threads) while it is
+    within a span.
+
+    :ivar float interval: sampling interval in seconds
+    :ivar int ident: identifier of thread starting the profiler
+    :ivar Counter stacks: sample counts (collapsed stack as key)
+    """
+
+    def __init__(self, interval=0.005):
+        """Initialize statistical profiler.
+
+        :param float interval: sampling interval in seconds
+        """
+        self.interval = interval
+        self.ident = None
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        return
+
+    @staticmethod
+    def _get_stack(frame):
+        """Get collapsed stack of frame.
+
+        :param frame frame: frame
+
+        :returns: frames (outermost first)
+        :rtype: list
+        """
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append("{}:{}".format(
+                os.path.basename(code.co_filename), code.co_name
+            ))
+            frame = frame.f_back
+        frames.reverse()
+        return frames
+
+    def _sample(self):
+        """Sample profiled threads until stopped."""
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            idents = set(src.metrics.get_threads())
+            idents.add(self.ident)
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                ticket = src.metrics.get_tags(ident).get("ticket")
+                root = "ticket {}".format(ticket) if ticket else "manage"
+                self.stacks[";".join([root] + self._get_stack(frame))] += 1
+            del frames, frame
+        return
+
+    def start(self):
+        """Start sampling current thread (and threads within spans)."""
+        try:
+            self.ident = threading.get_ident()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample)
+            self._thread.daemon = True
+            self._thread.start()
+        except Exception as exception:
+            raise RuntimeError("failed to start profiler") from exception
+        return
+
+    def stop(self):
+        """Stop sampling."""
+        try:
+            self._stop.set()
+            self._thread.join()
+        except Exception as exception:
+            raise RuntimeError("failed to stop profiler") from exception
+        return
+
+    def dump(self, directory):
+        """Write collapsed stacks to manage.collapsed.
+
+        :param str directory: output directory
+        """
+        try:
+            os.makedirs(directory, exist_ok=True)
+            filename = os.path.join(directory, "manage.collapsed")
+            with open(filename, mode="w") as fp:
+                for stack, count in sorted(self.stacks.items()):
+                    fp.write("{} {}\n".format(stack, count))
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to write profile to {}".format(directory)
+            ) from exception
+        return
+
+
+PROFILERS = {"cprofile": CProfiler, "sampling": SamplingProfiler}
+
+
+def get_profiler(name, **kwargs):
+    """Get profiler.
+
+    :param str name: profiler (cprofile or sampling)
+    :param kwargs: profiler parameters
+
+    :returns: profiler
+    :rtype: CProfiler or SamplingProfiler
+    """
+    try:
+        profiler = PROFILERS[name](**kwargs)
+    except KeyError as exception:
+        raise ValueError("unknown profiler {}".format(name)) from exception
+    return profiler
+
+
+def get_directory(root="storage"):
+    """Get timestamped output directory of profile.
+
+    :param str root: root directory
+
+    :returns: output directory
+    :rtype: str
+    """
+    return os.path.join(
+        root, "profile_{}".format(time.strftime("%Y%m%dT%H%M%S"))
+    )
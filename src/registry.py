@@ -0,0 +1,379 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Capture registry.
+"""
+
+
+# standard library imports
+import os
+import time
+import socket
+import logging
+import threading
+import urllib.parse
+
+# third party imports
+# library specific imports
+import src.sqlite
+import src.metrics
+import src.storage
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url):
+    """Normalize URL.
+
+    The scheme and host name are lowercased, the user information, the
+    default port and the fragment are removed, an empty path is replaced
+    by / and the query parameters are sorted. Unlike the SURT (see
+    src.storage.get_surt), the path and query keep their case.
+
+    :param str url: URL
+
+    :returns: normalized URL
+    :rtype: str
+    """
+    parse_result = urllib.parse.urlsplit(url.strip())
+    scheme = parse_result.scheme.lower()
+    netloc = (parse_result.hostname or "").lower()
+    if ":" in netloc:
+        netloc = "[{}]".format(netloc)
+    port = parse_result.port
+    if port and port != DEFAULT_PORTS.get(scheme):
+        netloc += ":{}".format(port)
+    query = parse_result.query
+    if query:
+        query = "&".join(sorted(query.split("&")))
+    return urllib.parse.urlunsplit(
+        (scheme, netloc, parse_result.path or "/", query, "")
+    )
+
+
+class CaptureRegistry(object):
+    """Capture registry.
+
+    The registry is a table in the OpenDACHS database keyed by normalized
+    URL (see normalize_url). Concurrent captures of the same URL are
+    single-flight: the first thread (of any process sharing the database)
+    claims the URL and scrapes it, the others wait for the capture and
+    hardlink its WARC archive. Captures finished within the freshness
+    window are reused the same way instead of scraping the URL again.
+
+    :ivar ConfigParser sqlite: SQLite configuration
+    :ivar str table: table
+    :ivar float freshness: freshness window in seconds
+    :ivar float timeout: time after which an unfinished capture is
+        considered abandoned in seconds
+    :ivar float interval: poll interval in seconds
+    :ivar str owner: owner
+    """
+
+    def __init__(self, sqlite, owner=None):
+        """Initialize capture registry.
+
+        :param ConfigParser sqlite: SQLite configuration
+        :param str owner: owner (default host name and process ID)
+        """
+        try:
+            self.sqlite = sqlite
+            captures = sqlite["captures"]
+            self.table = captures.get("table", fallback="captures")
+            self.freshness = captures.getfloat("freshness", fallback=600.0)
+            self.timeout = captures.getfloat("timeout", fallback=900.0)
+            self.interval = captures.getfloat("interval", fallback=1.0)
+            if owner is None:
+                owner = "{}:{}".format(socket.gethostname(), os.getpid())
+            self.owner = owner
+            self._lock = threading.Lock()
+            self._flights = {}
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to initialize capture registry"
+            ) from exception
+        return
+
+    def connect(self):
+        """Connect to OpenDACHS database.
+
+        :returns: connection
+        :rtype: Connection
+        """
+        return src.sqlite.SQLiteClient(self.sqlite).connect()
+
+    def create_table(self):
+        """Create table if not exists."""
+        try:
+            connection = self.connect()
+            sql = (
+                "CREATE TABLE IF NOT EXISTS {table} ("
+                "url TEXT PRIMARY KEY, "
+                "archive TEXT, "
+                "status TEXT, "
+                "owner TEXT, "
+                "updated REAL)"
+            ).format(table=self.table)
+            connection.execute(sql)
+            connection.commit()
+            connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to create capture registry table"
+            ) from exception
+        return
+
+    def lookup(self, url, since=None):
+        """Look up WARC archive of fresh capture.
+
+        :param str url: URL
+        :param float since: also accept captures finished since (UNIX
+            timestamp)
+
+        :returns: WARC archive or None
+        :rtype: str or None
+        """
+        try:
+            updated = time.time() - self.freshness
+            if since is not None:
+                updated = min(updated, since)
+            connection = self.connect()
+            sql = (
+                "SELECT archive FROM {table} "
+                "WHERE url = ? AND status = 'done' AND updated >= ?"
+            ).format(table=self.table)
+            row = connection.execute(
+                sql, (normalize_url(url), updated)
+            ).fetchone()
+            connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to look up capture of {url}".format(url=url)
+            ) from exception
+        if row is None or not os.path.exists(row["archive"]):
+            return None
+        return row["archive"]
+
+    def reuse(self, url, archive, since=None):
+        """Hardlink WARC archive of fresh capture.
+
+        :param str url: URL
+        :param str archive: WARC archive
+        :param float since: also accept captures finished since (UNIX
+            timestamp)
+
+        :returns: toggle (whether a capture was reused)
+        :rtype: bool
+        """
+        logger = logging.getLogger().getChild(self.reuse.__name__)
+        source = self.lookup(url, since=since)
+        if source is None or os.path.abspath(source) == (
+            os.path.abspath(archive)
+        ):
+            return False
+        try:
+            src.storage.link_file(source, archive)
+        except Exception:
+            logger.warning(
+                "failed to reuse capture of %s", url, exc_info=True
+            )
+            return False
+        logger.info("reused capture %s of %s", source, url)
+        src.metrics.event("scrape.reuse", url=normalize_url(url))
+        return True
+
+    def claim(self, url):
+        """Claim URL if it is not being captured by another owner.
+
+        Unfinished captures older than the timeout are claimed, too.
+
+        :param str url: URL
+
+        :returns: toggle (whether the URL was claimed)
+        :rtype: bool
+        """
+        try:
+            now = time.time()
+            connection = self.connect()
+            connection.isolation_level = None
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                sql = "SELECT status, owner, updated FROM {table} "
+                sql += "WHERE url = ?"
+                sql = sql.format(table=self.table)
+                row = connection.execute(
+                    sql, (normalize_url(url),)
+                ).fetchone()
+                claimed = (
+                    row is None
+                    or row["status"] != "capturing"
+                    or row["owner"] == self.owner
+                    or row["updated"] <= now - self.timeout
+                )
+                if claimed:
+                    sql = (
+                        "INSERT OR REPLACE INTO {table} "
+                        "(url, archive, status, owner, updated) "
+                        "VALUES (?, NULL, 'capturing', ?, ?)"
+                    ).format(table=self.table)
+                    connection.execute(
+                        sql, (normalize_url(url), self.owner, now)
+                    )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            finally:
+                connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to claim {url}".format(url=url)
+            ) from exception
+        return claimed
+
+    def record(self, url, archive):
+        """Record finished capture.
+
+        :param str url: URL
+        :param str archive: WARC archive
+        """
+        try:
+            connection = self.connect()
+            sql = (
+                "INSERT OR REPLACE INTO {table} "
+                "(url, archive, status, owner, updated) "
+                "VALUES (?, ?, 'done', ?, ?)"
+            ).format(table=self.table)
+            connection.execute(
+                sql,
+                (
+                    normalize_url(url), os.path.abspath(archive),
+                    self.owner, time.time()
+                )
+            )
+            connection.commit()
+            connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to record capture of {url}".format(url=url)
+            ) from exception
+        return
+
+    def release(self, url):
+        """Release URL claimed but not captured.
+
+        :param str url: URL
+        """
+        try:
+            connection = self.connect()
+            sql = (
+                "DELETE FROM {table} "
+                "WHERE url = ? AND owner = ? AND status = 'capturing'"
+            ).format(table=self.table)
+            connection.execute(sql, (normalize_url(url), self.owner))
+            connection.commit()
+            connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to release {url}".format(url=url)
+            ) from exception
+        return
+
+    def get_status(self, url):
+        """Get status of capture.
+
+        :param str url: URL
+
+        :returns: status (capturing or done) or None
+        :rtype: str or None
+        """
+        try:
+            connection = self.connect()
+            sql = "SELECT status FROM {table} WHERE url = ?"
+            sql = sql.format(table=self.table)
+            row = connection.execute(
+                sql, (normalize_url(url),)
+            ).fetchone()
+            connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to get status of capture of {url}".format(url=url)
+            ) from exception
+        return row["status"] if row else None
+
+    def _wait(self, url, deadline):
+        """Wait for capture of another owner.
+
+        :param str url: URL
+        :param float deadline: deadline (monotonic clock)
+        """
+        while self.get_status(url) == "capturing":
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(self.interval, remaining))
+        return
+
+    def capture(self, url, archive, function):
+        """Capture URL unless a fresh or in-flight capture can be reused.
+
+        :param str url: URL
+        :param str archive: WARC archive
+        :param callable function: function capturing URL into archive
+
+        :returns: toggle (whether the URL was captured, not reused)
+        :rtype: bool
+        """
+        logger = logging.getLogger().getChild(self.capture.__name__)
+        key = normalize_url(url)
+        since = time.time()
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if self.reuse(url, archive, since=since):
+                return False
+            with self._lock:
+                flight = self._flights.get(key)
+                if flight is None and self.claim(url):
+                    flight = self._flights[key] = threading.Event()
+                    leader = True
+                else:
+                    leader = False
+            if leader:
+                break
+            logger.info("wait for capture of %s", url)
+            with src.metrics.span("scrape.wait", url=key):
+                if flight is not None:
+                    flight.wait(max(deadline - time.monotonic(), 0))
+                else:
+                    self._wait(url, deadline)
+        else:
+            logger.warning("capture of %s timed out, capture again", url)
+            function()
+            return True
+        try:
+            function()
+            self.record(url, archive)
+        except Exception:
+            self.release(url)
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.set()
+        return True
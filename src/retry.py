@@ -0,0 +1,247 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Retry policy and per-host circuit breaker.
+
+Transient errors (connection errors, timeouts, interrupted response
+bodies and 500, 502 and 504 responses) are retried with jittered
+exponential backoff. The circuit breaker of a host (and port) opens
+after a number of consecutive failures, so that requests to a dead host
+fail fast instead of waiting for a TCP timeout each; after reset_timeout
+seconds, a single trial request is let through (half-open) and closes
+the breaker again if it succeeds. See RETRY for the defaults, which can
+be overridden in the [retry] section of the scraper configuration.
+"""
+
+
+# standard library imports
+import time
+import random
+import logging
+import threading
+
+# third party imports
+import requests
+
+# library specific imports
+import src.metrics
+
+
+RETRY = {
+    "attempts": 3,
+    "backoff": 0.5,
+    "max_backoff": 8.0,
+    "failures": 5,
+    "reset_timeout": 60.0
+}
+TRANSIENT_STATUS_CODES = (500, 502, 504)
+
+
+class TransientHTTPError(requests.HTTPError):
+    """Response with transient error status code."""
+
+
+class CircuitOpenError(Exception):
+    """Circuit breaker of host is open."""
+
+
+TRANSIENT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    TransientHTTPError
+)
+
+
+def get_settings(config=None):
+    """Get retry settings.
+
+    :param config: scraper configuration
+    :type: ConfigParser or None
+
+    :returns: settings
+    :rtype: dict
+    """
+    settings = dict(RETRY)
+    if config is not None and config.has_section("retry"):
+        settings.update(config["retry"])
+    return settings
+
+
+class RetryPolicy(object):
+    """Retry policy with jittered exponential backoff.
+
+    :ivar int attempts: maximum number of attempts
+    :ivar float backoff: delay after first failed attempt in seconds
+    :ivar float max_backoff: maximum delay in seconds
+    """
+
+    def __init__(self, attempts=3, backoff=0.5, max_backoff=8.0):
+        """Initialize retry policy.
+
+        :param int attempts: maximum number of attempts
+        :param float backoff: delay after first failed attempt in seconds
+        :param float max_backoff: maximum delay in seconds
+        """
+        try:
+            if attempts < 1:
+                raise ValueError("attempts < 1")
+            self.attempts = attempts
+            self.backoff = backoff
+            self.max_backoff = max_backoff
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to initialize retry policy"
+            ) from exception
+        return
+
+    @classmethod
+    def get_retry_policy(cls, config=None):
+        """Get retry policy.
+
+        :param config: scraper configuration
+        :type: ConfigParser or None
+
+        :returns: retry policy
+        :rtype: RetryPolicy
+        """
+        settings = get_settings(config)
+        return cls(
+            attempts=int(settings["attempts"]),
+            backoff=float(settings["backoff"]),
+            max_backoff=float(settings["max_backoff"])
+        )
+
+    def get_backoff(self, attempts):
+        """Get jittered exponential delay before next attempt.
+
+        :param int attempts: number of attempts
+
+        :returns: delay in seconds
+        :rtype: float
+        """
+        backoff = min(self.backoff * 2**(attempts-1), self.max_backoff)
+        return random.uniform(backoff/2, backoff)
+
+    @staticmethod
+    def is_transient(exception):
+        """Check whether error is transient.
+
+        :param Exception exception: exception
+
+        :returns: toggle
+        :rtype: bool
+        """
+        return isinstance(exception, TRANSIENT_ERRORS)
+
+
+class CircuitBreaker(object):
+    """Circuit breaker of a host (and port).
+
+    The breaker is 'closed' (requests are sent), 'open' (requests fail
+    fast) or 'half-open' (a single trial request is sent).
+
+    :ivar str host: host and port
+    :ivar int failures: consecutive failures opening the breaker
+    :ivar float reset_timeout: time until a trial request in seconds
+    :ivar str state: state
+    :ivar int count: number of consecutive failures
+    :ivar float opened: time the breaker was opened (monotonic clock)
+    """
+
+    def __init__(self, host, failures=5, reset_timeout=60.0):
+        """Initialize circuit breaker of a host (and port).
+
+        :param str host: host and port
+        :param int failures: consecutive failures opening the breaker
+        :param float reset_timeout: time until a trial request in seconds
+        """
+        try:
+            if failures < 1:
+                raise ValueError("failures < 1")
+            self.host = host
+            self.failures = failures
+            self.reset_timeout = reset_timeout
+            self.state = "closed"
+            self.count = 0
+            self.opened = None
+            self._trial = False
+            self._lock = threading.Lock()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to initialize circuit breaker"
+            ) from exception
+        return
+
+    def allow(self):
+        """Check whether a request may be sent.
+
+        :raises CircuitOpenError: if the breaker is open
+        """
+        with self._lock:
+            if self.state == "closed":
+                return
+            if (
+                    self.state == "open"
+                    and time.monotonic() >= self.opened + self.reset_timeout
+            ):
+                self.state = "half-open"
+            if self.state == "half-open" and not self._trial:
+                self._trial = True
+                return
+        raise CircuitOpenError(
+            "circuit breaker of {} is open".format(self.host)
+        )
+
+    def success(self):
+        """Record successful request."""
+        with self._lock:
+            closed = self.state != "closed"
+            self.state = "closed"
+            self.count = 0
+            self._trial = False
+        if closed:
+            src.metrics.event("scrape.circuit", host=self.host, flag="close")
+        return
+
+    def failure(self):
+        """Record failed request."""
+        logger = logging.getLogger().getChild(self.failure.__name__)
+        with self._lock:
+            self.count += 1
+            opened = (
+                self.state == "half-open"
+                or (self.state == "closed" and self.count >= self.failures)
+            )
+            if opened:
+                self.state = "open"
+                self.opened = time.monotonic()
+            self._trial = False
+        if opened:
+            logger.warning(
+                "open circuit breaker of %s after %d failures",
+                self.host, self.count
+            )
+            src.metrics.event("scrape.circuit", host=self.host, flag="open")
+        return
+
+    def cancel(self):
+        """Record request that neither succeeded nor failed."""
+        with self._lock:
+            self._trial = False
+        return
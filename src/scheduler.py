@@ -0,0 +1,209 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Ticket scheduler.
+
+Cheap state transitions (confirmed, accepted and denied tickets) are
+managed before expensive scrapes (pending tickets), and tickets of the
+same cost class are interleaved round-robin by submitter email address,
+so that a user submitting many tickets at once does not starve others.
+Tickets left over when the per-run time budget is exhausted are written
+to a spool directory and managed in the next run.
+"""
+
+
+# standard library imports
+import os
+import json
+import time
+import logging
+import collections
+
+# third party imports
+# library specific imports
+
+
+COST_CLASSES = {
+    "confirmed": 0,
+    "accepted": 0,
+    "denied": 0,
+    "pending": 1
+}
+
+
+def get_submitter(data):
+    """Get submitter of OpenDACHS ticket.
+
+    :param dict data: OpenDACHS ticket
+
+    :returns: email address
+    :rtype: str
+    """
+    return str(data.get("email") or "").strip().lower()
+
+
+def order(datas):
+    """Order OpenDACHS tickets by cost class, round-robin by submitter.
+
+    The order of tickets of the same submitter is kept.
+
+    :param list datas: OpenDACHS tickets
+
+    :returns: OpenDACHS tickets
+    :rtype: list
+    """
+    classes = collections.defaultdict(collections.OrderedDict)
+    for data in datas:
+        cost = COST_CLASSES.get(data.get("flag"), len(COST_CLASSES))
+        classes[cost].setdefault(get_submitter(data), []).append(data)
+    ordered = []
+    for cost in sorted(classes):
+        queues = [collections.deque(queue) for queue in classes[cost].values()]
+        while queues:
+            for queue in queues:
+                ordered.append(queue.popleft())
+            queues = [queue for queue in queues if queue]
+    return ordered
+
+
+class Scheduler(object):
+    """Ticket scheduler.
+
+    :ivar float budget: time budget per run in seconds (0 for no limit)
+    :ivar str spool: spool directory
+    :ivar float deadline: end of time budget (monotonic clock)
+    """
+
+    def __init__(self, budget=0.0, spool="tmp/spool"):
+        """Initialize ticket scheduler.
+
+        :param float budget: time budget per run in seconds
+        :param str spool: spool directory
+        """
+        try:
+            if budget < 0:
+                raise ValueError("budget < 0")
+            self.budget = budget
+            self.spool = spool
+            self.deadline = None
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to initialize ticket scheduler"
+            ) from exception
+        return
+
+    @classmethod
+    def get_scheduler(cls, ftp):
+        """Get ticket scheduler.
+
+        The section scheduler of the FTP configuration is optional.
+
+        :param ConfigParser ftp: FTP configuration
+
+        :returns: ticket scheduler
+        :rtype: Scheduler
+        """
+        if not ftp.has_section("scheduler"):
+            return cls()
+        section = ftp["scheduler"]
+        return cls(
+            budget=section.getfloat("budget", fallback=0.0),
+            spool=section.get("spool", fallback="tmp/spool")
+        )
+
+    def start(self):
+        """Start time budget."""
+        if self.budget:
+            self.deadline = time.monotonic() + self.budget
+        else:
+            self.deadline = None
+        return
+
+    def exhausted(self):
+        """Check whether time budget is exhausted.
+
+        :returns: toggle
+        :rtype: bool
+        """
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def get_spooled(self):
+        """Get spooled ticket files, oldest first.
+
+        :returns: filenames
+        :rtype: list
+        """
+        try:
+            if not os.path.isdir(self.spool):
+                return []
+            filenames = [
+                os.path.join(self.spool, filename)
+                for filename in os.listdir(self.spool)
+                if filename.endswith(".json")
+            ]
+            filenames.sort(key=os.path.getmtime)
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to get spooled ticket files"
+            ) from exception
+        return filenames
+
+    def get_filename(self, data):
+        """Get filename of spooled ticket file.
+
+        :param dict data: OpenDACHS ticket
+
+        :returns: filename
+        :rtype: str
+        """
+        return os.path.join(
+            self.spool, "{}.{}.json".format(data["ticket"], data["flag"])
+        )
+
+    def write(self, datas):
+        """Spool OpenDACHS tickets for next run.
+
+        :param list datas: OpenDACHS tickets
+        """
+        logger = logging.getLogger().getChild(self.write.__name__)
+        try:
+            os.makedirs(self.spool, exist_ok=True)
+            for data in datas:
+                filename = self.get_filename(data)
+                with open("{}.tmp".format(filename), mode="w") as fp:
+                    json.dump(data, fp)
+                os.replace("{}.tmp".format(filename), filename)
+                logger.info("spooled ticket %s", data["ticket"])
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to spool OpenDACHS tickets"
+            ) from exception
+        return
+
+    @staticmethod
+    def discard(filenames):
+        """Discard spooled ticket files that have been read in.
+
+        :param list filenames: filenames
+        """
+        for filename in filenames:
+            try:
+                os.unlink(filename)
+            except FileNotFoundError:
+                pass
+        return
@@ -20,44 +20,363 @@
 """
 
 # standard library imports
+import io
 import os
+import json
+import time
 import urllib
+import logging
+import functools
+import threading
+import concurrent.futures
 
 # third party imports
 import bs4
-import warcio.capture_http
 import cfscrape
+import requests
 
 # library specific imports
+import src.retry
+import src.charset
+import src.capture
+import src.metrics
+import src.politeness
+
+
+CHUNK_SIZE = 64*1024
+LIMITS = {
+    "connect_timeout": 10.0,
+    "read_timeout": 30.0,
+    "max_body_size": 100*2**20,
+    "oversize": "truncate",
+    "time_budget": 600.0
+}
+OVERSIZE = ("truncate", "skip")
 
 
 class Scraper(object):
     """Web scraper.
 
+    Response bodies are streamed in chunks of CHUNK_SIZE bytes into the WARC
+    archive. Each HTTP request is bounded by connect and read timeouts,
+    each response body by a maximum size and the whole capture by a time
+    budget (see LIMITS for the defaults, which can be overridden in the
+    [limits] section of the scraper configuration). Oversized response
+    bodies are either truncated or skipped; truncated response records get
+    a WARC-Truncated header, skipped resources are listed in a metadata
+    record. Requests are subject to the per-host politeness shared by all
+    Web scrapers of the process; responses asking to retry later are
+    dropped from the WARC archive and retried. External resources are
+    fetched concurrently, within the adaptive per-host limit of requests
+    in flight. Transient errors are retried according to the retry
+    policy; resources that cannot be fetched, also because the circuit
+    breaker of their host is open, are listed in the metadata record.
+
     :ivar Ticket ticket: OpenDACHS ticket
     :ivar Response response: response to HTTP request
     :ivar BeautifulSoup soup: tree
+    :ivar float connect_timeout: connect timeout in seconds
+    :ivar float read_timeout: read timeout in seconds
+    :ivar int max_body_size: maximum response body size in bytes
+    :ivar str oversize: oversized response body policy (truncate or skip)
+    :ivar float deadline: end of time budget (monotonic clock)
+    :ivar Politeness politeness: per-host politeness
+    :ivar RetryPolicy retry_policy: retry policy
+    :ivar list skipped: skipped resources
     """
 
-    def __init__(self, ticket, response=None):
+    def __init__(self, ticket, response=None, config=None):
         """Initialize Web scraper.
 
         :param Ticket ticket: OpenDACHS ticket
         :param Response response: HTTP response
+        :param config: scraper configuration
+        :type: ConfigParser or None
         """
         try:
             self.ticket = ticket
+            self._set_limits(config)
+            self.politeness = src.politeness.get_politeness(config)
+            self.retry_policy = src.retry.RetryPolicy.get_retry_policy(
+                config
+            )
+            self.skipped = []
+            self._local = threading.local()
+            self._truncated = None
             if not response:
                 response = self._request()
-            self.soup = bs4.BeautifulSoup(
-                response.content, features="html.parser"
-            )
+            with src.metrics.span("scrape.parse"):
+                self.soup = bs4.BeautifulSoup(
+                    src.charset.decode(response), features="html.parser"
+                )
             self.base = self._get_base()
         except Exception as exception:
             raise RuntimeError(
                 "failed to initialize Web scraper"
             ) from exception
 
+    @property
+    def _truncated(self):
+        """Truncation of response being fetched by current thread.
+
+        :returns: reason (length, time or skip) or None
+        :rtype: str or None
+        """
+        return getattr(self._local, "truncated", None)
+
+    @_truncated.setter
+    def _truncated(self, value):
+        """Set truncation of response being fetched by current thread.
+
+        :param value: reason (length, time or skip) or None
+        :type: str or None
+        """
+        self._local.truncated = value
+
+    def _set_limits(self, config):
+        """Set capture limits.
+
+        :param config: scraper configuration
+        :type: ConfigParser or None
+        """
+        try:
+            if config is not None and config.has_section("limits"):
+                limits = config["limits"]
+            else:
+                limits = {}
+            self.connect_timeout = float(
+                limits.get("connect_timeout", LIMITS["connect_timeout"])
+            )
+            self.read_timeout = float(
+                limits.get("read_timeout", LIMITS["read_timeout"])
+            )
+            self.max_body_size = int(
+                limits.get("max_body_size", LIMITS["max_body_size"])
+            )
+            self.oversize = limits.get("oversize", LIMITS["oversize"])
+            if self.oversize not in OVERSIZE:
+                raise ValueError(
+                    "unknown oversize policy {}".format(self.oversize)
+                )
+            self.deadline = time.monotonic() + float(
+                limits.get("time_budget", LIMITS["time_budget"])
+            )
+        except Exception as exception:
+            raise RuntimeError("failed to set capture limits") from exception
+        return
+
+    def _filter(self, request, response, recorder):
+        """Mark truncated response records, drop skipped and empty ones.
+
+        Called by the WARC capture adapter when a response has been read
+        or is closed. Response records are
+        empty if the request timed out before the response headers were
+        received.
+
+        :param ArcWarcRecord request: request record
+        :param ArcWarcRecord response: response record
+        :param WARCAdapter recorder: WARC capture adapter
+
+        :returns: request and response record
+        :rtype: tuple
+        """
+        truncated, self._truncated = self._truncated, None
+        if truncated == "skip" or not response.length:
+            return request, None
+        if truncated:
+            response.rec_headers.add_header("WARC-Truncated", truncated)
+        return request, response
+
+    def _get_timeout(self):
+        """Get connect and read timeout within time budget.
+
+        :returns: connect and read timeout
+        :rtype: tuple
+        """
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("time budget exhausted")
+        return (
+            min(self.connect_timeout, remaining),
+            min(self.read_timeout, remaining)
+        )
+
+    def _fetch_retrying(self, session, url, keep=False):
+        """Send HTTP request, retry on transient errors.
+
+        :param Session session: HTTP session
+        :param str url: URL
+        :param bool keep: toggle keeping response body in memory
+
+        :returns: response to HTTP request
+        :rtype: Response
+        """
+        logger = logging.getLogger().getChild(self._fetch_retrying.__name__)
+        breaker = self.politeness.get_breaker(
+            urllib.parse.urlsplit(url).netloc
+        )
+        attempts = 0
+        while True:
+            attempts += 1
+            breaker.allow()
+            try:
+                response = self._fetch(
+                    session, url, keep=keep,
+                    transient=attempts < self.retry_policy.attempts
+                )
+            except Exception as exception:
+                if not self.retry_policy.is_transient(exception):
+                    breaker.cancel()
+                    raise
+                breaker.failure()
+                delay = self.retry_policy.get_backoff(attempts)
+                if (
+                        attempts >= self.retry_policy.attempts
+                        or time.monotonic() + delay >= self.deadline
+                ):
+                    raise
+                logger.warning(
+                    "%s %s, retry in %.1f s",
+                    type(exception).__name__, url, delay
+                )
+                time.sleep(delay)
+                continue
+            if response.status_code in src.retry.TRANSIENT_STATUS_CODES:
+                breaker.failure()
+            else:
+                breaker.success()
+            return response
+
+    def _fetch(self, session, url, keep=False, transient=False):
+        """Send HTTP request within per-host politeness limits.
+
+        :param Session session: HTTP session
+        :param str url: URL
+        :param bool keep: toggle keeping response body in memory
+        :param bool transient: toggle raising TransientHTTPError (and
+            dropping the response from the WARC archive) on transient
+            error status codes
+
+        :returns: response to HTTP request
+        :rtype: Response
+        """
+        logger = logging.getLogger().getChild(self._fetch.__name__)
+        host = urllib.parse.urlsplit(url).hostname
+        retries = self.politeness.retries
+        while True:
+            with self.politeness.slot(
+                    host, deadline=self.deadline
+            ) as limiter:
+                started = time.monotonic()
+                try:
+                    response = session.get(
+                        url, stream=True, timeout=self._get_timeout()
+                    )
+                except requests.RequestException:
+                    limiter.observe(started)
+                    raise
+                limiter.observe(
+                    started,
+                    latency=time.monotonic() - started,
+                    status_code=response.status_code
+                )
+                delay = self.politeness.defer(host, response)
+                if delay is None or not retries:
+                    if not (
+                            transient and response.status_code
+                            in src.retry.TRANSIENT_STATUS_CODES
+                    ):
+                        return self._stream(response, url, keep=keep)
+                    self._drop(response)
+                    raise src.retry.TransientHTTPError(
+                        "{} {}".format(response.status_code, url),
+                        response=response
+                    )
+                logger.warning(
+                    "%d %s, retry after %.1f s",
+                    response.status_code, url, delay
+                )
+                self._drop(response)
+            retries -= 1
+
+    def _drop(self, response):
+        """Close response, drop it from the WARC archive.
+
+        :param Response response: response to HTTP request
+        """
+        self._truncated = "skip"
+        try:
+            response.close()
+        finally:
+            self._truncated = None
+        return
+
+    def _stream(self, response, url, keep=False):
+        """Stream response body into WARC archive.
+
+        :param Response response: response to HTTP request
+        :param str url: URL
+        :param bool keep: toggle keeping response body in memory
+
+        :returns: response to HTTP request
+        :rtype: Response
+        """
+        logger = logging.getLogger().getChild(self._stream.__name__)
+        content = io.BytesIO()
+        try:
+            size = 0
+            length = response.headers.get("Content-Length", "")
+            if (
+                    self.oversize == "skip"
+                    and length.isdigit()
+                    and int(length) > self.max_body_size
+            ):
+                size = int(length)
+                chunks = []
+            else:
+                chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+            for chunk in chunks:
+                size += len(chunk)
+                if keep:
+                    content.write(chunk)
+                if size > self.max_body_size:
+                    break
+                if time.monotonic() > self.deadline:
+                    self._truncated = "time"
+                    break
+            if size > self.max_body_size:
+                if self.oversize == "skip":
+                    self._truncated = "skip"
+                    self.skipped.append({"url": url, "reason": "length"})
+                else:
+                    self._truncated = "length"
+            if self._truncated:
+                logger.warning("%s %s (%s)", self._truncated, url, size)
+        except Exception:
+            self._truncated = "skip"
+            raise
+        finally:
+            response.close()
+            self._truncated = None
+        response._content = content.getvalue()
+        return response
+
+    def _write_skipped(self, warc_writer):
+        """Write metadata record listing skipped resources.
+
+        :param WARCWriter warc_writer: WARC writer
+        """
+        if not self.skipped:
+            return
+        payload = json.dumps({"skipped": self.skipped}).encode()
+        record = warc_writer.create_warc_record(
+            self.ticket.metadata["url"], "metadata",
+            payload=io.BytesIO(payload),
+            warc_content_type="application/json"
+        )
+        warc_writer.write_record(record)
+        return
+
     def _request(self):
         """Send HTTP request.
 
@@ -66,8 +385,13 @@ class Scraper(object):
         """
         try:
             scraper = cfscrape.create_scraper()
-            with warcio.capture_http.capture_http(self.ticket.archive):
-                response = scraper.get(self.ticket.metadata["url"])
+            with src.capture.capture(
+                    scraper, self.ticket.archive, filter_func=self._filter
+            ):
+                with src.metrics.span("scrape.main"):
+                    response = self._fetch_retrying(
+                        scraper, self.ticket.metadata["url"], keep=True
+                    )
         except Exception as exception:
             raise RuntimeError(
                 "failed to send HTTP request"
@@ -202,6 +526,34 @@ class Scraper(object):
         except Exception as exception:
             raise RuntimeError("failed to get <picture> URLS")
 
+    def _fetch_resource(self, session, tags, url):
+        """Fetch external resource, list it as skipped if it cannot be
+        fetched.
+
+        :param Session session: HTTP session
+        :param dict tags: tags of enclosing span
+        :param str url: URL
+        """
+        try:
+            with src.metrics.span(
+                    "scrape.resource",
+                    **dict(tags, host=urllib.parse.urlsplit(url).hostname)
+            ):
+                self._fetch_retrying(session, url)
+        except (TimeoutError, requests.Timeout):
+            self.skipped.append({"url": url, "reason": "time"})
+        except requests.ConnectionError:
+            self.skipped.append({"url": url, "reason": "disconnect"})
+        except src.retry.CircuitOpenError as exception:
+            self.skipped.append(
+                {"url": url, "reason": "circuit", "error": str(exception)}
+            )
+        except Exception as exception:
+            self.skipped.append(
+                {"url": url, "reason": "error", "error": str(exception)}
+            )
+        return
+
     def archive(
             self,
             tags=("link", "script", "img", "video", "audio", "picture")
@@ -220,10 +572,19 @@ class Scraper(object):
                 "audio": self.get_audio_tag_urls,
                 "picture": self.get_picture_tag_urls
             }
-            with warcio.capture_http.capture_http(self.ticket.archive):
-                for tag in tags:
-                    for url in get_urls[tag]():
-                        scraper.get(url)
+            urls = [url for tag in tags for url in get_urls[tag]()]
+            fetch = functools.partial(
+                self._fetch_resource, scraper, src.metrics.get_tags()
+            )
+            with src.capture.capture(
+                    scraper, self.ticket.archive, filter_func=self._filter
+            ) as warc_writer:
+                with concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.politeness.workers
+                ) as executor:
+                    for _ in executor.map(fetch, urls):
+                        pass
+                self._write_skipped(warc_writer)
         except KeyError as exception:
             raise ValueError("unsupported tag") from exception
         except Exception as exception:
@@ -22,15 +22,52 @@
 
 # standard library imports
 import sqlite3
+import collections
 
 # third party imports
 # library specific imports
+import src.ticket
+import src.metrics
+
+
+NORMALIZED_COLUMN_DEFS = collections.OrderedDict(
+    [
+        ("ticket", "TEXT PRIMARY KEY"),
+        ("username", "TEXT"),
+        ("role", "TEXT"),
+        ("password", "TEXT"),
+        ("email_addr", "TEXT"),
+        ("archive", "TEXT"),
+        ("url", "TEXT"),
+        ("title", "TEXT"),
+        ("publication_date", "TEXT"),
+        ("metadata", "TEXT"),
+        ("flag", "TEXT"),
+        ("timestamp", "TIMESTAMP")
+    ]
+)
+
+
+MAX_VARIABLES = 900
+
+
+INDEXED_COLUMNS = (
+    "username", "email_addr", "url", "title", "publication_date", "flag",
+    "timestamp"
+)
 
 
 class SQLiteClient(object):
     """OpenDACHS database client.
 
+    The table layout is either 'blob' (the default), where the columns are
+    configured in the section column_defs and the Webrecorder user and the
+    metadata are stored as JSON, or 'normalized', where the Webrecorder user
+    and frequently queried metadata fields are stored in indexed columns
+    (see NORMALIZED_COLUMN_DEFS) in addition to the metadata as JSON.
+
     :ivar ConfigParser sqlite: SQLite configuration
+    :ivar bool normalized: toggle normalized table layout on/off
     """
 
     def __init__(self, sqlite):
@@ -40,12 +77,27 @@ class SQLiteClient(object):
         """
         try:
             self.sqlite = sqlite
+            schema = sqlite["SQLite"].get("schema", fallback="blob")
+            if schema not in ["blob", "normalized"]:
+                raise ValueError("unknown schema {}".format(schema))
+            self.normalized = schema == "normalized"
         except Exception as exception:
             raise RuntimeError(
                 "failed to initialize OpenDACHS database client"
             ) from exception
         return
 
+    @property
+    def column_defs(self):
+        """Column definitions.
+
+        :returns: column definitions
+        :rtype: dict
+        """
+        if self.normalized:
+            return NORMALIZED_COLUMN_DEFS
+        return self.sqlite["column_defs"]
+
     def connect(self):
         """Connect to OpenDACHS database.
 
@@ -64,20 +116,43 @@ class SQLiteClient(object):
             ) from exception
         return connection
 
+    def _get_columns(self, connection, table):
+        """Get column names of table.
+
+        :param Connection connection: connection
+        :param str table: table
+
+        :returns: column names
+        :rtype: list
+        """
+        cursor = connection.execute("PRAGMA table_info({})".format(table))
+        return [row["name"] for row in cursor]
+
     def create_table(self):
         """Create table if not exists."""
         try:
             connection = self.connect()
+            table = self.sqlite["SQLite"]["table"]
+            if self.normalized:
+                columns = self._get_columns(connection, table)
+                if columns and "username" not in columns:
+                    connection.close()
+                    self.migrate()
+                    connection = self.connect()
             sql = "CREATE TABLE IF NOT EXISTS {table} ({column_defs})"
             column_defs = ", ".join(
                 "{} {}".format(k, v)
-                for k, v in self.sqlite["column_defs"].items()
-            )
-            sql = sql.format(
-                table=self.sqlite["SQLite"]["table"],
-                column_defs=column_defs
+                for k, v in self.column_defs.items()
             )
+            sql = sql.format(table=table, column_defs=column_defs)
             connection.execute(sql)
+            if self.normalized:
+                for column in INDEXED_COLUMNS:
+                    sql = (
+                        "CREATE INDEX IF NOT EXISTS {table}_{column} "
+                        "ON {table} ({column})"
+                    ).format(table=table, column=column)
+                    connection.execute(sql)
             connection.commit()
             connection.close()
         except Exception as exception:
@@ -86,6 +161,68 @@ class SQLiteClient(object):
             ) from exception
         return
 
+    def migrate(self):
+        """Migrate table from blob to normalized layout.
+
+        The migration is done in a single transaction: the blob table is
+        renamed, the normalized table is created and filled, and the blob
+        table is dropped.
+        """
+        try:
+            connection = self.connect()
+            connection.isolation_level = None
+            table = self.sqlite["SQLite"]["table"]
+            blob_table = "{}_blob".format(table)
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "ALTER TABLE {table} RENAME TO {blob_table}".format(
+                        table=table, blob_table=blob_table
+                    )
+                )
+                column_defs = ", ".join(
+                    "{} {}".format(k, v)
+                    for k, v in NORMALIZED_COLUMN_DEFS.items()
+                )
+                connection.execute(
+                    "CREATE TABLE {table} ({column_defs})".format(
+                        table=table, column_defs=column_defs
+                    )
+                )
+                cursor = connection.execute(
+                    "SELECT * FROM {blob_table}".format(blob_table=blob_table)
+                )
+                rows = (
+                    src.ticket.Ticket.get_ticket(tuple(row)).get_row(
+                        normalized=True
+                    )
+                    for row in cursor
+                )
+                connection.executemany(
+                    "INSERT INTO {table} VALUES ({columns})".format(
+                        table=table,
+                        columns=", ".join(
+                            "?" for _ in range(len(NORMALIZED_COLUMN_DEFS))
+                        )
+                    ),
+                    rows
+                )
+                connection.execute(
+                    "DROP TABLE {blob_table}".format(blob_table=blob_table)
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            finally:
+                connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to migrate table"
+            ) from exception
+        return
+
+    @src.metrics.timed("sqlite.insert")
     def insert(self, rows):
         """Insert rows.
 
@@ -96,7 +233,7 @@ class SQLiteClient(object):
             sql = "INSERT INTO {table} VALUES ({columns})".format(
                 table=self.sqlite["SQLite"]["table"],
                 columns=", ".join(
-                    "?" for _ in range(len(self.sqlite["column_defs"]))
+                    "?" for _ in range(len(self.column_defs))
                 )
             )
             connection.executemany(sql, rows)
@@ -108,6 +245,7 @@ class SQLiteClient(object):
             ) from exception
         return
 
+    @src.metrics.timed("sqlite.select_rows")
     def select_rows(self, column="", parameters=(), operator="="):
         """Select rows.
 
@@ -170,6 +308,82 @@ class SQLiteClient(object):
             ) from exception
         return row
 
+    def _select_rows_in(self, connection, column, values):
+        """Select rows whose column value is in values.
+
+        :param Connection connection: connection
+        :param str column: column
+        :param list values: values
+
+        :returns: rows
+        :rtype: list
+        """
+        rows = []
+        for i in range(0, len(values), MAX_VARIABLES):
+            chunk = values[i:i+MAX_VARIABLES]
+            sql = "SELECT * FROM {table} WHERE {column} IN ({values})"
+            sql = sql.format(
+                table=self.sqlite["SQLite"]["table"],
+                column=column,
+                values=", ".join("?" for _ in chunk)
+            )
+            rows.extend(tuple(row) for row in connection.execute(sql, chunk))
+        return rows
+
+    @src.metrics.timed("sqlite.select_rows_in")
+    def select_rows_in(self, column, values):
+        """Select rows whose column value is in values.
+
+        :param str column: column
+        :param list values: values
+
+        :returns: rows
+        :rtype: list
+        """
+        try:
+            connection = self.connect()
+            rows = self._select_rows_in(connection, column, list(values))
+            connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to select rows"
+            ) from exception
+        return rows
+
+    @src.metrics.timed("sqlite.update_select_rows")
+    def update_select_rows(self, column0, column1, parameters):
+        """Update rows and select updated rows in a single transaction.
+
+        :param str column0: column to be updated
+        :param str column1: column WHERE clause
+        :param list parameters: parameters
+
+        :returns: rows (updated)
+        :rtype: list
+        """
+        try:
+            connection = self.connect()
+            sql = "UPDATE {table} SET {column0} = ? WHERE {column1} = ?"
+            sql = sql.format(
+                table=self.sqlite["SQLite"]["table"],
+                column0=column0,
+                column1=column1
+            )
+            try:
+                connection.executemany(sql, parameters)
+                rows = self._select_rows_in(
+                    connection, column1, [row[1] for row in parameters]
+                )
+                connection.commit()
+            finally:
+                connection.close()
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to update and select rows"
+            ) from exception
+        return rows
+
+    @src.metrics.timed("sqlite.update_rows")
     def update_rows(self, column0, parameters, column1=""):
         """Update rows.
 
@@ -242,6 +456,7 @@ class SQLiteClient(object):
             ) from exception
         return row
 
+    @src.metrics.timed("sqlite.delete")
     def delete(self, column, parameters):
         """Delete rows.
 
@@ -0,0 +1,682 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: WARC archive storage.
+"""
+
+
+# standard library imports
+import os
+import json
+import errno
+import shutil
+import hashlib
+import logging
+import tempfile
+import urllib.parse
+
+# third party imports
+import warcio.warcwriter
+import warcio.archiveiterator
+
+# library specific imports
+
+
+CHUNK_SIZE = 2**20
+
+
+def _checksum(filename):
+    """Get SHA-256 checksum of file.
+
+    :param str filename: filename
+
+    :returns: hexadecimal digest
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(filename, mode="rb") as fp:
+        for chunk in iter(lambda: fp.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _copy_range(fsrc, fdst, size):
+    """Copy file content in kernel space.
+
+    os.copy_file_range is used if available, otherwise os.sendfile.
+
+    :param file fsrc: source file
+    :param file fdst: destination file
+    :param int size: file size
+
+    :returns: toggle (whether the file content could be copied)
+    :rtype: bool
+    """
+    infd, outfd = fsrc.fileno(), fdst.fileno()
+    for name in ["copy_file_range", "sendfile"]:
+        function = getattr(os, name, None)
+        if not function:
+            continue
+        offset = 0
+        try:
+            while offset < size:
+                if name == "copy_file_range":
+                    sent = function(infd, outfd, size-offset)
+                else:
+                    sent = function(outfd, infd, offset, size-offset)
+                if not sent:
+                    break
+                offset += sent
+        except OSError:
+            if offset:
+                raise
+            continue
+        if offset == size:
+            return True
+    return False
+
+
+def copy_file(source, destination):
+    """Copy file and verify copy.
+
+    The copy is streamed in kernel space where possible, written to a
+    temporary file next to the destination, verified against the SHA-256
+    checksum of the source and only then renamed to the destination.
+
+    :param str source: source file path
+    :param str destination: destination file path
+    """
+    try:
+        tmp = "{}.part".format(destination)
+        size = os.stat(source).st_size
+        with open(source, mode="rb") as fsrc, open(tmp, mode="wb") as fdst:
+            if not _copy_range(fsrc, fdst, size):
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+                shutil.copyfileobj(fsrc, fdst, CHUNK_SIZE)
+            fdst.flush()
+            os.fsync(fdst.fileno())
+        if _checksum(source) != _checksum(tmp):
+            raise RuntimeError("checksum mismatch")
+        shutil.copystat(source, tmp)
+        os.replace(tmp, destination)
+    except Exception as exception:
+        if os.path.exists("{}.part".format(destination)):
+            os.unlink("{}.part".format(destination))
+        raise RuntimeError(
+            "failed to copy {source} to {destination}".format(
+                source=source, destination=destination
+            )
+        ) from exception
+    return
+
+
+def move_file(source, destination):
+    """Move file.
+
+    The file is renamed if source and destination are on the same device,
+    otherwise it is copied (see copy_file) and the source is removed.
+
+    :param str source: source file path
+    :param str destination: destination file path
+    """
+    try:
+        logger = logging.getLogger().getChild(move_file.__name__)
+        try:
+            os.replace(source, destination)
+        except OSError as exception:
+            if exception.errno != errno.EXDEV:
+                raise
+            logger.info(
+                "%s and %s are on different devices, copy file",
+                source, destination
+            )
+            copy_file(source, destination)
+            os.unlink(source)
+    except Exception as exception:
+        raise RuntimeError(
+            "failed to move {source} to {destination}".format(
+                source=source, destination=destination
+            )
+        ) from exception
+    return
+
+
+def link_file(source, destination):
+    """Hardlink file.
+
+    The file is copied (see copy_file) if it cannot be hardlinked, e.g.
+    because source and destination are on different devices.
+
+    :param str source: source file path
+    :param str destination: destination file path
+    """
+    try:
+        try:
+            os.link(source, destination)
+        except OSError as exception:
+            if exception.errno not in (
+                errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP
+            ):
+                raise
+            copy_file(source, destination)
+    except Exception as exception:
+        raise RuntimeError(
+            "failed to link {source} to {destination}".format(
+                source=source, destination=destination
+            )
+        ) from exception
+    return
+
+
+def link_tree(source, destination):
+    """Hardlink directory tree.
+
+    :param str source: source directory path
+    :param str destination: destination directory path
+    """
+    try:
+        for dirpath, _, filenames in os.walk(source):
+            relpath = os.path.relpath(dirpath, source)
+            dirname = os.path.normpath(os.path.join(destination, relpath))
+            os.makedirs(dirname, exist_ok=True)
+            for filename in filenames:
+                link_file(
+                    os.path.join(dirpath, filename),
+                    os.path.join(dirname, filename)
+                )
+    except Exception as exception:
+        raise RuntimeError(
+            "failed to link {source} to {destination}".format(
+                source=source, destination=destination
+            )
+        ) from exception
+    return
+
+
+class LocalBackend(object):
+    """Local filesystem storage backend.
+
+    :ivar str root: root directory
+    """
+
+    def __init__(self, root):
+        """Initialize local filesystem storage backend.
+
+        :param str root: root directory
+        """
+        try:
+            self.root = root
+            os.makedirs(self.root, exist_ok=True)
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to initialize local filesystem storage backend"
+            ) from exception
+        return
+
+    def _get_path(self, key):
+        """Get file path of object.
+
+        :param str key: object key
+
+        :returns: file path
+        :rtype: str
+        """
+        return os.path.join(self.root, *key.split("/"))
+
+    def put(self, key, filename):
+        """Move file into storage.
+
+        :param str key: object key
+        :param str filename: filename
+        """
+        path = self._get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        move_file(filename, path)
+        return
+
+    def get(self, key, filename):
+        """Copy object to file.
+
+        :param str key: object key
+        :param str filename: filename
+        """
+        copy_file(self._get_path(key), filename)
+        return
+
+    def exists(self, key):
+        """Check whether object exists.
+
+        :param str key: object key
+
+        :returns: toggle
+        :rtype: bool
+        """
+        return os.path.exists(self._get_path(key))
+
+    def read(self, key):
+        """Read object.
+
+        :param str key: object key
+
+        :returns: content
+        :rtype: bytes
+        """
+        with open(self._get_path(key), mode="rb") as fp:
+            content = fp.read()
+        return content
+
+    def write(self, key, content):
+        """Write object.
+
+        :param str key: object key
+        :param bytes content: content
+        """
+        path = self._get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open("{}.part".format(path), mode="wb") as fp:
+            fp.write(content)
+        os.replace("{}.part".format(path), path)
+        return
+
+    def list(self, prefix):
+        """List object keys.
+
+        :param str prefix: key prefix
+
+        :returns: object keys
+        :rtype: list
+        """
+        keys = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                relpath = os.path.relpath(
+                    os.path.join(dirpath, filename), self.root
+                )
+                key = "/".join(relpath.split(os.sep))
+                if key.startswith(prefix):
+                    keys.append(key)
+        return sorted(keys)
+
+
+class S3Backend(object):
+    """S3-compatible storage backend.
+
+    Requires boto3 unless a client is passed.
+
+    :ivar str bucket: bucket
+    :ivar str prefix: key prefix
+    :ivar client: S3 client
+    """
+
+    def __init__(self, bucket, prefix="", client=None, **kwargs):
+        """Initialize S3-compatible storage backend.
+
+        :param str bucket: bucket
+        :param str prefix: key prefix
+        :param client: S3 client (default boto3 S3 client)
+        :param kwargs: boto3 client parameters, e.g. endpoint_url
+        """
+        try:
+            self.bucket = bucket
+            self.prefix = prefix
+            if client is None:
+                import boto3
+                client = boto3.client("s3", **kwargs)
+            self.client = client
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to initialize S3-compatible storage backend"
+            ) from exception
+        return
+
+    def _get_key(self, key):
+        """Get prefixed object key.
+
+        :param str key: object key
+
+        :returns: prefixed object key
+        :rtype: str
+        """
+        return self.prefix + key
+
+    def put(self, key, filename):
+        """Upload file and remove it.
+
+        :param str key: object key
+        :param str filename: filename
+        """
+        self.client.upload_file(filename, self.bucket, self._get_key(key))
+        os.unlink(filename)
+        return
+
+    def get(self, key, filename):
+        """Download object to file.
+
+        :param str key: object key
+        :param str filename: filename
+        """
+        self.client.download_file(self.bucket, self._get_key(key), filename)
+        return
+
+    def exists(self, key):
+        """Check whether object exists.
+
+        :param str key: object key
+
+        :returns: toggle
+        :rtype: bool
+        """
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._get_key(key))
+        except Exception as exception:
+            response = getattr(exception, "response", {})
+            if response.get("Error", {}).get("Code") in ["404", "NoSuchKey"]:
+                return False
+            raise
+        return True
+
+    def read(self, key):
+        """Read object.
+
+        :param str key: object key
+
+        :returns: content
+        :rtype: bytes
+        """
+        response = self.client.get_object(
+            Bucket=self.bucket, Key=self._get_key(key)
+        )
+        return response["Body"].read()
+
+    def write(self, key, content):
+        """Write object.
+
+        :param str key: object key
+        :param bytes content: content
+        """
+        self.client.put_object(
+            Bucket=self.bucket, Key=self._get_key(key), Body=content
+        )
+        return
+
+    def list(self, prefix):
+        """List object keys.
+
+        :param str prefix: key prefix
+
+        :returns: object keys
+        :rtype: list
+        """
+        keys = []
+        kwargs = {"Bucket": self.bucket, "Prefix": self._get_key(prefix)}
+        while True:
+            response = self.client.list_objects_v2(**kwargs)
+            for item in response.get("Contents", []):
+                keys.append(item["Key"][len(self.prefix):])
+            if not response.get("IsTruncated"):
+                break
+            kwargs["ContinuationToken"] = response["NextContinuationToken"]
+        return sorted(keys)
+
+
+def get_surt(url):
+    """Get SURT (Sort-friendly URI Reordering Transform) of URL.
+
+    :param str url: URL
+
+    :returns: SURT
+    :rtype: str
+    """
+    parse_result = urllib.parse.urlsplit(url)
+    hostname = (parse_result.hostname or "").lower()
+    if hostname.startswith("www."):
+        hostname = hostname[4:]
+    surt = ",".join(reversed(hostname.split(".")))
+    if parse_result.port and parse_result.port not in (80, 443):
+        surt += ":{}".format(parse_result.port)
+    surt += ")" + (parse_result.path or "/").lower()
+    if parse_result.query:
+        surt += "?" + "&".join(sorted(parse_result.query.lower().split("&")))
+    return surt
+
+
+def _get_timestamp(warc_date):
+    """Get 14-digit timestamp of WARC-Date.
+
+    :param str warc_date: WARC-Date
+
+    :returns: timestamp
+    :rtype: str
+    """
+    return "".join(char for char in warc_date if char.isdigit())[:14]
+
+
+class WARCStore(object):
+    """Compressed, deduplicated WARC archive store.
+
+    WARC archives are stored as per-record gzip compressed WARC archives
+    under warcs/<name>.warc.gz. Payloads are addressed by their digest: the
+    first response with a given payload digest is registered under
+    digests/<algorithm>/<digest>, every later response with the same
+    payload digest (in any WARC archive of the store) is stored as revisit
+    record referring to it. For each WARC archive a sorted CDXJ index is
+    written to indexes/<name>.cdxj.
+
+    :ivar backend: storage backend
+    :type: LocalBackend or S3Backend
+    """
+
+    def __init__(self, backend):
+        """Initialize WARC archive store.
+
+        :param backend: storage backend
+        :type: LocalBackend or S3Backend
+        """
+        self.backend = backend
+        return
+
+    @staticmethod
+    def _get_digest_key(digest):
+        """Get object key of payload digest.
+
+        :param str digest: payload digest
+
+        :returns: object key
+        :rtype: str
+        """
+        algorithm, _, value = digest.partition(":")
+        return "digests/{algorithm}/{value}".format(
+            algorithm=algorithm.lower(), value=value
+        )
+
+    def lookup_digest(self, digest):
+        """Look payload digest up.
+
+        :param str digest: payload digest
+
+        :returns: URL, WARC-Date and WARC archive of original or None
+        :rtype: dict or None
+        """
+        key = self._get_digest_key(digest)
+        if not self.backend.exists(key):
+            return None
+        return json.loads(self.backend.read(key).decode())
+
+    def _write_records(self, filenames, name, out, digests):
+        """Write deduplicated and compressed WARC records.
+
+        :param list filenames: WARC archive filenames
+        :param str name: name of WARC archive in store
+        :param file out: output file
+        :param dict digests: payload digests registered by this WARC archive
+
+        :returns: CDXJ index lines
+        :rtype: list
+        """
+        writer = warcio.warcwriter.WARCWriter(out, gzip=True)
+        lines = []
+        warc = "warcs/{name}.warc.gz".format(name=name)
+        for filename in filenames:
+            with open(filename, mode="rb") as fp:
+                for record in warcio.archiveiterator.ArchiveIterator(
+                        fp, arc2warc=True, verify_http=False
+                ):
+                    uri = record.rec_headers.get_header("WARC-Target-URI")
+                    date = record.rec_headers.get_header("WARC-Date")
+                    if record.rec_type == "response":
+                        writer.ensure_digest(record, block=False, payload=True)
+                        digest = record.rec_headers.get_header(
+                            "WARC-Payload-Digest"
+                        )
+                        original = (
+                            digests.get(digest)
+                            or self.lookup_digest(digest)
+                        )
+                        if original:
+                            record = writer.create_revisit_record(
+                                uri, digest, original["uri"], original["date"],
+                                http_headers=record.http_headers,
+                                warc_headers_dict={"WARC-Date": date}
+                            )
+                        else:
+                            digests[digest] = {
+                                "uri": uri, "date": date, "warc": warc
+                            }
+                    offset = out.tell()
+                    writer.write_record(record)
+                    if uri and record.rec_type in ["response", "revisit"]:
+                        entry = {
+                            "url": uri,
+                            "digest": record.rec_headers.get_header(
+                                "WARC-Payload-Digest"
+                            ),
+                            "length": str(out.tell() - offset),
+                            "offset": str(offset),
+                            "filename": warc
+                        }
+                        http_headers = record.http_headers
+                        if http_headers:
+                            entry["status"] = http_headers.get_statuscode()
+                            entry["mime"] = (
+                                http_headers.get_header("Content-Type") or ""
+                            ).split(";")[0]
+                        if record.rec_type == "revisit":
+                            entry["mime"] = "warc/revisit"
+                        lines.append(
+                            "{surt} {timestamp} {entry}".format(
+                                surt=get_surt(uri),
+                                timestamp=_get_timestamp(date),
+                                entry=json.dumps(entry, sort_keys=True)
+                            )
+                        )
+        return lines
+
+    def store(self, name, filenames):
+        """Store WARC archives as one compressed, deduplicated WARC archive.
+
+        :param str name: name of WARC archive in store
+        :param list filenames: WARC archive filenames
+
+        :returns: object key of WARC archive
+        :rtype: str
+        """
+        try:
+            logger = logging.getLogger().getChild(self.store.__name__)
+            key = "warcs/{name}.warc.gz".format(name=name)
+            digests = {}
+            fd, tmp = tempfile.mkstemp(suffix=".warc.gz")
+            try:
+                with os.fdopen(fd, mode="wb") as out:
+                    lines = self._write_records(filenames, name, out, digests)
+                self.backend.put(key, tmp)
+            finally:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+            for digest, original in digests.items():
+                self.backend.write(
+                    self._get_digest_key(digest),
+                    json.dumps(original).encode()
+                )
+            index = "".join(line + "\n" for line in sorted(lines))
+            self.backend.write(
+                "indexes/{name}.cdxj".format(name=name), index.encode()
+            )
+            logger.info(
+                "stored %s (%d records, %d new payloads)",
+                key, len(lines), len(digests)
+            )
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to store WARC archive {name}".format(name=name)
+            ) from exception
+        return key
+
+    def lookup(self, url):
+        """Look URL up in CDXJ indexes.
+
+        :param str url: URL
+
+        :returns: CDXJ index entries
+        :rtype: list
+        """
+        try:
+            surt = get_surt(url)
+            entries = []
+            for key in self.backend.list("indexes/"):
+                for line in self.backend.read(key).decode().splitlines():
+                    line_surt, timestamp, entry = line.split(" ", 2)
+                    if line_surt == surt:
+                        entry = json.loads(entry)
+                        entry["timestamp"] = timestamp
+                        entries.append(entry)
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to look {url} up".format(url=url)
+            ) from exception
+        return sorted(entries, key=lambda entry: entry["timestamp"])
+
+
+def get_warc_store(storage):
+    """Get WARC archive store.
+
+    :param ConfigParser storage: storage configuration
+
+    :returns: WARC archive store
+    :rtype: WARCStore
+    """
+    try:
+        backend = storage["storage"].get("backend", fallback="local")
+        if backend == "local":
+            backend = LocalBackend(
+                storage["storage"].get("root", fallback="storage")
+            )
+        elif backend == "s3":
+            kwargs = {k: v for k, v in storage["S3"].items() if v}
+            bucket = kwargs.pop("bucket")
+            prefix = kwargs.pop("prefix", "")
+            backend = S3Backend(bucket, prefix=prefix, **kwargs)
+        else:
+            raise ValueError("unknown storage backend {}".format(backend))
+        warc_store = WARCStore(backend)
+    except Exception as exception:
+        raise RuntimeError(
+            "failed to get WARC archive store"
+        ) from exception
+    return warc_store
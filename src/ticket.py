@@ -21,11 +21,11 @@
 
 
 # standard library imports
-import json
 import collections
 
 # third party imports
 # library specific imports
+import src.codec
 
 
 User = collections.namedtuple(
@@ -36,13 +36,27 @@ User = collections.namedtuple(
 class Ticket(object):
     """OpenDACHS ticket.
 
+    The JSON serialization of the metadata is cached, since the metadata
+    does not change after the ticket has been submitted. Assign a new dict
+    to metadata instead of changing it in place to invalidate the cache.
+
+    :ivar str id_: ticket ID
     :ivar User user: Webrecorder user
     :ivar str archive: WARC archive filename
     :ivar dict metadata: WARC archive metadata
     :ivar str flag: status flag
+    :ivar datetime.datetime timestamp: timestamp
     """
 
-    def __init__(self, id_, user, archive, metadata, flag, timestamp):
+    __slots__ = (
+        "id_", "user", "archive", "_metadata", "_metadata_json", "flag",
+        "timestamp"
+    )
+
+    def __init__(
+            self, id_, user, archive, metadata, flag, timestamp,
+            metadata_json=None
+    ):
         """Initialize OpenDACHS ticket.
 
         :param str id_: ticket ID
@@ -51,14 +65,16 @@ class Ticket(object):
         :param dict metadata: WARC archive metadata
         :param str flag: status flag
         :param datetime.datetime timestamp: timestamp
+        :param str metadata_json: JSON serialization of metadata if known
         """
         try:
             self.id_ = id_
             self.user = user
             self.archive = archive
-            self.metadata = metadata
-            self._flag = flag
-            self._timestamp = timestamp
+            self._metadata = metadata
+            self._metadata_json = metadata_json
+            self.flag = flag
+            self.timestamp = timestamp
         except Exception as exception:
             raise RuntimeError(
                 "failed to initialize OpenDACHS ticket"
@@ -66,38 +82,61 @@ class Ticket(object):
         return
 
     @property
-    def flag(self):
-        return self._flag
+    def metadata(self):
+        return self._metadata
 
-    @flag.setter
-    def flag(self, value):
-        self._flag = value
+    @metadata.setter
+    def metadata(self, value):
+        self._metadata = value
+        self._metadata_json = None
         return
 
-    @property
-    def timestamp(self):
-        return self._timestamp
+    def get_metadata_json(self):
+        """Get JSON serialization of metadata.
 
-    @timestamp.setter
-    def timestamp(self, value):
-        self._timestamp = value
-        return
+        :returns: JSON formatted string
+        :rtype: str
+        """
+        if self._metadata_json is None:
+            self._metadata_json = src.codec.dumps(self._metadata)
+        return self._metadata_json
 
-    def get_row(self):
+    def get_row(self, normalized=False):
         """Get SQLite row.
 
+        :param bool normalized: toggle normalized table layout on/off
+
         :returns: SQLite row
         :rtype: tuple
         """
         try:
-            row = (
-                self.id_,
-                json.dumps(list(self.user)),
-                self.archive,
-                json.dumps(self.metadata),
-                self.flag,
-                self.timestamp
-            )
+            if normalized:
+                title = self.metadata.get("title")
+                if isinstance(title, dict):
+                    title = title.get("romanization")
+                row = (
+                    self.id_,
+                    self.user.username,
+                    self.user.role,
+                    self.user.password,
+                    self.user.email_addr,
+                    self.archive,
+                    self.metadata.get("url"),
+                    title,
+                    self.metadata.get("publicationDate"),
+                    self.get_metadata_json(),
+                    self.flag,
+                    self.timestamp
+                )
+            else:
+                row = (
+                    self.id_,
+                    src.codec.dumps(list(self.user)),
+                    self.archive,
+                    self.get_metadata_json(),
+                    self.flag,
+                    self.timestamp
+                )
         except Exception as exception:
             raise RuntimeError(
                 "failed to get SQLite row"
@@ -105,22 +144,37 @@ class Ticket(object):
         return row
 
     @classmethod
-    def get_ticket(cls, row):
+    def get_ticket(cls, row, normalized=False):
         """Get OpenDACHS ticket based on SQLite row.
 
+        Both the blob and the normalized table layout are supported.
+
         :param tuple row: SQLite row
+        :param bool normalized: toggle normalized table layout on/off
 
         :returns: OpenDACHS ticket
         :rtype: Ticket
         """
         try:
-            id_ = row[0]
-            user = User(*json.loads(row[1]))
-            archive = row[2]
-            metadata = json.loads(row[3])
-            flag = row[4]
-            timestamp = row[5]
-            ticket = cls(id_, user, archive, metadata, flag, timestamp)
+            if normalized:
+                id_ = row[0]
+                user = User(*row[1:5])
+                archive = row[5]
+                metadata_json = row[9]
+                flag = row[10]
+                timestamp = row[11]
+            else:
+                id_ = row[0]
+                user = User(*src.codec.loads(row[1]))
+                archive = row[2]
+                metadata_json = row[3]
+                flag = row[4]
+                timestamp = row[5]
+            metadata = src.codec.loads(metadata_json)
+            ticket = cls(
+                id_, user, archive, metadata, flag, timestamp,
+                metadata_json=metadata_json
+            )
         except Exception as exception:
             raise RuntimeError(
                 "failed to get OpenDACHS ticket"
@@ -130,21 +184,26 @@ class Ticket(object):
     def get_json(self):
         """Get JSON formatted string.
 
+        The cached JSON serialization of the metadata is spliced in as is.
+
         :returns: JSON formatted string
         :rtype: str
         """
         try:
-            json_string = {
-                "id": self.id_,
-                "user": list(self.user),
-                "archive": self.archive,
-                "metadata": self.metadata,
-                "flag": self.flag,
-                "timestamp": self.timestamp.isoformat()
-            }
-            json_string = json.dumps(json_string)
+            dumps = src.codec.dumps
+            json_string = "".join(
+                [
+                    "{\"id\": ", dumps(self.id_),
+                    ", \"user\": ", dumps(list(self.user)),
+                    ", \"archive\": ", dumps(self.archive),
+                    ", \"metadata\": ", self.get_metadata_json(),
+                    ", \"flag\": ", dumps(self.flag),
+                    ", \"timestamp\": ", dumps(self.timestamp.isoformat()),
+                    "}"
+                ]
+            )
         except Exception as exception:
             raise RuntimeError(
                 "failed to get JSON formatted string"
             ) from exception
-        return json_string
\ No newline at end of file
+        return json_string
@@ -22,10 +22,8 @@
 
 # standard library imports
 import os
-import re
 import json
 import base64
-import shutil
 import random
 import string
 import logging
@@ -36,15 +34,30 @@ import subprocess
 
 # third party imports
 import bs4
-import warcio.capture_http
 import cfscrape
 
 # library specific imports
-import src.ftp
+import src.aio
 import src.email
+import src.lease
+import src.export
+import src.metrics
+import src.outbox
 import src.sqlite
 import src.ticket
 import src.scraper
+import src.storage
+import src.workers
+import src.registry
+import src.scheduler
+
+
+Result = collections.namedtuple("Result", ["data", "ticket", "exception"])
+
+WEBRECORDER_API = [
+    "docker", "exec", "-it", "webrecorder_app_1",
+    "python3", "-m", "webrecorder.opendachs"
+]
 
 
 class TicketManager(object):
@@ -53,27 +66,92 @@ class TicketManager(object):
     :ivar ConfigParser ftp: FTP configuration
     :ivar ConfigParser smtp: SMTP configuration
     :ivar ConfigParser sqlite: SQLite configuration
+    :ivar scraper: scraper configuration
+    :type: ConfigParser or None
+    :ivar worker_pool: pool of scraping worker processes if configured
+    :type: WorkerPool or None
+    :ivar SMTPPool smtp_pool: pool of SMTP connections
+    :ivar leases: work-claiming leases if configured
+    :type: Leases or None
+    :ivar registry: capture registry if configured
+    :type: CaptureRegistry or None
+    :ivar Scheduler scheduler: ticket scheduler
+    :ivar warc_store: long-term WARC archive store if configured
+    :type: WARCStore or None
+    :ivar outbox: outbound email queue if any
+    :type: Outbox or None
+    :ivar digest: operator notifications collected for digest if enabled
+    :type: list or None
     """
 
-    def __init__(self, ftp, smtp, sqlite):
+    def __init__(self, ftp, smtp, sqlite, storage=None, scraper=None):
         """Initialize ticket manager.
 
         :param ConfigParser ftp: FTP configuration
         :param ConfigParser smtp: SMTP configuration
         :param ConfigParser sqlite: SQLite configuration
+        :param storage: storage configuration
+        :type: ConfigParser or None
+        :param scraper: scraper configuration
+        :type: ConfigParser or None
         """
         try:
             self.ftp = ftp
             self.smtp = smtp
             self.sqlite = sqlite
+            self.scraper = scraper
+            self.worker_pool = src.workers.WorkerPool.get_worker_pool(scraper)
+            self.scheduler = src.scheduler.Scheduler.get_scheduler(ftp)
+            if storage is not None:
+                self.warc_store = src.storage.get_warc_store(storage)
+            else:
+                self.warc_store = None
+            self.smtp_pool = src.email.SMTPPool(self.smtp)
+            if self.smtp.getboolean("digest", "enabled", fallback=False):
+                self.digest = []
+            else:
+                self.digest = None
+            if self.smtp.has_section("templates"):
+                self._set_template_environment()
             sqlite_client = src.sqlite.SQLiteClient(self.sqlite)
             sqlite_client.create_table()
+            if self.sqlite.has_section("outbox"):
+                self.outbox = src.outbox.Outbox(self.sqlite)
+                self.outbox.create_table()
+            else:
+                self.outbox = None
+            if self.sqlite.has_section("leases"):
+                self.leases = src.lease.Leases(self.sqlite)
+                self.leases.create_table()
+            else:
+                self.leases = None
+            if self.sqlite.has_section("captures"):
+                self.registry = src.registry.CaptureRegistry(self.sqlite)
+                self.registry.create_table()
+            else:
+                self.registry = None
         except Exception as exception:
             raise RuntimeError(
                 "failed to initialize ticket manager"
             ) from exception
         return
 
+    def _set_template_environment(self):
+        """Set email template environment based on SMTP configuration."""
+        try:
+            templates = self.smtp["templates"]
+            environment = src.email.create_environment(
+                cache_size=templates.getint("cache_size", fallback=50),
+                auto_reload=templates.getboolean("auto_reload", fallback=True),
+                bytecode_cache=templates.get("bytecode_cache", fallback=None)
+            )
+            src.email.set_environment(environment)
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to set email template environment"
+            ) from exception
+        return
+
     @staticmethod
     def generate_username(length=8):
         """Generate Webrecorder username.
@@ -122,16 +200,34 @@ class TicketManager(object):
             ) from exception
         return password
 
+    def _scrape(self, ticket):
+        """Scrape URL.
+
+        :param Ticket ticket: OpenDACHS ticket
+        """
+        with src.metrics.span("scrape"):
+            scraper = src.scraper.Scraper(ticket, config=self.scraper)
+            scraper.archive()
+        return
+
     def archive(self, ticket):
         """Archive URL.
 
+        If the capture registry is configured, a fresh or in-flight
+        capture of the URL is reused (see CaptureRegistry.capture).
+
         Code snippet see https://github.com/webrecorder/warcio
 
         :param Ticket ticket: OpenDACHS ticket
         """
         try:
-            scraper = src.scraper.Scraper(ticket)
-            scraper.archive()
+            if self.registry is not None:
+                self.registry.capture(
+                    ticket.metadata["url"], ticket.archive,
+                    lambda: self._scrape(ticket)
+                )
+            else:
+                self._scrape(ticket)
         except Exception as exception:
             raise RuntimeError(
                 "failed to archive {url}".format(url=ticket.metadata["url"])
@@ -154,124 +250,58 @@ class TicketManager(object):
             ) from exception
         return
 
-    def _prettyprint(self, value, level=0):
-        """Return prettyprint.
+    @staticmethod
+    def compose_export_attachment(ticket, name, filename=None):
+        """Compose metadata export email attachment.
 
-        :param value: value
+        :param Ticket ticket: OpenDACHS ticket
+        :param str name: name of export format
+        :param str filename: filename (default filename of export format)
 
-        :returns: prettyprint
-        :rtype: str
+        :returns: metadata export attachment
+        :rtype: MIMEText
         """
         try:
-            prettyprint = ""
-            if type(value) == dict:
-                for k, v in value.items():
-                    v = self._prettyprint(v, level=level+1)
-                    if v:
-                        prettyprint += "{level}{k}:\n{v}".format(
-                            level=level*"-",
-                            k=k.title(),
-                            v=v
-                        )
-            elif type(value) == list:
-                for v in value:
-                    v = self._prettyprint(v, level=level+1)
-                    if v:
-                        prettyprint += v
-            elif type(value) == str:
-                if value:
-                    prettyprint += "{level}{v}\n".format(
-                        level=level*"-", v=value
-                    )
+            if not filename:
+                filename = src.export.get_format(name).filename
+            text = src.export.render(name, ticket.metadata, id_=ticket.id_)
+            attachment = src.email.compose_attachment(filename, text)
         except Exception as exception:
             raise RuntimeError(
-                "failed to return prettyprint"
+                "failed to compose {name} email attachment".format(name=name)
             ) from exception
-        return prettyprint
+        return attachment
 
-    def compose_plaintext_attachment(self, ticket):
+    def compose_plaintext_attachment(self, ticket, filename="info.txt"):
         """Compose plaintext email attachment.
 
         :param Ticket ticket: OpenDACHS ticket
+        :param str filename: filename
 
         :returns: plaintext attachment
         :rtype: MIMEText
         """
         try:
-            filename = "info.txt"
-            text = self._prettyprint(ticket.metadata)
-            attachment = src.email.compose_attachment(filename, text)
+            attachment = self.compose_export_attachment(
+                ticket, "plaintext", filename=filename
+            )
         except Exception as exception:
             raise RuntimeError(
                 "failed to compose plaintext email attachment"
             ) from exception
         return attachment
 
-    @staticmethod
-    def compose_ris_attachment(ticket):
+    @classmethod
+    def compose_ris_attachment(cls, ticket):
         """Compose RIS attachment.
 
-        RIS file format see https://en.wikipedia.org/wiki/RIS_(file_format)
-
         :param Ticket ticket: OpenDACHS ticket
 
         :returns: RIS attachment
         :rtype: MIMEText
         """
         try:
-            filename = "info.ris"
-            text = ""
-            tags = collections.OrderedDict(
-                [
-                    ("resourceType", "TY"),
-                    ("creator", "A{}"),
-                    ("publicationDate", "DA"),
-                    ("subjectHeading", "KW"),
-                    ("personHeading", "KW"),
-                    ("publisher", "PB"),
-                    ("title", "T{}"),
-                    ("url", "UR")
-                ]
-            )
-            field = "{tag}  - {value}\n"
-            for key, tag in tags.items():
-                if key == "creator":
-                    for count, creator in enumerate(ticket.metadata[key]):
-                        text += field.format(
-                            tag=tag.format(count),
-                            value=creator["romanization"]
-                        )
-                elif key == "publicationDate":
-                    date = re.compile("([0-9]{4})([0-9]{2})([0-9]{2})")
-                    match = date.match(ticket.metadata[key])
-                    value = "{}/{}/{}".format(
-                        match.group(1), match.group(2), match.group(3)
-                    )
-                    text += field.format(tag=tag, value=value)
-                elif key == "subjectHeading" or key == "personHeading":
-                    for keyword in ticket.metadata[key]:
-                        if keyword:
-                            text += field.format(tag=tag, value=keyword)
-                elif key == "title":
-                    text += field.format(
-                        tag=tag.format(1),
-                        value=ticket.metadata["title"]["romanization"]
-                    )
-                    if ticket.metadata["title"]["script"]:
-                        text += field.format(
-                            tag=tag.format(2),
-                            value=ticket.metadata["title"]["script"]
-                        )
-                elif key == "publisher":
-                    text += field.format(
-                        tag=tag,
-                        value=ticket.metadata[key]["romanization"]
-                    )
-                else:
-                    text += field.format(
-                        tag=tag, value=ticket.metadata[key]
-                    )
-            attachment = src.email.compose_attachment(filename, text)
+            attachment = cls.compose_export_attachment(ticket, "ris")
         except Exception as exception:
             raise RuntimeError(
                 "failed to compose RIS attachment"
@@ -325,6 +355,23 @@ class TicketManager(object):
             ) from exception
         return ticket
 
+    def _deliver(self, to_addrs, email_msg):
+        """Enqueue email if there is an outbound email queue, otherwise
+        send it right away.
+
+        :param str to_addrs: email recipient
+        :param MIMEMultipart email_msg: email message
+        """
+        if self.outbox:
+            with src.metrics.span("outbox.enqueue"):
+                self.outbox.enqueue(to_addrs, email_msg)
+        else:
+            with src.metrics.span("smtp.send"):
+                src.email.sendmail(
+                    self.smtp, to_addrs, email_msg, pool=self.smtp_pool
+                )
+        return
+
     def sendmail(self, ticket, name):
         """Send email.
 
@@ -332,50 +379,114 @@ class TicketManager(object):
         :param str name: name of email template
         """
         try:
-            subject = "OpenDACHS Ticket {}".format(ticket.id_)
-            if name == "submitted" or name == "confirmed":
-                attachment = self.compose_plaintext_attachment(ticket)
-                body = src.email.compose_body(
-                    name,
-                    ticket=ticket.id_,
-                    username=ticket.user.username,
-                    password=ticket.user.password
-                )
-            elif name in ["accepted", "denied", "expired"]:
-                if name == "accepted":
-                    attachment = self.compose_ris_attachment(ticket)
-                body = src.email.compose_body(
-                    name,
-                    ticket=ticket.id_,
-                    reply_to=self.smtp["header_fields"]["reply_to"]
-                )
-            elif name == "error":
-                body = src.email.compose_body(name, ticket=ticket.id_)
-            else:
-                raise ValueError(
-                    "unknown email template {name}".format(name=name)
-                )
-            if name in ["submitted", "accepted", "denied", "expired"]:
-                email_msg = src.email.compose_msg(
-                    self.smtp, ticket.user.email_addr, subject, body,
-                    attachment=locals().get("attachment")
-                )
-                src.email.sendmail(self.smtp, ticket.user.email_addr, email_msg)
-            else:
-                email_msg = src.email.compose_msg(
-                    self.smtp,
-                    self.smtp["header_fields"]["reply_to"],
-                    subject,
-                    body,
-                    attachment=locals().get("attachment")
-                )
-                src.email.sendmail(
-                    self.smtp, self.smtp["header_fields"]["reply_to"], email_msg
-                )
+            if self.digest is not None and name in ["confirmed", "error"]:
+                self.collect(ticket, name)
+                return
+            with src.metrics.span("email.compose"):
+                subject = "OpenDACHS Ticket {}".format(ticket.id_)
+                if name == "submitted" or name == "confirmed":
+                    attachment = self.compose_plaintext_attachment(ticket)
+                    body = src.email.compose_body(
+                        name,
+                        ticket=ticket.id_,
+                        username=ticket.user.username,
+                        password=ticket.user.password
+                    )
+                elif name in ["accepted", "denied", "expired"]:
+                    if name == "accepted":
+                        attachment = self.compose_ris_attachment(ticket)
+                    body = src.email.compose_body(
+                        name,
+                        ticket=ticket.id_,
+                        reply_to=self.smtp["header_fields"]["reply_to"]
+                    )
+                elif name == "error":
+                    body = src.email.compose_body(name, ticket=ticket.id_)
+                else:
+                    raise ValueError(
+                        "unknown email template {name}".format(name=name)
+                    )
+                if name in ["submitted", "accepted", "denied", "expired"]:
+                    email_msg = src.email.compose_msg(
+                        self.smtp, ticket.user.email_addr, subject, body,
+                        attachment=locals().get("attachment")
+                    )
+                    to_addrs = ticket.user.email_addr
+                else:
+                    email_msg = src.email.compose_msg(
+                        self.smtp,
+                        self.smtp["header_fields"]["reply_to"],
+                        subject,
+                        body,
+                        attachment=locals().get("attachment")
+                    )
+                    to_addrs = self.smtp["header_fields"]["reply_to"]
+            self._deliver(to_addrs, email_msg)
         except Exception as exception:
             raise RuntimeError("failed to send email") from exception
         return
 
+    def collect(self, ticket, name):
+        """Collect operator notification for digest.
+
+        :param Ticket ticket: OpenDACHS ticket
+        :param str name: name of email template
+        """
+        try:
+            entry = {"name": name, "ticket": ticket.id_}
+            if name == "confirmed":
+                entry["username"] = ticket.user.username
+                entry["password"] = ticket.user.password
+                entry["attachment"] = self.compose_plaintext_attachment(
+                    ticket, filename="info_{}.txt".format(ticket.id_)
+                )
+            self.digest.append(entry)
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to collect {name} notification".format(name=name)
+            ) from exception
+        return
+
+    def send_digest(self):
+        """Send collected operator notifications as digest."""
+        try:
+            if not self.digest:
+                return
+            entries = self.digest
+            self.digest = []
+            subject = "OpenDACHS Digest ({} Tickets)".format(len(entries))
+            body = src.email.compose_body("digest", entries=entries)
+            email_msg = src.email.compose_msg(
+                self.smtp,
+                self.smtp["header_fields"]["reply_to"],
+                subject,
+                body,
+                attachment=[
+                    entry["attachment"] for entry in entries
+                    if "attachment" in entry
+                ]
+            )
+            self._deliver(self.smtp["header_fields"]["reply_to"], email_msg)
+        except Exception as exception:
+            raise RuntimeError("failed to send digest") from exception
+        return
+
+    def _send_error(self, data):
+        """Send error notification for OpenDACHS ticket.
+
+        :param dict data: OpenDACHS ticket
+        """
+        logger = logging.getLogger().getChild(self._send_error.__name__)
+        try:
+            ticket = src.ticket.Ticket(data["ticket"], *(5*(None, )))
+            self.sendmail(ticket, "error")
+        except Exception:
+            logger.exception(
+                "failed to send error notification for ticket %s",
+                data.get("ticket")
+            )
+        return
+
     def upload(self, src, dest):
         """Upload existing WARC archive.
 
@@ -384,23 +495,117 @@ class TicketManager(object):
         """
         raise NotImplementedError
 
-    def submit(self, data):
+    def archive_many(self, datas):
+        """Initialize and archive OpenDACHS tickets in worker processes.
+
+        Once the time budget of the ticket scheduler is exhausted, no more
+        tickets are scraped; there is no result for tickets not scraped.
+
+        :param list datas: OpenDACHS tickets
+
+        :returns: results
+        :rtype: list
+        """
+        logger = logging.getLogger().getChild(self.archive_many.__name__)
+        results = []
+        tickets = []
+        for data in datas:
+            try:
+                tickets.append(self._initialize_ticket(data))
+            except Exception as exception:
+                results.append(self._fail("archive", data, exception))
+        reused = []
+        duplicates = {}
+        if self.registry is not None:
+            tickets, reused, duplicates = self._deduplicate(tickets)
+        with src.metrics.span("scrape.pool", tickets=len(tickets)):
+            outcomes = self.worker_pool.map(
+                tickets, exhausted=self.scheduler.exhausted
+            )
+        datas = {data["ticket"]: data for data in datas}
+        for ticket in reused:
+            logger.info("archived %s (reused capture)", ticket.id_)
+            results.append(Result(datas[ticket.id_], ticket, None))
+        for ticket, outcome in zip(tickets, outcomes):
+            data = datas[ticket.id_]
+            if outcome is None:
+                continue
+            if isinstance(outcome, Exception):
+                results.append(self._fail("archive", data, outcome))
+                for duplicate in duplicates.get(ticket.id_, []):
+                    results.append(
+                        self._fail("archive", datas[duplicate.id_], outcome)
+                    )
+                continue
+            logger.info(
+                "archived %s (%d bytes, %.1f s)",
+                ticket.id_, outcome["size"], outcome["duration"]
+            )
+            results.append(Result(data, ticket, None))
+            if self.registry is not None:
+                self.registry.record(ticket.metadata["url"], ticket.archive)
+            for duplicate in duplicates.get(ticket.id_, []):
+                data = datas[duplicate.id_]
+                try:
+                    src.storage.link_file(ticket.archive, duplicate.archive)
+                except Exception as exception:
+                    results.append(self._fail("archive", data, exception))
+                    continue
+                logger.info(
+                    "archived %s (capture of %s)", duplicate.id_, ticket.id_
+                )
+                results.append(Result(data, duplicate, None))
+        return results
+
+    def _deduplicate(self, tickets):
+        """Reuse fresh captures and group OpenDACHS tickets by URL.
+
+        Of several tickets with the same normalized URL only the first is
+        scraped, the others hardlink its WARC archive.
+
+        :param list tickets: OpenDACHS tickets
+
+        :returns: tickets to be scraped, tickets archived by reusing a
+            fresh capture and duplicates by ID of the ticket scraped
+        :rtype: tuple
+        """
+        unique = []
+        reused = []
+        duplicates = collections.defaultdict(list)
+        first = {}
+        for ticket in tickets:
+            url = ticket.metadata["url"]
+            if self.registry.reuse(url, ticket.archive):
+                reused.append(ticket)
+                continue
+            key = src.registry.normalize_url(url)
+            if key in first:
+                duplicates[first[key].id_].append(ticket)
+            else:
+                first[key] = ticket
+                unique.append(ticket)
+        return unique, reused, duplicates
+
+    def submit(self, data, ticket=None):
         """Submit new OpenDACHS ticket.
 
         :param dict data: OpenDACHS ticket
+        :param Ticket ticket: OpenDACHS ticket initialized and archived
+            beforehand (see archive_many)
 
         :returns: OpenDACHS ticket
         :rtype: Ticket
         """
         logger = logging.getLogger().getChild(self.submit.__name__)
         try:
-            ticket = self._initialize_ticket(data)
-            if "warc" not in data:
-                self.archive(ticket)
-            else:
-                self.upload(data["warc"], ticket.archive)
-            row = ticket.get_row()
+            if ticket is None:
+                ticket = self._initialize_ticket(data)
+                if "warc" not in data:
+                    self.archive(ticket)
+                else:
+                    self.upload(data["warc"], ticket.archive)
             sqlite_client = src.sqlite.SQLiteClient(self.sqlite)
+            row = ticket.get_row(normalized=sqlite_client.normalized)
             sqlite_client.insert([row])
             self.dump_ticket(ticket)
         except Exception as exception:
@@ -412,6 +617,180 @@ class TicketManager(object):
             ) from exception
         return ticket
 
+    @staticmethod
+    def _get_result(result):
+        """Get OpenDACHS ticket from result of bulk state transition.
+
+        :param Result result: result
+
+        :returns: OpenDACHS ticket
+        :rtype: Ticket
+        """
+        if result.exception:
+            raise result.exception
+        return result.ticket
+
+    def _get_tickets(self, datas, rows, normalized=False):
+        """Get OpenDACHS tickets based on SQLite rows.
+
+        :param list datas: OpenDACHS tickets
+        :param list rows: SQLite rows
+        :param bool normalized: toggle normalized table layout on/off
+
+        :returns: OpenDACHS tickets (ticket ID as key)
+        :rtype: dict
+        """
+        rows = {row[0]: row for row in rows}
+        tickets = {}
+        for data in datas:
+            if data["ticket"] in rows:
+                tickets[data["ticket"]] = src.ticket.Ticket.get_ticket(
+                    rows[data["ticket"]], normalized=normalized
+                )
+        return tickets
+
+    @staticmethod
+    def _fail(action, data, exception):
+        """Get result of failed state transition.
+
+        :param str action: action
+        :param dict data: OpenDACHS ticket
+        :param Exception exception: exception
+
+        :returns: result
+        :rtype: Result
+        """
+        logger = logging.getLogger().getChild(action)
+        logger.error(
+            "failed to %s OpenDACHS ticket %s", action, data["ticket"],
+            exc_info=(type(exception), exception, exception.__traceback__)
+        )
+        error = RuntimeError(
+            "failed to {action} OpenDACHS ticket {id}".format(
+                action=action, id=data["ticket"]
+            )
+        )
+        error.__cause__ = exception
+        return Result(data, None, error)
+
+    def claim_many(self, datas):
+        """Claim work-claiming leases on OpenDACHS tickets.
+
+        Leases held by other ticket managers are waited for until a
+        deadline shared by all tickets (see Leases.claim_many); tickets
+        whose lease is still held are being managed by another ticket
+        manager and are skipped. Leases are released at the end of
+        manage.
+
+        :param list datas: OpenDACHS tickets
+
+        :returns: OpenDACHS tickets claimed and results of tickets that
+            could not be claimed because of an error
+        :rtype: tuple
+        """
+        if self.leases is None:
+            return list(datas), []
+        logger = logging.getLogger().getChild(self.claim_many.__name__)
+        keys = ["ticket:{}".format(data["ticket"]) for data in datas]
+        try:
+            claimed_keys = self.leases.claim_many(keys)
+        except Exception as exception:
+            return [], [self._fail("claim", data, exception) for data in datas]
+        claimed = []
+        for data, key in zip(datas, keys):
+            if key in claimed_keys:
+                claimed.append(data)
+            else:
+                logger.info(
+                    "skip ticket %s, lease is held by %s",
+                    data["ticket"], self.leases.get_owner(key)
+                )
+        return claimed, []
+
+    def _transition(self, action, datas, tickets, function):
+        """Apply state transition to OpenDACHS tickets one by one.
+
+        :param str action: action
+        :param list datas: OpenDACHS tickets
+        :param tickets: OpenDACHS tickets (ticket ID as key) or exception
+        raised while selecting them
+        :type: dict or Exception
+        :param callable function: state transition
+
+        :returns: results
+        :rtype: list
+        """
+        results = []
+        for data in datas:
+            try:
+                if isinstance(tickets, Exception):
+                    raise tickets
+                if data["ticket"] not in tickets:
+                    raise ValueError(
+                        "unknown ticket {id}".format(id=data["ticket"])
+                    )
+                ticket = tickets[data["ticket"]]
+                with src.metrics.span(action, ticket=data["ticket"]):
+                    function(ticket)
+                results.append(Result(data, ticket, None))
+            except Exception as exception:
+                results.append(self._fail(action, data, exception))
+        return results
+
+    def _delete(self, action, results):
+        """Delete OpenDACHS tickets of successful state transitions.
+
+        :param str action: action
+        :param list results: results
+
+        :returns: results
+        :rtype: list
+        """
+        logger = logging.getLogger().getChild(action)
+        tickets = [result.ticket for result in results if result.ticket]
+        if not tickets:
+            return results
+        try:
+            sqlite_client = src.sqlite.SQLiteClient(self.sqlite)
+            sqlite_client.delete(
+                "ticket", [(ticket.id_,) for ticket in tickets]
+            )
+        except Exception as exception:
+            return [
+                self._fail(action, result.data, exception)
+                if result.ticket else result
+                for result in results
+            ]
+        for ticket in tickets:
+            logger.info("deleted ticket %s", ticket.id_)
+            ticket.flag = "deleted"
+            try:
+                self.dump_ticket(ticket)
+            except Exception:
+                logger.exception("failed to dump ticket %s", ticket.id_)
+        return results
+
+    def confirm_many(self, datas):
+        """Confirm tickets in a single transaction.
+
+        :param list datas: OpenDACHS tickets
+
+        :returns: results
+        :rtype: list
+        """
+        try:
+            sqlite_client = src.sqlite.SQLiteClient(self.sqlite)
+            rows = sqlite_client.update_select_rows(
+                "flag", "ticket",
+                [(data["flag"], data["ticket"]) for data in datas]
+            )
+            tickets = self._get_tickets(
+                datas, rows, normalized=sqlite_client.normalized
+            )
+        except Exception as exception:
+            tickets = exception
+        return self._transition("confirm", datas, tickets, lambda _: None)
+
     def confirm(self, data):
         """Confirm ticket.
 
@@ -420,23 +799,64 @@ class TicketManager(object):
         :returns: OpenDACHS ticket
         :rtype: Ticket
         """
-        logger = logging.getLogger().getChild(self.confirm.__name__)
+        return self._get_result(self.confirm_many([data]).pop())
+
+    def _store(self, ticket):
+        """Move WARC archive to storage.
+
+        :param Ticket ticket: OpenDACHS ticket
+        """
+        logger = logging.getLogger().getChild(self._store.__name__)
+        storage = "storage/{ticket}".format(ticket=ticket.id_)
+        path = "./../webrecorder/data/warcs/{user}".format(
+            user=ticket.user.username
+        )
+        if self.warc_store is not None:
+            if os.access(path, os.F_OK):
+                filenames = [
+                    os.path.join(path, filename)
+                    for filename in sorted(os.listdir(path))
+                    if ".warc" in filename
+                ]
+            else:
+                filenames = [ticket.archive]
+            self.warc_store.store(ticket.id_, filenames)
+            os.unlink(ticket.archive)
+        elif os.access(path, os.F_OK):
+            src.storage.link_tree(path, storage)
+            os.unlink(ticket.archive)
+        else:
+            os.makedirs(storage, exist_ok=True)
+            src.storage.move_file(
+                ticket.archive, storage+"/{}.warc".format(ticket.id_)
+            )
+        logger.info("moved WARC %s to storage", ticket.archive)
+        return
+
+    def accept_many(self, datas):
+        """Accept tickets.
+
+        The tickets are selected and deleted in one query each.
+
+        :param list datas: OpenDACHS tickets
+
+        :returns: results
+        :rtype: list
+        """
         try:
             sqlite_client = src.sqlite.SQLiteClient(self.sqlite)
-            row = sqlite_client.update_row(
-                "flag", "ticket", (data["flag"], data["ticket"])
+            rows = sqlite_client.select_rows_in(
+                "ticket", [data["ticket"] for data in datas]
             )
-            ticket = src.ticket.Ticket.get_ticket(row)
-        except Exception as exception:
-            logger.exception(
-                "failed to confirm OpenDACHS ticket %s", data["ticket"]
+            tickets = self._get_tickets(
+                datas, rows, normalized=sqlite_client.normalized
             )
-            raise RuntimeError(
-                "failed to confirm OpenDACHS ticket {id}".format(
-                    id=data["ticket"]
-                )
-            ) from exception
-        return ticket
+        except Exception as exception:
+            tickets = exception
+        return self._delete(
+            "accept",
+            self._transition("accept", datas, tickets, self._store)
+        )
 
     def accept(self, data):
         """Accept ticket.
@@ -446,38 +866,35 @@ class TicketManager(object):
         :returns: OpenDACHS ticket
         :rtype: Ticket
         """
-        logger = logging.getLogger().getChild(self.accept.__name__)
+        return self._get_result(self.accept_many([data]).pop())
+
+    def deny_many(self, datas):
+        """Deny tickets.
+
+        The tickets are selected and deleted in one query each.
+
+        :param list datas: OpenDACHS tickets
+
+        :returns: results
+        :rtype: list
+        """
         try:
             sqlite_client = src.sqlite.SQLiteClient(self.sqlite)
-            row = sqlite_client.select_row("ticket", (data["ticket"],))
-            ticket = src.ticket.Ticket.get_ticket(row)
-            storage = "storage/{ticket}".format(ticket=data["ticket"])
-            path = "./../webrecorder/data/warcs/{user}".format(
-                user=ticket.user.username
+            rows = sqlite_client.select_rows_in(
+                "ticket", [data["ticket"] for data in datas]
+            )
+            tickets = self._get_tickets(
+                datas, rows, normalized=sqlite_client.normalized
             )
-            if os.access(path, os.F_OK):
-                shutil.copytree(path, storage)
-            else:
-                os.makedirs(storage, exist_ok=True)
-                shutil.copyfile(
-                    ticket.archive, storage+"/{}.warc".format(ticket.id_)
-                )
-            os.unlink(ticket.archive)
-            logger.info("moved WARC %s to storage", ticket.archive)
-            sqlite_client.delete("ticket", [(ticket.id_,)])
-            logger.info("deleted ticket %s", ticket.id_)
-            ticket.flag = "deleted"
-            self.dump_ticket(ticket)
         except Exception as exception:
-            logger.exception(
-                "failed to accept OpenDACHS ticket %s", data["ticket"]
+            tickets = exception
+        return self._delete(
+            "deny",
+            self._transition(
+                "deny", datas, tickets,
+                lambda ticket: os.unlink(ticket.archive)
             )
-            raise RuntimeError(
-                "failed to accept OpenDACHS ticket {id}".format(
-                    id=data["ticket"]
-                )
-            ) from exception
-        return ticket
+        )
 
     def deny(self, data):
         """Deny ticket.
@@ -487,22 +904,7 @@ class TicketManager(object):
         :returns: OpenDACHS ticket
         :rtype: Ticket
         """
-        logger = logging.getLogger().getChild(self.deny.__name__)
-        try:
-            sqlite_client = src.sqlite.SQLiteClient(self.sqlite)
-            row = sqlite_client.select_row("ticket", (data["ticket"],))
-            ticket = src.ticket.Ticket.get_ticket(row)
-            os.unlink(ticket.archive)
-            sqlite_client.delete("ticket", [(ticket.id_,)])
-            ticket.flag = "deleted"
-            self.dump_ticket(ticket)
-        except Exception as exception:
-            logger.exception(
-                "failed to deny OpenDACHS ticket %s", data["ticket"])
-            raise RuntimeError(
-                "failed to deny OpenDACHS ticket {id}".format(id=data["ticket"])
-            ) from exception
-        return ticket
+        return self._get_result(self.deny_many([data]).pop())
 
     def remove_expired(self):
         """Remove expired OpenDACHS tickets."""
@@ -517,31 +919,41 @@ class TicketManager(object):
                 parameters=parameters,
                 operator="<"
             )
-            tickets = [src.ticket.Ticket.get_ticket(row) for row in rows]
+            tickets = [
+                src.ticket.Ticket.get_ticket(
+                    row, normalized=sqlite_client.normalized
+                )
+                for row in rows
+            ]
             for ticket in tickets:
-                if ticket.flag == "pending":
-                    logger.info(
-                        "remove expired ticket %s (timestamp %s)",
-                        ticket.id_, ticket.timestamp
-                    )
-                    os.unlink(ticket.archive)
-                    sqlite_client.delete("ticket", [(ticket.id_,)])
-                    ticket.flag = "deleted"
-                    self.dump_ticket(ticket)
-                    yield(ticket)
+                if ticket.flag != "pending":
+                    continue
+                if self.leases is not None:
+                    key = "ticket:{}".format(ticket.id_)
+                    if not self.leases.claim(key):
+                        logger.info("expired ticket %s is claimed", ticket.id_)
+                        continue
+                    if not sqlite_client.select_rows("ticket", (ticket.id_,)):
+                        continue
+                logger.info(
+                    "remove expired ticket %s (timestamp %s)",
+                    ticket.id_, ticket.timestamp
+                )
+                os.unlink(ticket.archive)
+                sqlite_client.delete("ticket", [(ticket.id_,)])
+                ticket.flag = "deleted"
+                self.dump_ticket(ticket)
+                yield(ticket)
         except Exception as exception:
             raise RuntimeError(
                 "failed to remove expired OpenDACHS tickets"
             ) from exception
 
+    @src.metrics.timed("call_api")
     def call_api(self):
         """Call Webrecorder API."""
         # FIXME stdout is not logged
-        args = [
-            "docker", "exec", "-it", "webrecorder_app_1",
-            "python3", "-m", "webrecorder.opendachs"
-        ]
-        child = subprocess.Popen(args, stderr=subprocess.PIPE)
+        child = subprocess.Popen(WEBRECORDER_API, stderr=subprocess.PIPE)
         while True:
             returncode = child.poll()
             if returncode is None:
@@ -555,59 +967,93 @@ class TicketManager(object):
                 )
             )
 
-    def manage(self):
-        """Manage OpenDACHS tickets."""
-        logger = logging.getLogger().getChild(self.manage.__name__)
-        logger.info("retrieve ticket files")
-        files = src.ftp.retrieve_files(self.ftp)
-        logger.info("retrieved %d tickets", len(files))
-        counter = {
-            "submitted": 0,
-            "confirmed": 0,
-            "accepted": 0,
-            "denied": 0,
-            "removed": 0
-        }
+    @staticmethod
+    def read_files(files):
+        """Read ticket files in, grouped by flag.
+
+        :param list files: ticket file filenames
+
+        :returns: OpenDACHS tickets by flag and number of unreadable files
+        :rtype: tuple
+        """
+        logger = logging.getLogger().getChild("manage")
+        failed = 0
+        datas = collections.OrderedDict(
+            [
+                ("confirmed", []),
+                ("accepted", []),
+                ("denied", []),
+                ("pending", [])
+            ]
+        )
         for filename in files:
-            with open(filename) as fp:
-                data = json.load(fp)
             try:
-                flag = data["flag"]
-                if flag == "pending":
-                    ticket = self.submit(data)
-                    flag = "submitted"
-                elif flag == "confirmed":
-                    ticket = self.confirm(data)
-                elif flag == "accepted":
-                    ticket = self.accept(data)
-                elif flag == "denied":
-                    ticket = self.deny(data)
-                else:
-                    raise ValueError("unknown flag {flag}".format(flag=flag))
-                self.call_api()
-                self.sendmail(ticket, flag)
-                counter[flag] += 1
-            except Exception as exception:
-                logger.warning("failed to manage ticket")
-                if "ticket" not in locals():
-                    ticket = src.ticket.Ticket(data["ticket"], *(5*(None, )))
-                self.sendmail(ticket, "error")
-                raise RuntimeError(
-                    "failed to manage ticket"
-                ) from exception
-        for ticket in self.remove_expired():
-            try:
-                self.call_api()
-                counter["removed"] += 1
-                self.sendmail(ticket, "expired")
-            except Exception as exception:
-                logger.warning(
-                    "failed to remove expired ticket {id}".format(id=ticket.id_)
-                )
-                self.sendmail(ticket, "error")
-                raise RuntimeError(
-                    "failed to remove expired ticket {id}".format(id=ticket.id_)
+                with src.metrics.span("json.parse") as tags:
+                    with open(filename) as fp:
+                        data = json.load(fp)
+                    tags["ticket"] = data.get("ticket")
+                    tags["flag"] = data.get("flag")
+                if data["flag"] not in datas:
+                    raise ValueError(
+                        "unknown flag {flag}".format(flag=data["flag"])
+                    )
+                datas[data["flag"]].append(data)
+            except Exception:
+                logger.exception("failed to read ticket file %s", filename)
+                failed += 1
+        return datas, failed
+
+    def read_spooled(self):
+        """Read spooled ticket files in.
+
+        If there are work-claiming leases, only ticket files whose lease
+        can be claimed are read in. Unreadable ticket files are discarded,
+        the others only once their tickets have been managed (see
+        discard_spooled), so that no ticket is lost if a run fails.
+
+        :returns: OpenDACHS tickets by flag and number of unreadable files
+        :rtype: tuple
+        """
+        filenames = self.scheduler.get_spooled()
+        if self.leases is not None:
+            filenames = [
+                filename for filename in filenames
+                if self.leases.claim(
+                    "spool:{}".format(os.path.basename(filename))
                 )
-        for key, value in counter.items():
-            logger.info("%s %d tickets", key, value)
-        return
\ No newline at end of file
+            ]
+        datas, failed = self.read_files(filenames)
+        read = set(
+            self.scheduler.get_filename(data)
+            for flag_datas in datas.values() for data in flag_datas
+        )
+        self.scheduler.discard(
+            [filename for filename in filenames if filename not in read]
+        )
+        return datas, failed
+
+    def discard_spooled(self, datas):
+        """Discard spooled ticket files of managed OpenDACHS tickets.
+
+        :param list datas: OpenDACHS tickets read in by read_spooled
+        """
+        self.scheduler.discard(
+            [self.scheduler.get_filename(data) for data in datas]
+        )
+        return
+
+    def manage(self):
+        """Manage OpenDACHS tickets one at a time.
+
+        The workflow is AsyncTicketManager.manage (see src.aio) with a
+        concurrency of 1, the Webrecorder API called by call_api and every
+        stage run inline on the calling thread.
+        """
+        async_ticket_manager = src.aio.AsyncTicketManager(
+            self, concurrency=1, inline=True
+        )
+        try:
+            src.aio.run(async_ticket_manager.manage())
+        finally:
+            async_ticket_manager.close()
+        return
@@ -0,0 +1,308 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+:synopsis: Process-pool scraping workers.
+
+Each ticket is scraped in a worker process, so that HTML parsing runs on
+all cores and the memory of bs4 trees and cfscrape state is returned to
+the operating system. Workers are recycled after a number of tickets or
+when their resident set size exceeds a threshold; only a small result
+record is sent back to the ticket manager.
+"""
+
+
+# standard library imports
+import os
+import time
+import resource
+import collections
+import configparser
+import multiprocessing
+import multiprocessing.connection
+
+# third party imports
+# library specific imports
+import src.scraper
+
+
+def get_rss():
+    """Get resident set size of current process.
+
+    :returns: resident set size in bytes
+    :rtype: int
+    """
+    try:
+        with open("/proc/self/statm") as fp:
+            rss = int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return rss
+
+
+def scrape(ticket, config=None):
+    """Scrape OpenDACHS ticket.
+
+    :param Ticket ticket: OpenDACHS ticket
+    :param config: scraper configuration
+    :type: ConfigParser or None
+
+    :returns: result record
+    :rtype: dict
+    """
+    start = time.perf_counter()
+    scraper = src.scraper.Scraper(ticket, config=config)
+    scraper.archive()
+    return {
+        "ticket": ticket.id_,
+        "archive": ticket.archive,
+        "size": os.path.getsize(ticket.archive),
+        "skipped": scraper.skipped,
+        "duration": time.perf_counter() - start
+    }
+
+
+def _work(connection, config, max_tickets, max_memory):
+    """Scrape tickets until recycled.
+
+    Tasks are received and messages sent through a pipe of the worker
+    process's own rather than shared queues, so that the ticket manager
+    knows which ticket a dying worker process held and no lock of a
+    shared queue is held by a dying worker process.
+
+    :param Connection connection: connection to receive tasks (index and
+        ticket, None to stop) from and send messages through
+    :param dict config: scraper configuration
+    :param int max_tickets: maximum number of tickets (0 for no limit)
+    :param int max_memory: maximum resident set size in bytes (0 for no
+        limit)
+    """
+    if config is not None:
+        parser = configparser.ConfigParser()
+        parser.read_dict(config)
+        config = parser
+    count = 0
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        index, ticket = task
+        try:
+            kind, value = "done", scrape(ticket, config=config)
+        except Exception as exception:
+            value = "{}: {}".format(type(exception).__name__, exception)
+            if exception.__cause__ is not None:
+                value += " ({})".format(exception.__cause__)
+            kind = "error"
+        count += 1
+        recycled = bool(
+            (max_tickets and count >= max_tickets)
+            or (max_memory and get_rss() > max_memory)
+        )
+        connection.send((kind, index, value, recycled))
+        if recycled:
+            break
+    connection.close()
+    return
+
+
+class WorkerPool(object):
+    """Pool of recycled scraping worker processes.
+
+    :ivar int workers: number of worker processes
+    :ivar int max_tickets: tickets per worker process before it is
+        recycled (0 for no limit)
+    :ivar int max_memory: resident set size in bytes above which a worker
+        process is recycled (0 for no limit)
+    :ivar dict config: scraper configuration (section as key)
+    :ivar int spawned: number of worker processes spawned so far
+    """
+
+    def __init__(self, workers=2, max_tickets=50, max_memory=0, config=None):
+        """Initialize pool of scraping worker processes.
+
+        :param int workers: number of worker processes
+        :param int max_tickets: tickets per worker process
+        :param int max_memory: resident set size in bytes
+        :param config: scraper configuration
+        :type: ConfigParser or None
+        """
+        try:
+            if workers < 1:
+                raise ValueError("workers < 1")
+            self.workers = workers
+            self.max_tickets = max_tickets
+            self.max_memory = max_memory
+            if config is not None:
+                config = {
+                    section: dict(config[section])
+                    for section in config.sections()
+                }
+            self.config = config
+            self.spawned = 0
+        except Exception as exception:
+            raise RuntimeError(
+                "failed to initialize pool of scraping workers"
+            ) from exception
+        return
+
+    @classmethod
+    def get_worker_pool(cls, scraper):
+        """Get pool of scraping worker processes if configured.
+
+        :param ConfigParser scraper: scraper configuration
+
+        :returns: pool of scraping worker processes or None
+        :rtype: WorkerPool or None
+        """
+        if scraper is None or not scraper.has_section("workers"):
+            return None
+        section = scraper["workers"]
+        if section.get("mode", fallback="inline") != "process":
+            return None
+        return cls(
+            workers=section.getint("workers", fallback=os.cpu_count() or 2),
+            max_tickets=section.getint("max_tickets", fallback=50),
+            max_memory=section.getint("max_memory", fallback=0) * 2**20,
+            config=scraper
+        )
+
+    def _spawn(self):
+        """Spawn worker process.
+
+        :returns: worker process and connection to it
+        :rtype: tuple
+        """
+        connection, child_connection = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_work,
+            args=(
+                child_connection, self.config, self.max_tickets,
+                self.max_memory
+            )
+        )
+        process.daemon = True
+        process.start()
+        child_connection.close()
+        self.spawned += 1
+        return process, connection
+
+    @staticmethod
+    def _retire(workers, connection):
+        """Retire worker process that exited or is exiting.
+
+        :param dict workers: worker processes and index of ticket being
+            scraped (connection as key)
+        :param Connection connection: connection to worker process
+
+        :returns: worker process
+        :rtype: Process
+        """
+        process, _ = workers.pop(connection)
+        connection.close()
+        process.join()
+        return process
+
+    def map(self, tickets, exhausted=None):
+        """Scrape tickets in worker processes.
+
+        Each ticket is sent to an idle worker process of its own, so a
+        worker process dying fails exactly the ticket it was sent. Once
+        the time budget is exhausted, no more tickets are sent.
+
+        :param list tickets: OpenDACHS tickets
+        :param callable exhausted: check whether time budget is exhausted
+            (default None, i.e. no time budget)
+
+        :returns: result records or exceptions (in order of tickets, None
+            if not sent)
+        :rtype: list
+        """
+        outcomes = [None] * len(tickets)
+        if not tickets:
+            return outcomes
+        tasks = collections.deque(enumerate(tickets))
+        workers = {}
+        pending = len(tickets)
+        try:
+            while pending:
+                if tasks and exhausted is not None and exhausted():
+                    pending -= len(tasks)
+                    tasks.clear()
+                    if not pending:
+                        break
+                while len(workers) < min(self.workers, pending):
+                    process, connection = self._spawn()
+                    workers[connection] = [process, None]
+                for connection, worker in list(workers.items()):
+                    if worker[1] is not None or not tasks:
+                        continue
+                    index, ticket = tasks.popleft()
+                    try:
+                        connection.send((index, ticket))
+                    except OSError as exception:
+                        process = self._retire(workers, connection)
+                        outcomes[index] = RuntimeError(
+                            "failed to send ticket to scraping worker {} "
+                            "(exit code {}): {}".format(
+                                process.pid, process.exitcode, exception
+                            )
+                        )
+                        pending -= 1
+                        continue
+                    worker[1] = index
+                busy = [
+                    connection for connection, (_, index) in workers.items()
+                    if index is not None
+                ]
+                for connection in multiprocessing.connection.wait(busy):
+                    index = workers[connection][1]
+                    try:
+                        kind, index, value, recycled = connection.recv()
+                    except EOFError:
+                        process = self._retire(workers, connection)
+                        outcomes[index] = RuntimeError(
+                            "scraping worker {} died (exit code {})".format(
+                                process.pid, process.exitcode
+                            )
+                        )
+                        pending -= 1
+                        continue
+                    workers[connection][1] = None
+                    if kind == "done":
+                        outcomes[index] = value
+                    else:
+                        outcomes[index] = RuntimeError(value)
+                    pending -= 1
+                    if recycled:
+                        self._retire(workers, connection)
+        finally:
+            for connection in workers:
+                try:
+                    connection.send(None)
+                except OSError:
+                    pass
+            for process, _ in workers.values():
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            for connection in workers:
+                connection.close()
+        return outcomes
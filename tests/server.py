@@ -0,0 +1,60 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: Local HTTP server for test cases.
+"""
+
+# standard library imports
+import threading
+import http.server
+import socketserver
+
+# third party imports
+# library specific imports
+
+
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """Threading HTTP server.
+
+    http.server.ThreadingHTTPServer is not available before Python 3.7.
+    """
+
+    daemon_threads = True
+
+
+def start(handler):
+    """Start local HTTP server serving in a daemon thread.
+
+    :param type handler: HTTP request handler class
+
+    :returns: HTTP server
+    :rtype: HTTPServer
+    """
+    server = _Server(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stop(server):
+    """Stop local HTTP server.
+
+    :param HTTPServer server: HTTP server
+    """
+    server.shutdown()
+    server.server_close()
+    return
@@ -0,0 +1,243 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: Asyncio OpenDACHS ticket manager test cases.
+"""
+
+# standard library imports
+import os
+import time
+import shutil
+import datetime
+import tempfile
+import threading
+import unittest
+import configparser
+
+# third party imports
+# library specific imports
+import src.aio
+import src.sqlite
+import src.scheduler
+import src.ticket
+import src.ticket_manager
+
+
+class StubTicketManager(object):
+    """OpenDACHS ticket manager stub submitting tickets slowly.
+
+    :ivar int active: number of tickets being submitted
+    :ivar int max_active: maximum number of tickets being submitted
+    :ivar list sent: sent emails (ticket ID and template name)
+    :ivar list errors: ticket IDs of error notifications
+    :ivar Lock lock: lock
+    :ivar Scheduler scheduler: ticket scheduler
+    """
+
+    def __init__(self):
+        """Initialize OpenDACHS ticket manager stub."""
+        self.active = 0
+        self.max_active = 0
+        self.sent = []
+        self.errors = []
+        self.lock = threading.Lock()
+        self.scheduler = src.scheduler.Scheduler(spool="spool")
+        return
+
+    def submit(self, data, ticket=None):
+        """Submit new OpenDACHS ticket.
+
+        :param dict data: OpenDACHS ticket
+        :param Ticket ticket: OpenDACHS ticket
+
+        :returns: OpenDACHS ticket
+        :rtype: Ticket
+        """
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        if data["ticket"] == "bar":
+            raise RuntimeError("failed to submit OpenDACHS ticket")
+        return src.ticket.Ticket(data["ticket"], *(5*(None, )))
+
+    def sendmail(self, ticket, name):
+        """Send email.
+
+        :param Ticket ticket: OpenDACHS ticket
+        :param str name: name of email template
+        """
+        self.sent.append((ticket.id_, name))
+        return
+
+    def _send_error(self, data):
+        """Send error notification for OpenDACHS ticket.
+
+        :param dict data: OpenDACHS ticket
+        """
+        self.errors.append(data["ticket"])
+        return
+
+
+class TestAsyncTicketManager(unittest.TestCase):
+    """Asyncio OpenDACHS ticket manager test cases.
+
+    :ivar str cwd: current working directory
+    :ivar str tmpdir: temporary working directory
+    :ivar TicketManager ticket_manager: OpenDACHS ticket manager
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+        os.makedirs("tmp/json_files")
+        os.makedirs("tmp/warcs")
+        ftp = configparser.ConfigParser()
+        ftp.read_dict(
+            {
+                "FTP": {"host": "", "user": "", "passwd": ""},
+                "cmd": {"RETR": ""}
+            }
+        )
+        smtp = configparser.ConfigParser()
+        smtp.read_dict(
+            {
+                "SMTP": {"host": "", "port": ""},
+                "header_fields": {"from": "", "reply_to": ""}
+            }
+        )
+        sqlite = configparser.ConfigParser()
+        sqlite.read_dict(
+            {
+                "SQLite": {
+                    "database": "tickets.sqlite",
+                    "table": "tickets"
+                },
+                "column_defs": {
+                    "ticket": "TEXT PRIMARY KEY",
+                    "user": "TEXT",
+                    "archive": "TEXT",
+                    "metadata": "TEXT",
+                    "flag": "TEXT",
+                    "timestamp": "TIMESTAMP"
+                }
+            }
+        )
+        self.ticket_manager = src.ticket_manager.TicketManager(
+            ftp, smtp, sqlite
+        )
+        ticket = src.ticket.Ticket(
+            "foo",
+            src.ticket.User("foo", "archivist", "password", "foo@bar.com"),
+            "tmp/warcs/foo.warc",
+            {"url": "http://foo.com"},
+            "pending",
+            datetime.datetime.now()
+        )
+        sqlite_client = src.sqlite.SQLiteClient(sqlite)
+        sqlite_client.insert([ticket.get_row()])
+
+    def tearDown(self):
+        """Tear test cases down."""
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def test_call_api(self):
+        """Call Webrecorder API.
+
+        Trying: command exiting with status 0 and 1
+        Expecting: None and RuntimeError
+        """
+        async_ticket_manager = src.aio.AsyncTicketManager(
+            self.ticket_manager, api=["true"]
+        )
+        self.assertIsNone(src.aio.run(async_ticket_manager.call_api()))
+        async_ticket_manager.api = ["false"]
+        with self.assertRaises(RuntimeError):
+            src.aio.run(async_ticket_manager.call_api())
+        async_ticket_manager.close()
+
+    def test_confirm(self):
+        """Confirm ticket.
+
+        Trying: ticket foo and unknown ticket qux
+        Expecting: foo confirmed, RuntimeError for qux
+        """
+        async_ticket_manager = src.aio.AsyncTicketManager(self.ticket_manager)
+        ticket = src.aio.run(
+            async_ticket_manager.confirm(
+                {"ticket": "foo", "flag": "confirmed"}
+            )
+        )
+        self.assertEqual(ticket.flag, "confirmed")
+        with self.assertRaises(RuntimeError):
+            src.aio.run(
+                async_ticket_manager.confirm(
+                    {"ticket": "qux", "flag": "confirmed"}
+                )
+            )
+        async_ticket_manager.close()
+
+    def test_submit_many(self):
+        """Submit new OpenDACHS tickets concurrently.
+
+        Trying: five tickets, concurrency 2, submitting bar fails
+        Expecting: at most two tickets submitted at once, bar failed
+        """
+        ticket_manager = StubTicketManager()
+        async_ticket_manager = src.aio.AsyncTicketManager(
+            ticket_manager, concurrency=2, api=["true"]
+        )
+        datas = [
+            {"ticket": id_, "flag": "pending"}
+            for id_ in ["foo", "bar", "baz", "qux", "quux"]
+        ]
+        managed = src.aio.run(async_ticket_manager.submit_many(datas))
+        async_ticket_manager.close()
+        self.assertEqual(managed, [True, False, True, True, True])
+        self.assertEqual(ticket_manager.max_active, 2)
+        self.assertEqual(ticket_manager.errors, ["bar"])
+        self.assertEqual(
+            sorted(ticket_manager.sent),
+            [
+                (id_, "submitted")
+                for id_ in sorted(["foo", "baz", "qux", "quux"])
+            ]
+        )
+
+    def test_submit_many_exhausted(self):
+        """Submit new OpenDACHS tickets concurrently.
+
+        Trying: time budget of ticket scheduler is exhausted
+        Expecting: tickets are spooled
+        """
+        ticket_manager = StubTicketManager()
+        ticket_manager.scheduler.deadline = 0
+        async_ticket_manager = src.aio.AsyncTicketManager(
+            ticket_manager, api=["true"]
+        )
+        datas = [{"ticket": id_, "flag": "pending"} for id_ in ["foo", "baz"]]
+        managed = src.aio.run(async_ticket_manager.submit_many(datas))
+        async_ticket_manager.close()
+        self.assertEqual(managed, [None, None])
+        self.assertEqual(ticket_manager.max_active, 0)
+        self.assertEqual(len(ticket_manager.scheduler.get_spooled()), 2)
@@ -0,0 +1,178 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: Per-session WARC capture test cases.
+"""
+
+# standard library imports
+import os
+import gzip
+import shutil
+import tempfile
+import threading
+import unittest
+import http.server
+
+# third party imports
+import requests
+import warcio.archiveiterator
+
+# library specific imports
+import src.capture
+import tests.server
+
+
+class HTTPRequestHandler(http.server.BaseHTTPRequestHandler):
+    """HTTP request handler echoing the path (plain, gzip or chunked)."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        """Serve GET request."""
+        body = self.path.encode() * 100
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        if self.path.startswith("/gzip"):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        if self.path.startswith("/chunked"):
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(body), 1000):
+                chunk = body[i:i+1000]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Suppress logging."""
+        return
+
+
+class TestCapture(unittest.TestCase):
+    """Per-session WARC capture test cases.
+
+    :ivar str tmpdir: temporary directory
+    :ivar HTTPServer server: HTTP server
+    :ivar str base: base URL
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.server = tests.server.start(HTTPRequestHandler)
+        self.base = "http://127.0.0.1:{}".format(self.server.server_port)
+
+    def tearDown(self):
+        """Tear test cases down."""
+        tests.server.stop(self.server)
+        shutil.rmtree(self.tmpdir)
+
+    def _capture(self, name, paths):
+        """Capture paths with a session of its own.
+
+        :param str name: WARC archive name
+        :param list paths: paths
+
+        :returns: WARC archive filename
+        :rtype: str
+        """
+        filename = os.path.join(self.tmpdir, "{}.warc.gz".format(name))
+        with requests.Session() as session:
+            with src.capture.capture(session, filename):
+                for path in paths:
+                    response = session.get(self.base + path)
+                    self.assertEqual(response.content, path.encode() * 100)
+        return filename
+
+    def _get_records(self, filename):
+        """Get response records.
+
+        :param str filename: WARC archive filename
+
+        :returns: URL and payload of response records
+        :rtype: list
+        """
+        records = []
+        with open(filename, mode="rb") as fp:
+            for record in warcio.archiveiterator.ArchiveIterator(fp):
+                if record.rec_type == "response":
+                    records.append((
+                        record.rec_headers.get_header("WARC-Target-URI"),
+                        record.content_stream().read()
+                    ))
+        return records
+
+    def test_encodings(self):
+        """Capture responses.
+
+        Trying: plain, gzip content-encoded and chunked response
+        Expecting: records replay the original payloads
+        """
+        paths = ["/plain", "/gzip", "/chunked"]
+        records = self._get_records(self._capture("foo", paths))
+        self.assertEqual(
+            records,
+            [(self.base + path, path.encode() * 100) for path in paths]
+        )
+
+    def test_concurrent(self):
+        """Capture sessions concurrently.
+
+        Trying: two sessions in two threads
+        Expecting: each WARC archive contains the records of its session only
+        """
+        paths = {
+            name: ["/{}/{}".format(name, i) for i in range(20)]
+            for name in ["foo", "bar"]
+        }
+        filenames = {}
+
+        def capture(name):
+            filenames[name] = self._capture(name, paths[name])
+
+        threads = [
+            threading.Thread(target=capture, args=(name,)) for name in paths
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for name in paths:
+            urls = [url for url, _ in self._get_records(filenames[name])]
+            self.assertEqual(
+                urls, [self.base + path for path in paths[name]]
+            )
+
+    def test_restore_adapters(self):
+        """Capture session.
+
+        Trying: leave capture context
+        Expecting: original transport adapters are mounted again
+        """
+        with requests.Session() as session:
+            adapters = dict(session.adapters)
+            filename = os.path.join(self.tmpdir, "foo.warc.gz")
+            with src.capture.capture(session, filename):
+                self.assertIsInstance(
+                    session.get_adapter(self.base), src.capture.WARCAdapter
+                )
+            self.assertEqual(dict(session.adapters), adapters)
@@ -0,0 +1,166 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: Character encoding test cases.
+"""
+
+# standard library imports
+import codecs
+import unittest
+from unittest import mock
+
+# third party imports
+import requests
+
+# library specific imports
+import src.charset
+
+
+class TestCharset(unittest.TestCase):
+    """Character encoding test cases.
+
+    :ivar str text: Japanese text
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        src.charset.clear_cache()
+        self.text = "日本語のテキスト、東京大学の資料。" * 20
+
+    def tearDown(self):
+        """Tear test cases down."""
+        src.charset.clear_cache()
+
+    def _get_response(self, content, content_type=None, url=None):
+        """Get HTTP response.
+
+        :param bytes content: body
+        :param str content_type: Content-Type header
+        :param str url: URL
+
+        :returns: HTTP response
+        :rtype: Response
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response._content = content
+        response.url = url
+        if content_type:
+            response.headers["Content-Type"] = content_type
+        return response
+
+    def test_normalize(self):
+        """Normalize name of character encoding.
+
+        Trying: labels of Shift_JIS, ISO-8859-1, unknown encoding
+        Expecting: Python codec name, windows-1252, None
+        """
+        self.assertEqual("shift_jis", src.charset.normalize(b"Shift_JIS"))
+        self.assertEqual("cp1252", src.charset.normalize("ISO-8859-1"))
+        self.assertIsNone(src.charset.normalize("foo"))
+
+    def test_http_charset(self):
+        """Get character encoding.
+
+        Trying: charset of Content-Type header and <meta> declaration
+        Expecting: Content-Type header takes precedence
+        """
+        content = "<meta charset='utf-8'>{}".format(self.text)
+        content = content.encode("euc_jp")
+        self.assertEqual(
+            "euc_jp",
+            src.charset.get_charset(
+                content, content_type='text/html; charset="EUC-JP"'
+            )
+        )
+
+    def test_meta_charset(self):
+        """Get character encoding.
+
+        Trying: <meta charset>, <meta http-equiv> declarations
+        Expecting: declared character encodings
+        """
+        self.assertEqual(
+            "gb2312",
+            src.charset.get_charset(
+                b"<html><head><meta charset=gb2312>", "text/html"
+            )
+        )
+        self.assertEqual(
+            "big5",
+            src.charset.get_charset(
+                b'<meta http-equiv="Content-Type" '
+                b'content="text/html; charset=Big5">'
+            )
+        )
+        self.assertIsNone(
+            src.charset.get_meta_charset(
+                b" " * 1024 + b"<meta charset='big5'>"
+            )
+        )
+
+    def test_bom(self):
+        """Decode body of HTTP response.
+
+        Trying: UTF-8 byte order mark, windows-1252 Content-Type header
+        Expecting: document is decoded as UTF-8 without byte order mark
+        """
+        response = self._get_response(
+            codecs.BOM_UTF8 + self.text.encode("utf-8"),
+            content_type="text/html; charset=windows-1252"
+        )
+        self.assertEqual(self.text, src.charset.decode(response))
+
+    def test_detect(self):
+        """Decode body of HTTP response.
+
+        Trying: undeclared UTF-8, Shift_JIS documents
+        Expecting: documents are decoded
+        """
+        response = self._get_response(self.text.encode("utf-8"))
+        self.assertEqual(self.text, src.charset.decode(response))
+        response = self._get_response(
+            "<p>{}</p>".format(self.text).encode("shift_jis")
+        )
+        self.assertEqual(
+            "<p>{}</p>".format(self.text), src.charset.decode(response)
+        )
+
+    def test_host_cache(self):
+        """Decode body of HTTP response.
+
+        Trying: two undeclared Shift_JIS documents and a UTF-8 document of
+        the same host
+        Expecting: character encoding is detected once, UTF-8 document
+        of the same host is decoded as UTF-8
+        """
+        content = self.text.encode("shift_jis")
+        with mock.patch.object(
+            src.charset, "detect", wraps=src.charset.detect
+        ) as detect:
+            for path in ("foo", "bar"):
+                response = self._get_response(
+                    content, url="http://example.jp/{}".format(path)
+                )
+                self.assertEqual(self.text, src.charset.decode(response))
+            self.assertEqual(1, detect.call_count)
+            response = self._get_response(
+                "Grüße".encode("utf-8"), url="http://example.jp/baz"
+            )
+            self.assertEqual("Grüße", src.charset.decode(response))
+            self.assertEqual(1, detect.call_count)
@@ -0,0 +1,106 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: Adaptive per-host concurrency test cases.
+"""
+
+# standard library imports
+import time
+import unittest
+
+# third party imports
+# library specific imports
+import src.metrics
+import src.politeness
+import src.concurrency
+
+
+class TestAdaptiveLimit(unittest.TestCase):
+    """AIMD limit test cases.
+
+    :ivar AdaptiveLimit adaptive: AIMD limit
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        self.adaptive = src.concurrency.AdaptiveLimit(
+            "example.org", initial_limit=2, max_limit=4
+        )
+        src.metrics.reset()
+        src.metrics.enable()
+
+    def tearDown(self):
+        """Tear test cases down."""
+        src.metrics.enable(False)
+        src.metrics.reset()
+
+    def test_increase(self):
+        """Update limit.
+
+        Trying: responses within tolerated latency
+        Expecting: limit increases by one per limit responses up to
+        max_limit, increase events are recorded
+        """
+        for _ in range(2):
+            self.adaptive.update(time.monotonic(), 0.1, 200)
+        self.assertEqual(self.adaptive.get_limit(), 2)
+        self.adaptive.update(time.monotonic(), 0.1, 200)
+        self.assertEqual(self.adaptive.get_limit(), 3)
+        for _ in range(20):
+            self.adaptive.update(time.monotonic(), 0.1, 200)
+        self.assertEqual(self.adaptive.get_limit(), 4)
+        events = [
+            (span["flag"], span["previous"], span["limit"])
+            for span in src.metrics.get_spans()
+        ]
+        self.assertEqual(events, [("increase", 2, 3), ("increase", 3, 4)])
+
+    def test_decrease(self):
+        """Update limit.
+
+        Trying: 429 response, failed request started before decrease,
+        slow response started after decrease
+        Expecting: limit halved once per round trip down to min_limit
+        """
+        self.adaptive.limit = 4
+        self.adaptive.update(time.monotonic(), 0.1, 200)
+        started = time.monotonic()
+        self.adaptive.update(started, 0.1, 429)
+        self.assertEqual(self.adaptive.get_limit(), 2)
+        self.adaptive.update(started)
+        self.assertEqual(self.adaptive.get_limit(), 2)
+        self.adaptive.update(time.monotonic(), 1.0, 200)
+        self.assertEqual(self.adaptive.get_limit(), 1)
+        self.adaptive.update(time.monotonic())
+        self.assertEqual(self.adaptive.limit, 1)
+        span = src.metrics.get_spans()[-1]
+        self.assertEqual(span["stage"], "scrape.limit")
+        self.assertEqual(span["flag"], "decrease")
+        self.assertEqual(span["host"], "example.org")
+
+    def test_host_limiter(self):
+        """Wait for connection.
+
+        Trying: adaptive limit of 2, third connection
+        Expecting: TimeoutError
+        """
+        limiter = src.politeness.HostLimiter(adaptive=self.adaptive)
+        limiter.acquire()
+        limiter.acquire()
+        with self.assertRaises(TimeoutError):
+            limiter.acquire(deadline=time.monotonic() + 0.1)
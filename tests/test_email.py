@@ -20,25 +20,101 @@
 """
 
 # standard library imports
+import os
+import socket
 import shutil
+import tempfile
 import unittest
+import threading
+import socketserver
+import configparser
+import email.mime.text
 
 # third party imports
 # library specific imports
 import src.email
 
 
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP session handler."""
+
+    def _reply(self, line):
+        """Send reply.
+
+        :param str line: reply line
+        """
+        self.wfile.write("{}\r\n".format(line).encode())
+        return
+
+    def handle(self):
+        """Handle SMTP session."""
+        self.server.connections += 1
+        self._reply("220 localhost ESMTP")
+        data = None
+        for line in self.rfile:
+            line = line.decode().rstrip("\r\n")
+            if data is not None:
+                if line == ".":
+                    self.server.messages.append("\n".join(data))
+                    if self.server.disconnect:
+                        break
+                    data = None
+                    self._reply("250 OK")
+                else:
+                    data.append(line)
+                continue
+            command = line[:4].upper()
+            if command in ("HELO", "EHLO"):
+                self._reply("250 localhost")
+            elif command in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.server.commands.append(command)
+                self._reply("250 OK")
+            elif command == "DATA":
+                data = []
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+            elif command == "QUIT":
+                self.server.commands.append(command)
+                self._reply("221 Bye")
+                break
+            else:
+                self._reply("502 Command not implemented")
+        return
+
+
+class SMTPServer(socketserver.ThreadingTCPServer):
+    """Local SMTP stand-in.
+
+    :ivar int connections: number of connections
+    :ivar list messages: received messages
+    :ivar list commands: received commands
+    :ivar bool disconnect: toggle disconnecting after receiving a message
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        """Initialize local SMTP stand-in."""
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.connections = 0
+        self.messages = []
+        self.commands = []
+        self.disconnect = False
+        return
+
+
 class TestEmail(unittest.TestCase):
     """Test email composition and sending."""
 
     def test_load_templates(self):
         """Load email templates.
 
-        Expecting: templates 'accepted', 'confirmed', 'denied', 'error',
-        'expired' and 'submitted'
+        Expecting: templates 'accepted', 'confirmed', 'denied', 'digest',
+        'error', 'expired' and 'submitted'
         """
         templates = [
-            "accepted", "confirmed", "denied", "error", "expired", "submitted"
+            "accepted", "confirmed", "denied", "digest", "error", "expired",
+            "submitted"
         ]
         loader = src.email._load_templates(path="./../templates_sample")
         self.assertEqual(templates, loader.list_templates())
@@ -46,12 +122,13 @@ class TestEmail(unittest.TestCase):
     def test_load_existing_template(self):
         """Load email template.
 
-        Trying: template is one of 'accepted', 'confirmed', 'denied', 'error'
-        'expired' and 'submitted'
+        Trying: template is one of 'accepted', 'confirmed', 'denied',
+        'digest', 'error' 'expired' and 'submitted'
         Expecting: template is loaded
         """
         templates = [
-            "accepted", "confirmed", "denied", "error", "expired", "submitted"
+            "accepted", "confirmed", "denied", "digest", "error", "expired",
+            "submitted"
         ]
         for template in templates:
             loaded_template = src.email.load_template(
@@ -66,4 +143,151 @@ class TestEmail(unittest.TestCase):
         Expecting: RuntimeError
         """
         with self.assertRaises(RuntimeError):
-            src.email.load_template("foo", path="./../templates_sample")
\ No newline at end of file
+            src.email.load_template("foo", path="./../templates_sample")
+
+    def test_load_cached_template(self):
+        """Load email template.
+
+        Trying: load template 'accepted' twice
+        Expecting: compiled template is reused
+        """
+        template = src.email.load_template(
+            "accepted", path="./../templates_sample"
+        )
+        self.assertIs(
+            template,
+            src.email.load_template("accepted", path="./../templates_sample")
+        )
+
+    def test_load_modified_template(self):
+        """Load email template.
+
+        Trying: template file is modified after it has been loaded
+        Expecting: modified template is loaded
+        """
+        with tempfile.TemporaryDirectory() as path:
+            filename = os.path.join(path, "foo")
+            with open(filename, mode="w") as fp:
+                fp.write("foo")
+            environment = src.email.create_environment(path=path)
+            src.email.set_environment(environment, path=path)
+            template = src.email.load_template("foo", path=path)
+            self.assertEqual("foo", template.render())
+            with open(filename, mode="w") as fp:
+                fp.write("bar")
+            mtime = os.path.getmtime(filename) + 1
+            os.utime(filename, (mtime, mtime))
+            template = src.email.load_template("foo", path=path)
+            self.assertEqual("bar", template.render())
+
+    def test_bytecode_cache(self):
+        """Create email template environment.
+
+        Trying: bytecode_cache is a directory
+        Expecting: compiled templates are written to the directory
+        """
+        with tempfile.TemporaryDirectory() as bytecode_cache:
+            environment = src.email.create_environment(
+                path="./../templates_sample", bytecode_cache=bytecode_cache
+            )
+            environment.get_template("accepted")
+            self.assertTrue(os.listdir(bytecode_cache))
+
+
+class TestSMTPPool(unittest.TestCase):
+    """Pool of SMTP connections test cases.
+
+    :ivar SMTPServer server: local SMTP stand-in
+    :ivar ConfigParser smtp: SMTP configuration
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        self.server = SMTPServer()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.smtp = configparser.ConfigParser()
+        self.smtp.read_dict(
+            {
+                "SMTP": {
+                    "host": "127.0.0.1",
+                    "port": str(self.server.server_address[1])
+                },
+                "header_fields": {
+                    "from": "foo@bar.com", "reply_to": "foo@bar.com"
+                }
+            }
+        )
+        self.msg = email.mime.text.MIMEText("foo")
+
+    def tearDown(self):
+        """Tear test cases down."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_reuse_connection(self):
+        """Send emails.
+
+        Trying: send 3 emails with the same pool
+        Expecting: 3 messages sent over 1 connection
+        """
+        pool = src.email.SMTPPool(self.smtp)
+        for _ in range(3):
+            src.email.sendmail(self.smtp, "baz@bar.com", self.msg, pool=pool)
+        pool.close()
+        self.assertEqual(3, len(self.server.messages))
+        self.assertEqual(1, self.server.connections)
+        self.assertIn("NOOP", self.server.commands)
+
+    def test_reconnect(self):
+        """Send emails.
+
+        Trying: idle connection is shut down between 2 emails
+        Expecting: 2 messages sent over 2 connections
+        """
+        pool = src.email.SMTPPool(self.smtp)
+        src.email.sendmail(self.smtp, "baz@bar.com", self.msg, pool=pool)
+        smtp_client, _ = pool._idle[0]
+        smtp_client.sock.shutdown(socket.SHUT_RDWR)
+        src.email.sendmail(self.smtp, "baz@bar.com", self.msg, pool=pool)
+        pool.close()
+        self.assertEqual(2, len(self.server.messages))
+        self.assertEqual(2, self.server.connections)
+
+    def test_disconnect_after_data(self):
+        """Send email.
+
+        Trying: connection is lost after the message has been received
+        Expecting: RuntimeError, message is not sent once more
+        """
+        self.server.disconnect = True
+        pool = src.email.SMTPPool(self.smtp)
+        with self.assertRaises(RuntimeError):
+            src.email.sendmail(self.smtp, "baz@bar.com", self.msg, pool=pool)
+        pool.close()
+        self.assertEqual(1, len(self.server.messages))
+        self.assertEqual(1, self.server.connections)
+
+    def test_keepalive_expired(self):
+        """Send emails.
+
+        Trying: keepalive < 0
+        Expecting: every message is sent over a new connection
+        """
+        pool = src.email.SMTPPool(self.smtp, keepalive=-1)
+        for _ in range(2):
+            src.email.sendmail(self.smtp, "baz@bar.com", self.msg, pool=pool)
+        pool.close()
+        self.assertEqual(2, len(self.server.messages))
+        self.assertEqual(2, self.server.connections)
+
+    def test_no_pool(self):
+        """Send email.
+
+        Trying: no pool
+        Expecting: message is sent and connection is closed with QUIT
+        """
+        src.email.sendmail(self.smtp, "baz@bar.com", self.msg)
+        self.assertEqual(1, len(self.server.messages))
+        self.assertIn("QUIT", self.server.commands)
\ No newline at end of file
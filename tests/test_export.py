@@ -0,0 +1,129 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: Metadata export format test cases.
+"""
+
+# standard library imports
+import json
+import unittest
+
+# third party imports
+# library specific imports
+import src.export
+
+
+class TestExport(unittest.TestCase):
+    """Metadata export format test cases.
+
+    :ivar dict metadata: WARC archive metadata
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        self.metadata = {
+            "url": "http://foo.com/bar.html",
+            "resourceType": "ELEC",
+            "creator": [
+                {"romanization": "Li Bai", "script": ""},
+                {"romanization": "Du Fu", "script": ""}
+            ],
+            "publicationDate": "20181113",
+            "subjectHeading": ["poetry", ""],
+            "personHeading": ["Tang"],
+            "publisher": {"romanization": "Foo & Bar", "script": ""},
+            "title": {"romanization": "Jing ye si", "script": "foo"}
+        }
+
+    def test_ris(self):
+        """Render metadata as RIS.
+
+        Trying: metadata (setUp method)
+        Expecting: corresponding RIS
+        """
+        ris = (
+            "TY  - ELEC\n"
+            "A0  - Li Bai\n"
+            "A1  - Du Fu\n"
+            "DA  - 2018/11/13\n"
+            "KW  - poetry\n"
+            "KW  - Tang\n"
+            "PB  - Foo & Bar\n"
+            "T1  - Jing ye si\n"
+            "T2  - foo\n"
+            "UR  - http://foo.com/bar.html\n"
+        )
+        self.assertEqual(ris, src.export.render("ris", self.metadata))
+
+    def test_plaintext(self):
+        """Render metadata as plaintext.
+
+        Trying: nested metadata with empty values
+        Expecting: indented plaintext without empty values
+        """
+        metadata = {"foo": "bar", "baz": {"qux": ["quux", ""]}, "corge": ""}
+        plaintext = "Foo:\n-bar\nBaz:\n-Qux:\n---quux\n"
+        self.assertEqual(plaintext, src.export.render("plaintext", metadata))
+
+    def test_bibtex(self):
+        """Render metadata as BibTeX.
+
+        Trying: metadata (setUp method), ID = foo
+        Expecting: @misc entry with escaped special characters
+        """
+        bibtex = src.export.render("bibtex", self.metadata, id_="foo")
+        self.assertTrue(bibtex.startswith("@misc{foo,\n"))
+        self.assertIn("  author = {Li Bai and Du Fu}", bibtex)
+        self.assertIn("  publisher = {Foo \\& Bar}", bibtex)
+        self.assertTrue(bibtex.endswith("\n}\n"))
+
+    def test_csl_json(self):
+        """Render metadata as CSL-JSON.
+
+        Trying: metadata (setUp method), ID = foo
+        Expecting: corresponding CSL-JSON item
+        """
+        item = json.loads(
+            src.export.render("csl_json", self.metadata, id_="foo")
+        ).pop()
+        self.assertEqual("foo", item["id"])
+        self.assertEqual("webpage", item["type"])
+        self.assertEqual([[2018, 11, 13]], item["issued"]["date-parts"])
+        self.assertEqual(
+            [{"literal": "Li Bai"}, {"literal": "Du Fu"}], item["author"]
+        )
+
+    def test_unknown_format(self):
+        """Render metadata.
+
+        Trying: name = foo
+        Expecting: RuntimeError
+        """
+        with self.assertRaises(RuntimeError):
+            src.export.render("foo", self.metadata)
+
+    def test_register(self):
+        """Register metadata export format.
+
+        Trying: register format foo
+        Expecting: format foo is used to render metadata
+        """
+        src.export.register("foo", lambda metadata, id_: "foo", "foo.txt")
+        self.assertEqual("foo", src.export.render("foo", self.metadata))
+        self.assertEqual("foo.txt", src.export.get_format("foo").filename)
+        del src.export._formats["foo"]
@@ -0,0 +1,169 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: Work-claiming lease test cases.
+"""
+
+# standard library imports
+import os
+import time
+import tempfile
+import threading
+import unittest
+import configparser
+
+# third party imports
+# library specific imports
+import src.lease
+
+
+class TestLeases(unittest.TestCase):
+    """Work-claiming lease test cases.
+
+    :ivar str database: database
+    :ivar Leases leases: work-claiming leases of owner foo
+    :ivar Leases other: work-claiming leases of owner bar
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        fp, self.database = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fp)
+        sqlite = configparser.ConfigParser()
+        sqlite.read_dict(
+            {
+                "SQLite": {"database": self.database, "table": "tickets"},
+                "leases": {"table": "leases", "ttl": "60", "wait": "0"}
+            }
+        )
+        self.leases = src.lease.Leases(sqlite, owner="foo")
+        self.leases.create_table()
+        self.other = src.lease.Leases(sqlite, owner="bar")
+
+    def tearDown(self):
+        """Tear test cases down."""
+        os.unlink(self.database)
+
+    def test_claim(self):
+        """Claim lease.
+
+        Trying: claim lease held by other owner, claim lease held
+        Expecting: lease is claimed once by each owner
+        """
+        self.assertTrue(self.leases.claim("ticket:foo"))
+        self.assertFalse(self.other.claim("ticket:foo"))
+        self.assertTrue(self.leases.claim("ticket:foo"))
+        self.assertTrue(self.other.claim("ticket:bar"))
+        self.assertEqual("foo", self.other.get_owner("ticket:foo"))
+        self.assertEqual({"ticket:foo"}, self.leases.held)
+
+    def test_claim_expired(self):
+        """Claim lease.
+
+        Trying: lease of crashed owner has expired
+        Expecting: lease is claimed, lost by crashed owner
+        """
+        self.assertTrue(self.leases.claim("ticket:foo", ttl=0))
+        self.assertIsNone(self.other.get_owner("ticket:foo"))
+        self.assertTrue(self.other.claim("ticket:foo"))
+        self.assertEqual(["ticket:foo"], self.leases.renew_all())
+        self.assertEqual(set(), self.leases.held)
+        self.assertEqual("bar", self.leases.get_owner("ticket:foo"))
+
+    def test_renew(self):
+        """Renew lease.
+
+        Trying: renew lease held
+        Expecting: lease does not expire
+        """
+        self.leases.claim("ticket:foo", ttl=0)
+        self.assertTrue(self.leases.renew("ticket:foo"))
+        self.assertFalse(self.other.claim("ticket:foo"))
+        self.assertFalse(self.other.renew("ticket:foo"))
+
+    def test_release(self):
+        """Release lease.
+
+        Trying: release lease held, release lease of other owner
+        Expecting: only lease held is released
+        """
+        self.leases.claim("ticket:foo")
+        self.other.release("ticket:foo")
+        self.assertEqual("foo", self.leases.get_owner("ticket:foo"))
+        self.leases.release("ticket:foo")
+        self.assertIsNone(self.leases.get_owner("ticket:foo"))
+        self.assertTrue(self.other.claim("ticket:foo"))
+
+    def test_acquire(self):
+        """Claim lease, waiting for it to be released.
+
+        Trying: lease is released by other owner after 0.2 seconds
+        Expecting: lease is claimed after release, not without waiting
+        """
+        self.other.claim("ticket:foo")
+        self.assertFalse(self.leases.acquire("ticket:foo"))
+        timer = threading.Timer(0.2, self.other.release_all)
+        timer.start()
+        start = time.monotonic()
+        self.assertTrue(
+            self.leases.acquire("ticket:foo", timeout=5, interval=0.05)
+        )
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        timer.join()
+
+    def test_claim_many(self):
+        """Claim leases.
+
+        Trying: bar held by other owner, released after 0.2 seconds, qux
+        held by other owner, timeout of 0.5 seconds
+        Expecting: foo and baz claimed at once, bar after release, qux not
+        claimed, one deadline for bar and qux
+        """
+        self.other.claim("ticket:bar")
+        self.other.claim("ticket:qux")
+        self.assertEqual(
+            {"ticket:foo", "ticket:baz"},
+            self.leases.claim_many(["ticket:foo", "ticket:bar", "ticket:baz"])
+        )
+        timer = threading.Timer(
+            0.2, self.other.release, args=("ticket:bar",)
+        )
+        timer.start()
+        start = time.monotonic()
+        self.assertEqual(
+            {"ticket:bar"},
+            self.leases.claim_many(
+                ["ticket:bar", "ticket:qux"], timeout=0.5, interval=0.05
+            )
+        )
+        self.assertLess(time.monotonic() - start, 0.9)
+        timer.join()
+
+    def test_lease_keeper(self):
+        """Renew leases held in background thread.
+
+        Trying: lease with short time to live, renewed every 0.05 seconds
+        Expecting: lease does not expire
+        """
+        self.leases.ttl = 0.2
+        self.leases.claim("ticket:foo")
+        keeper = src.lease.LeaseKeeper(self.leases, interval=0.05)
+        keeper.start()
+        time.sleep(0.5)
+        keeper.stop()
+        self.assertFalse(self.other.claim("ticket:foo"))
@@ -0,0 +1,142 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: Timing span test cases.
+"""
+
+# standard library imports
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+# third party imports
+# library specific imports
+import src.metrics
+
+
+class TestMetrics(unittest.TestCase):
+    """Timing span test cases.
+
+    :ivar str tmpdir: temporary directory
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        self.tmpdir = tempfile.mkdtemp()
+        src.metrics.reset()
+        src.metrics.enable()
+
+    def tearDown(self):
+        """Tear test cases down."""
+        src.metrics.enable(False)
+        src.metrics.reset()
+        shutil.rmtree(self.tmpdir)
+
+    def test_disabled(self):
+        """Time stage.
+
+        Trying: recording disabled
+        Expecting: no span is recorded
+        """
+        src.metrics.enable(False)
+        with src.metrics.span("foo"):
+            pass
+        self.assertEqual(src.metrics.get_spans(), [])
+
+    def test_nested(self):
+        """Time nested stages.
+
+        Trying: inner span within outer span tagged with ticket and flag
+        Expecting: inner span inherits tags, inner span is recorded first
+        """
+        with src.metrics.span("foo", ticket="bar", flag="pending") as tags:
+            with src.metrics.span("baz"):
+                pass
+            tags["flag"] = "confirmed"
+        inner, outer = src.metrics.get_spans()
+        self.assertEqual(
+            (inner["stage"], inner["ticket"], inner["flag"]),
+            ("baz", "bar", "pending")
+        )
+        self.assertEqual(
+            (outer["stage"], outer["flag"]), ("foo", "confirmed")
+        )
+        self.assertGreaterEqual(outer["duration"], inner["duration"])
+
+    def test_error(self):
+        """Time failing stage.
+
+        Trying: exception raised within span
+        Expecting: exception is propagated, span is marked as error
+        """
+        with self.assertRaises(ValueError):
+            with src.metrics.span("foo"):
+                raise ValueError()
+        self.assertTrue(src.metrics.get_spans()[0]["error"])
+
+    def test_write_jsonl(self):
+        """Write spans to JSON lines file.
+
+        Trying: two spans
+        Expecting: two JSON lines
+        """
+        for stage in ["foo", "bar"]:
+            with src.metrics.span(stage, ticket="baz"):
+                pass
+        filename = os.path.join(self.tmpdir, "spans.jsonl")
+        src.metrics.write_jsonl(filename)
+        with open(filename) as fp:
+            records = [json.loads(line) for line in fp]
+        self.assertEqual(
+            [record["stage"] for record in records], ["foo", "bar"]
+        )
+
+    def test_write_prometheus(self):
+        """Write spans to Prometheus text file.
+
+        Trying: three spans of two stages, one failed
+        Expecting: aggregated by stage and flag, no ticket label
+        """
+        spans = [
+            {"stage": "foo", "flag": "pending", "ticket": "a",
+             "duration": 1.0, "error": False},
+            {"stage": "foo", "flag": "pending", "ticket": "b",
+             "duration": 2.0, "error": True},
+            {"stage": "bar", "duration": 0.5, "error": False}
+        ]
+        filename = os.path.join(self.tmpdir, "opendachs.prom")
+        src.metrics.write_prometheus(filename, spans=spans)
+        with open(filename) as fp:
+            lines = fp.read().splitlines()
+        self.assertIn(
+            'opendachs_stage_duration_seconds_sum'
+            '{stage="foo",flag="pending"} 3.0',
+            lines
+        )
+        self.assertIn(
+            'opendachs_stage_duration_seconds_count'
+            '{stage="foo",flag="pending"} 2',
+            lines
+        )
+        self.assertIn(
+            'opendachs_stage_errors_total{stage="bar"} 0', lines
+        )
+        self.assertFalse(any("ticket=" in line for line in lines))
+        self.assertFalse(os.path.exists("{}.tmp".format(filename)))
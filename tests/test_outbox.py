@@ -0,0 +1,159 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: Outbound email queue test cases.
+"""
+
+# standard library imports
+import os
+import tempfile
+import unittest
+import configparser
+import email.mime.text
+
+# third party imports
+# library specific imports
+import src.outbox
+
+
+class SMTPPool(object):
+    """Pool of SMTP connections stand-in.
+
+    :ivar int failures: number of failing attempts left
+    :ivar list sent: sent emails
+    """
+
+    def __init__(self, failures=0):
+        """Initialize pool of SMTP connections stand-in.
+
+        :param int failures: number of failing attempts
+        """
+        self.failures = failures
+        self.sent = []
+
+    def sendmail(self, to_addrs, msg):
+        """Send email.
+
+        :param str to_addrs: email recipient
+        :param str msg: email message
+        """
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("failed to send email")
+        self.sent.append((to_addrs, msg))
+
+
+class TestOutbox(unittest.TestCase):
+    """Outbound email queue test cases.
+
+    :ivar Outbox outbox: outbound email queue
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        fp, self.database = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fp)
+        sqlite = configparser.ConfigParser()
+        sqlite.read_dict(
+            {
+                "SQLite": {"database": self.database, "table": "tickets"},
+                "outbox": {
+                    "table": "outbox", "max_attempts": "2", "backoff": "0"
+                }
+            }
+        )
+        self.outbox = src.outbox.Outbox(sqlite)
+        self.outbox.create_table()
+        self.msg = email.mime.text.MIMEText("foo")
+
+    def tearDown(self):
+        """Tear test cases down."""
+        os.unlink(self.database)
+
+    def test_send(self):
+        """Send queued emails.
+
+        Trying: 3 queued emails
+        Expecting: 3 emails sent and removed from queue
+        """
+        smtp_pool = SMTPPool()
+        for _ in range(3):
+            self.outbox.enqueue("foo@bar.com", self.msg)
+        sender = src.outbox.OutboxSender(
+            self.outbox, smtp_pool, poll_interval=0.01
+        )
+        sender.start()
+        sender.stop()
+        self.assertEqual(3, len(smtp_pool.sent))
+        self.assertEqual(0, self.outbox.count("queued"))
+
+    def test_retry(self):
+        """Send queued email.
+
+        Trying: first attempt fails
+        Expecting: email is sent with second attempt
+        """
+        smtp_pool = SMTPPool(failures=1)
+        self.outbox.enqueue("foo@bar.com", self.msg)
+        sender = src.outbox.OutboxSender(self.outbox, smtp_pool)
+        self.assertTrue(sender.send_next())
+        self.assertEqual(1, self.outbox.count("queued"))
+        self.assertTrue(sender.send_next())
+        self.assertEqual(1, len(smtp_pool.sent))
+        self.assertEqual(0, self.outbox.count("queued"))
+
+    def test_dead_letter(self):
+        """Send queued email.
+
+        Trying: max_attempts = 2, every attempt fails
+        Expecting: email is moved to dead letters after 2 attempts
+        """
+        smtp_pool = SMTPPool(failures=3)
+        self.outbox.enqueue("foo@bar.com", self.msg)
+        sender = src.outbox.OutboxSender(self.outbox, smtp_pool)
+        sender.send_next()
+        sender.send_next()
+        self.assertFalse(sender.send_next())
+        self.assertEqual(1, self.outbox.count("dead"))
+
+    def test_backoff(self):
+        """Get delay before next attempt.
+
+        Trying: backoff = 60, max_backoff = 3600
+        Expecting: delay is in [backoff*2**(n-1)/2, backoff*2**(n-1)] and
+        capped by max_backoff
+        """
+        self.outbox.backoff = 60.0
+        self.assertTrue(30.0 <= self.outbox.get_backoff(1) <= 60.0)
+        self.assertTrue(120.0 <= self.outbox.get_backoff(3) <= 240.0)
+        self.assertTrue(1800.0 <= self.outbox.get_backoff(20) <= 3600.0)
+
+    def test_requeue_claimed(self):
+        """Requeue claimed emails.
+
+        Trying: email claimed just now, claim older than lease timeout
+        Expecting: only abandoned claim is queued again
+        """
+        self.outbox.enqueue("foo@bar.com", self.msg)
+        self.outbox.claim()
+        self.assertEqual(1, self.outbox.count("sending"))
+        self.assertEqual(0, self.outbox.requeue_claimed())
+        self.assertEqual(1, self.outbox.count("sending"))
+        self.outbox.lease_timeout = 0
+        self.assertEqual(1, self.outbox.requeue_claimed())
+        self.assertEqual(1, self.outbox.count("queued"))
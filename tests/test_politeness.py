@@ -0,0 +1,164 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: Per-host politeness test cases.
+"""
+
+# standard library imports
+import time
+import threading
+import unittest
+import configparser
+import email.utils
+
+# third party imports
+import requests
+
+# library specific imports
+import src.politeness
+
+
+class TestHostLimiter(unittest.TestCase):
+    """Token bucket and connection limit test cases."""
+
+    def test_rate(self):
+        """Wait for tokens.
+
+        Trying: 20 requests per second, bursts of 2 requests, 6 requests
+        Expecting: 2 requests right away, 4 requests within 0.2 seconds
+        """
+        limiter = src.politeness.HostLimiter(rate=20, burst=2)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+            limiter.release()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+    def test_max_connections(self):
+        """Wait for connection.
+
+        Trying: one connection, second connection released after 0.2 s
+        Expecting: TimeoutError before release, connection after release
+        """
+        limiter = src.politeness.HostLimiter(max_connections=1)
+        limiter.acquire()
+        with self.assertRaises(TimeoutError):
+            limiter.acquire(deadline=time.monotonic() + 0.1)
+        timer = threading.Timer(0.2, limiter.release)
+        timer.start()
+        limiter.acquire(deadline=time.monotonic() + 5)
+        self.assertEqual(limiter.connections, 1)
+        timer.join()
+
+    def test_defer(self):
+        """Defer requests.
+
+        Trying: defer by 10 seconds, deadline in 1 second
+        Expecting: TimeoutError right away
+        """
+        limiter = src.politeness.HostLimiter()
+        limiter.defer(10)
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            limiter.acquire(deadline=time.monotonic() + 1)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+
+class TestPoliteness(unittest.TestCase):
+    """Per-host politeness test cases.
+
+    :ivar Politeness politeness: per-host politeness
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        config = configparser.ConfigParser()
+        config.read_dict(
+            {
+                "politeness": {"rate": "2", "max_retry_after": "60"},
+                "politeness:example.com": {"rate": "1"},
+                "politeness:www.example.com": {"max_connections": "1"}
+            }
+        )
+        self.politeness = src.politeness.Politeness(config)
+
+    def test_get_settings(self):
+        """Get settings of host.
+
+        Trying: hosts of configured domains and other host
+        Expecting: settings of most specific domain
+        """
+        settings = self.politeness.get_settings("www.example.com")
+        self.assertEqual(settings["rate"], "1")
+        self.assertEqual(settings["max_connections"], "1")
+        settings = self.politeness.get_settings("foo.example.com")
+        self.assertEqual(settings["rate"], "1")
+        self.assertEqual(settings["max_connections"], 0)
+        settings = self.politeness.get_settings("example.org")
+        self.assertEqual(settings["rate"], "2")
+        self.assertIs(
+            self.politeness.get_limiter("Example.org"),
+            self.politeness.get_limiter("example.org")
+        )
+
+    def test_defer(self):
+        """Defer requests to host.
+
+        Trying: 200, 429 without Retry-After, 503 with Retry-After and
+        429 with Retry-After above maximum
+        Expecting: None, default delay, delay and maximum delay
+        """
+        response = requests.Response()
+        response.status_code = 200
+        self.assertIsNone(self.politeness.defer("example.org", response))
+        response.status_code = 429
+        self.assertEqual(self.politeness.defer("example.org", response), 5)
+        response.status_code = 503
+        response.headers["Retry-After"] = "30"
+        self.assertEqual(self.politeness.defer("example.org", response), 30)
+        response.status_code = 429
+        response.headers["Retry-After"] = "3600"
+        self.assertEqual(self.politeness.defer("example.org", response), 60)
+        limiter = self.politeness.get_limiter("example.org")
+        self.assertGreater(limiter.not_before, time.monotonic() + 50)
+
+    def test_parse_retry_after(self):
+        """Parse Retry-After header field value.
+
+        Trying: seconds, HTTP date, invalid value
+        Expecting: delay in seconds, None for invalid value
+        """
+        self.assertEqual(src.politeness.parse_retry_after("120"), 120)
+        date = email.utils.formatdate(time.time() + 60, usegmt=True)
+        self.assertAlmostEqual(
+            src.politeness.parse_retry_after(date), 60, delta=2
+        )
+        self.assertIsNone(src.politeness.parse_retry_after("soon"))
+
+    def test_get_politeness(self):
+        """Get per-host politeness shared by Web scrapers.
+
+        Trying: same configuration twice
+        Expecting: same per-host politeness
+        """
+        config = configparser.ConfigParser()
+        config.read_dict({"politeness": {"rate": "3"}})
+        self.assertIs(
+            src.politeness.get_politeness(config),
+            src.politeness.get_politeness(config)
+        )
@@ -0,0 +1,171 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: Profiling test cases.
+"""
+
+# standard library imports
+import os
+import time
+import pstats
+import shutil
+import tempfile
+import unittest
+import threading
+
+# third party imports
+# library specific imports
+import src.metrics
+import src.profiling
+
+
+def busy(seconds):
+    """Keep CPU busy.
+
+    :param float seconds: seconds
+    """
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+    return
+
+
+def run():
+    """Simulate ticket management run with two tickets."""
+    busy(0.01)
+    for ticket in ["foo", "bar"]:
+        with src.metrics.span("submit", ticket=ticket):
+            with src.metrics.span("scrape"):
+                busy(0.05)
+    return
+
+
+def run_threaded():
+    """Simulate ticket management run with a ticket in a worker thread."""
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    return
+
+
+class TestProfiling(unittest.TestCase):
+    """Profiling test cases.
+
+    :ivar str tmpdir: temporary directory
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        self.tmpdir = tempfile.mkdtemp()
+        src.metrics.enable()
+
+    def tearDown(self):
+        """Tear test cases down."""
+        src.metrics.enable(False)
+        src.metrics.reset()
+        shutil.rmtree(self.tmpdir)
+
+    def test_get_profiler(self):
+        """Get profiler.
+
+        Trying: name = 'foo'
+        Expecting: ValueError
+        """
+        with self.assertRaises(ValueError):
+            src.profiling.get_profiler("foo")
+
+    def test_cprofile(self):
+        """Profile run deterministically.
+
+        Trying: run with two tickets
+        Expecting: pstats file of the run and of each ticket
+        """
+        profiler = src.profiling.get_profiler("cprofile")
+        profiler.start()
+        run()
+        profiler.stop()
+        profiler.dump(self.tmpdir)
+        self.assertEqual(
+            sorted(os.listdir(self.tmpdir)),
+            ["manage.pstats", "ticket_bar.pstats", "ticket_foo.pstats"]
+        )
+        functions = {
+            function for _, _, function in pstats.Stats(
+                os.path.join(self.tmpdir, "ticket_foo.pstats")
+            ).stats
+        }
+        self.assertIn("busy", functions)
+        self.assertNotIn("run", functions)
+
+    def test_sampling(self):
+        """Profile run statistically.
+
+        Trying: run with two tickets
+        Expecting: collapsed stacks rooted at ticket IDs
+        """
+        profiler = src.profiling.get_profiler("sampling", interval=0.001)
+        profiler.start()
+        run()
+        profiler.stop()
+        profiler.dump(self.tmpdir)
+        with open(os.path.join(self.tmpdir, "manage.collapsed")) as fp:
+            roots = {line.split(";", 1)[0] for line in fp}
+        self.assertTrue({"ticket foo", "ticket bar"} <= roots)
+
+    def test_cprofile_thread(self):
+        """Profile run in worker thread deterministically.
+
+        Trying: run with two tickets in worker thread
+        Expecting: pstats file of the run and of each ticket
+        """
+        profiler = src.profiling.get_profiler("cprofile")
+        profiler.start()
+        run_threaded()
+        profiler.stop()
+        profiler.dump(self.tmpdir)
+        self.assertEqual(
+            sorted(os.listdir(self.tmpdir)),
+            ["manage.pstats", "ticket_bar.pstats", "ticket_foo.pstats"]
+        )
+        functions = {
+            function for _, _, function in pstats.Stats(
+                os.path.join(self.tmpdir, "ticket_foo.pstats")
+            ).stats
+        }
+        self.assertIn("busy", functions)
+        functions = {
+            function for _, _, function in pstats.Stats(
+                os.path.join(self.tmpdir, "manage.pstats")
+            ).stats
+        }
+        self.assertIn("busy", functions)
+
+    def test_sampling_thread(self):
+        """Profile run in worker thread statistically.
+
+        Trying: run with two tickets in worker thread
+        Expecting: collapsed stacks rooted at ticket IDs
+        """
+        profiler = src.profiling.get_profiler("sampling", interval=0.001)
+        profiler.start()
+        run_threaded()
+        profiler.stop()
+        profiler.dump(self.tmpdir)
+        with open(os.path.join(self.tmpdir, "manage.collapsed")) as fp:
+            roots = {line.split(";", 1)[0] for line in fp}
+        self.assertTrue({"ticket foo", "ticket bar"} <= roots)
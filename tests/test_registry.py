@@ -0,0 +1,250 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: Capture registry test cases.
+"""
+
+# standard library imports
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+import configparser
+
+# third party imports
+# library specific imports
+import src.registry
+
+
+class TestNormalizeURL(unittest.TestCase):
+    """URL normalization test cases."""
+
+    def test_normalize_url(self):
+        """Normalize URL.
+
+        Trying: URLs differing in case of scheme and host name, default
+        port, fragment, empty path and order of query parameters
+        Expecting: same normalized URL, case of path and query is kept
+        """
+        self.assertEqual(
+            "https://example.org/",
+            src.registry.normalize_url("HTTPS://Example.ORG:443#top")
+        )
+        self.assertEqual(
+            "http://example.org:8080/Foo?a=1&b=2",
+            src.registry.normalize_url(
+                " http://user@example.org:8080/Foo?b=2&a=1#bar "
+            )
+        )
+        self.assertNotEqual(
+            src.registry.normalize_url("http://example.org/foo"),
+            src.registry.normalize_url("http://example.org/Foo")
+        )
+
+
+class TestCaptureRegistry(unittest.TestCase):
+    """Capture registry test cases.
+
+    :ivar str tmpdir: temporary directory
+    :ivar CaptureRegistry registry: capture registry of owner foo
+    :ivar CaptureRegistry other: capture registry of owner bar
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        self.tmpdir = tempfile.mkdtemp()
+        sqlite = configparser.ConfigParser()
+        sqlite.read_dict(
+            {
+                "SQLite": {
+                    "database": os.path.join(self.tmpdir, "db.sqlite"),
+                    "table": "tickets"
+                },
+                "captures": {
+                    "table": "captures", "freshness": "60",
+                    "timeout": "5", "interval": "0.05"
+                }
+            }
+        )
+        self.registry = src.registry.CaptureRegistry(sqlite, owner="foo")
+        self.registry.create_table()
+        self.other = src.registry.CaptureRegistry(sqlite, owner="bar")
+
+    def tearDown(self):
+        """Tear test cases down."""
+        shutil.rmtree(self.tmpdir)
+
+    def _get_archive(self, name):
+        """Get WARC archive path.
+
+        :param str name: name
+
+        :returns: WARC archive path
+        :rtype: str
+        """
+        return os.path.join(self.tmpdir, "{}.warc.gz".format(name))
+
+    def _write(self, archive):
+        """Write WARC archive.
+
+        :param str archive: WARC archive path
+        """
+        with open(archive, mode="wb") as fp:
+            fp.write(b"capture")
+        return
+
+    def test_claim(self):
+        """Claim URL.
+
+        Trying: claim URL captured by other owner, record capture
+        Expecting: URL is claimed once, again after capture
+        """
+        self.assertTrue(self.registry.claim("http://example.org"))
+        self.assertFalse(self.other.claim("http://Example.org/"))
+        self.assertEqual(
+            "capturing", self.other.get_status("http://example.org")
+        )
+        self._write(self._get_archive("foo"))
+        self.registry.record("http://example.org", self._get_archive("foo"))
+        self.assertEqual("done", self.other.get_status("http://example.org"))
+        self.assertTrue(self.other.claim("http://example.org"))
+
+    def test_claim_abandoned(self):
+        """Claim URL.
+
+        Trying: capture of crashed owner has timed out, release URL of
+        other owner
+        Expecting: URL is claimed, not released
+        """
+        self.registry.timeout = 0
+        self.other.claim("http://example.org")
+        self.assertTrue(self.registry.claim("http://example.org"))
+        self.other.release("http://example.org")
+        self.assertEqual(
+            "capturing", self.other.get_status("http://example.org")
+        )
+        self.registry.release("http://example.org")
+        self.assertIsNone(self.other.get_status("http://example.org"))
+
+    def test_reuse(self):
+        """Hardlink WARC archive of fresh capture.
+
+        Trying: fresh capture, stale capture, removed capture
+        Expecting: only fresh capture is reused
+        """
+        self._write(self._get_archive("foo"))
+        self.registry.record("http://example.org", self._get_archive("foo"))
+        self.assertTrue(
+            self.other.reuse("http://example.org", self._get_archive("bar"))
+        )
+        self.assertTrue(os.path.samefile(
+            self._get_archive("foo"), self._get_archive("bar")
+        ))
+        self.other.freshness = 0
+        self.assertFalse(
+            self.other.reuse("http://example.org", self._get_archive("baz"))
+        )
+        self.other.freshness = 60
+        os.unlink(self._get_archive("foo"))
+        self.assertFalse(
+            self.other.reuse("http://example.org", self._get_archive("baz"))
+        )
+        self.assertFalse(os.path.exists(self._get_archive("baz")))
+
+    def test_capture(self):
+        """Capture URL.
+
+        Trying: four threads capture the same URL concurrently
+        Expecting: URL is captured once, WARC archive is hardlinked
+        """
+        calls = []
+
+        def capture(archive):
+            calls.append(archive)
+            time.sleep(0.2)
+            self._write(archive)
+
+        threads = []
+        for index in range(4):
+            archive = self._get_archive(index)
+            thread = threading.Thread(
+                target=self.registry.capture,
+                args=(
+                    "http://example.org", archive,
+                    lambda archive=archive: capture(archive)
+                )
+            )
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(calls))
+        for index in range(4):
+            self.assertTrue(
+                os.path.samefile(calls[0], self._get_archive(index))
+            )
+
+    def test_capture_error(self):
+        """Capture URL.
+
+        Trying: capture fails
+        Expecting: URL is released and captured by the next submission
+        """
+        def fail():
+            raise RuntimeError("foo")
+
+        with self.assertRaises(RuntimeError):
+            self.registry.capture(
+                "http://example.org", self._get_archive("foo"), fail
+            )
+        self.assertIsNone(self.registry.get_status("http://example.org"))
+        self.assertTrue(
+            self.registry.capture(
+                "http://example.org", self._get_archive("foo"),
+                lambda: self._write(self._get_archive("foo"))
+            )
+        )
+
+    def test_capture_other(self):
+        """Capture URL.
+
+        Trying: other owner captures URL for 0.2 seconds, freshness window
+        of 0 seconds
+        Expecting: capture of other owner is waited for and reused
+        """
+        self.registry.freshness = 0
+        self.other.claim("http://example.org")
+
+        def record():
+            self._write(self._get_archive("bar"))
+            self.other.record("http://example.org", self._get_archive("bar"))
+
+        timer = threading.Timer(0.2, record)
+        timer.start()
+        self.assertFalse(
+            self.registry.capture(
+                "http://example.org", self._get_archive("foo"),
+                lambda: self.fail("URL captured twice")
+            )
+        )
+        timer.join()
+        self.assertTrue(os.path.samefile(
+            self._get_archive("foo"), self._get_archive("bar")
+        ))
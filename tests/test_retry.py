@@ -0,0 +1,129 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: Retry policy and circuit breaker test cases.
+"""
+
+# standard library imports
+import unittest
+import configparser
+
+# third party imports
+import requests
+
+# library specific imports
+import src.retry
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Retry policy test cases."""
+
+    def test_get_backoff(self):
+        """Get jittered exponential delay before next attempt.
+
+        Trying: backoff 1 second, maximum 4 seconds
+        Expecting: delay within [backoff/2, backoff], capped at maximum
+        """
+        retry_policy = src.retry.RetryPolicy(backoff=1.0, max_backoff=4.0)
+        for attempts, backoff in [(1, 1.0), (2, 2.0), (3, 4.0), (8, 4.0)]:
+            delay = retry_policy.get_backoff(attempts)
+            self.assertGreaterEqual(delay, backoff/2)
+            self.assertLessEqual(delay, backoff)
+
+    def test_is_transient(self):
+        """Check whether error is transient.
+
+        Trying: connection error, read timeout, transient HTTP error,
+        invalid URL, open circuit breaker
+        Expecting: only the first three are transient
+        """
+        retry_policy = src.retry.RetryPolicy()
+        for exception in [
+                requests.ConnectionError(),
+                requests.ReadTimeout(),
+                src.retry.TransientHTTPError()
+        ]:
+            self.assertTrue(retry_policy.is_transient(exception))
+        for exception in [
+                requests.exceptions.InvalidURL(),
+                src.retry.CircuitOpenError()
+        ]:
+            self.assertFalse(retry_policy.is_transient(exception))
+
+    def test_get_retry_policy(self):
+        """Get retry policy.
+
+        Trying: section retry of scraper configuration
+        Expecting: configured attempts
+        """
+        config = configparser.ConfigParser()
+        config.read_dict({"retry": {"attempts": "5"}})
+        retry_policy = src.retry.RetryPolicy.get_retry_policy(config)
+        self.assertEqual(retry_policy.attempts, 5)
+        self.assertEqual(retry_policy.backoff, 0.5)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Circuit breaker test cases.
+
+    :ivar CircuitBreaker breaker: circuit breaker
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        self.breaker = src.retry.CircuitBreaker(
+            "example.org", failures=2, reset_timeout=60
+        )
+
+    def test_open(self):
+        """Record failed requests.
+
+        Trying: two failures separated by a success, then two failures
+        Expecting: breaker opens after two consecutive failures only
+        """
+        self.breaker.failure()
+        self.breaker.success()
+        self.breaker.failure()
+        self.breaker.allow()
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, "open")
+        with self.assertRaises(src.retry.CircuitOpenError):
+            self.breaker.allow()
+
+    def test_half_open(self):
+        """Send trial request.
+
+        Trying: open breaker after reset timeout, failed and successful
+        trial request
+        Expecting: single trial request, breaker reopens on failure and
+        closes on success
+        """
+        self.breaker.failure()
+        self.breaker.failure()
+        self.breaker.opened -= 60
+        self.breaker.allow()
+        self.assertEqual(self.breaker.state, "half-open")
+        with self.assertRaises(src.retry.CircuitOpenError):
+            self.breaker.allow()
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, "open")
+        self.breaker.opened -= 60
+        self.breaker.allow()
+        self.breaker.success()
+        self.assertEqual(self.breaker.state, "closed")
+        self.breaker.allow()
@@ -0,0 +1,125 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: Ticket scheduler test cases.
+"""
+
+# standard library imports
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import configparser
+
+# third party imports
+# library specific imports
+import src.scheduler
+
+
+class TestOrder(unittest.TestCase):
+    """Ticket order test cases."""
+
+    def test_order(self):
+        """Order OpenDACHS tickets.
+
+        Trying: pending tickets of foo and bar, denied ticket of foo
+        Expecting: denied ticket first, pending tickets round-robin
+        """
+        datas = [
+            {"ticket": "1", "flag": "pending", "email": "foo@bar.com"},
+            {"ticket": "2", "flag": "pending", "email": "foo@bar.com"},
+            {"ticket": "3", "flag": "pending", "email": "foo@bar.com"},
+            {"ticket": "4", "flag": "pending", "email": "bar@foo.com"},
+            {"ticket": "5", "flag": "denied", "email": "foo@bar.com"},
+            {"ticket": "6", "flag": "pending", "email": "Bar@Foo.com"}
+        ]
+        self.assertEqual(
+            ["5", "1", "4", "2", "6", "3"],
+            [data["ticket"] for data in src.scheduler.order(datas)]
+        )
+
+
+class TestScheduler(unittest.TestCase):
+    """Ticket scheduler test cases.
+
+    :ivar str tmpdir: temporary directory
+    :ivar Scheduler scheduler: ticket scheduler
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.scheduler = src.scheduler.Scheduler(
+            spool=os.path.join(self.tmpdir, "spool")
+        )
+
+    def tearDown(self):
+        """Tear test cases down."""
+        shutil.rmtree(self.tmpdir)
+
+    def test_budget(self):
+        """Check whether time budget is exhausted.
+
+        Trying: no time budget and exhausted time budget
+        Expecting: False and True
+        """
+        self.scheduler.start()
+        self.assertFalse(self.scheduler.exhausted())
+        self.scheduler.budget = 1e-9
+        self.scheduler.start()
+        self.assertTrue(self.scheduler.exhausted())
+
+    def test_spool(self):
+        """Spool OpenDACHS tickets.
+
+        Trying: spool two tickets, discard spooled ticket files
+        Expecting: ticket files are spooled and discarded
+        """
+        self.assertEqual([], self.scheduler.get_spooled())
+        datas = [
+            {"ticket": "foo", "flag": "pending"},
+            {"ticket": "bar", "flag": "pending"}
+        ]
+        self.scheduler.write(datas)
+        filenames = self.scheduler.get_spooled()
+        self.assertEqual(2, len(filenames))
+        spooled = []
+        for filename in filenames:
+            with open(filename) as fp:
+                spooled.append(json.load(fp))
+        self.assertEqual(
+            sorted(datas, key=lambda data: data["ticket"]),
+            sorted(spooled, key=lambda data: data["ticket"])
+        )
+        self.scheduler.discard(filenames)
+        self.assertEqual([], self.scheduler.get_spooled())
+
+    def test_get_scheduler(self):
+        """Get ticket scheduler.
+
+        Trying: FTP configuration with and without section scheduler
+        Expecting: ticket scheduler with configured and default budget
+        """
+        ftp = configparser.ConfigParser()
+        ftp.read_dict({"FTP": {"host": ""}})
+        self.assertEqual(0, src.scheduler.Scheduler.get_scheduler(ftp).budget)
+        ftp.read_dict({"scheduler": {"budget": "3600", "spool": "foo"}})
+        scheduler = src.scheduler.Scheduler.get_scheduler(ftp)
+        self.assertEqual(3600, scheduler.budget)
+        self.assertEqual("foo", scheduler.spool)
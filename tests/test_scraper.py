@@ -20,15 +20,24 @@
 """
 
 # standard library imports
+import os
+import json
+import time
+import shutil
 import datetime
+import tempfile
 import unittest
+import configparser
+import http.server
 
 # third party imports
+import warcio.archiveiterator
 import requests
 
 # library specific imports
 import src.ticket
 import src.scraper
+import tests.server
 
 
 class TestScraper(unittest.TestCase):
@@ -317,4 +326,175 @@ class TestGetURLs(TestScraper):
         )
         self.scraper = src.scraper.Scraper(self.ticket, response=self.response)
         urls = [url for url in self.scraper.get_picture_tag_urls()]
-        self.assertEqual(["http://foo.jpg", "http://bar.jpg"], urls)
\ No newline at end of file
+        self.assertEqual(["http://foo.jpg", "http://bar.jpg"], urls)
+
+class HTTPRequestHandler(http.server.BaseHTTPRequestHandler):
+    """HTTP request handler serving a large, a stalled, a busy and a
+    flaky resource."""
+
+    def do_GET(self):
+        """Serve GET request."""
+        if self.path == "/stalled":
+            time.sleep(1.0)
+        if self.path == "/busy" and not getattr(self.server, "busy", False):
+            self.server.busy = True
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/flaky" and not getattr(self.server, "flaky", False):
+            self.server.flaky = True
+            self.send_response(502)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(1024*1024))
+        self.end_headers()
+        for _ in range(16):
+            self.wfile.write(os.urandom(64*1024))
+
+    def log_message(self, *args):
+        """Suppress logging."""
+        return
+
+
+class TestLimits(TestScraper):
+    """Capture limits test cases.
+
+    :ivar str tmpdir: temporary directory
+    :ivar HTTPServer server: HTTP server
+    :ivar ConfigParser config: scraper configuration
+    """
+
+    def setUp(self):
+        """Set capture limits test cases up."""
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.ticket.archive = os.path.join(self.tmpdir, "archive.warc")
+        self.server = tests.server.start(HTTPRequestHandler)
+        self.config = configparser.ConfigParser()
+        self.config["limits"] = {
+            "read_timeout": "0.5", "max_body_size": str(128*1024)
+        }
+
+    def tearDown(self):
+        """Tear capture limits test cases down."""
+        tests.server.stop(self.server)
+        shutil.rmtree(self.tmpdir)
+
+    def _archive(self, *paths):
+        """Archive <img> tags.
+
+        :param list paths: paths
+
+        :returns: WARC records (type, headers, payload size)
+        :rtype: list
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response._content = "".join(
+            "<img src='http://127.0.0.1:{port}{path}'>".format(
+                port=self.server.server_port, path=path
+            ) for path in paths
+        )
+        scraper = src.scraper.Scraper(
+            self.ticket, response=response, config=self.config
+        )
+        scraper.archive(tags=("img",))
+        records = []
+        with open(self.ticket.archive, mode="rb") as fp:
+            for record in warcio.archiveiterator.ArchiveIterator(fp):
+                records.append(
+                    (
+                        record.rec_type,
+                        record.rec_headers,
+                        len(record.content_stream().read())
+                    )
+                )
+        return records
+
+    def test_truncate(self):
+        """Archive oversized resource.
+
+        Trying: oversize = truncate
+        Expecting: truncated response record with WARC-Truncated header
+        """
+        records = self._archive("/large")
+        rec_type, rec_headers, size = records[0]
+        self.assertEqual(rec_type, "response")
+        self.assertEqual(rec_headers.get_header("WARC-Truncated"), "length")
+        self.assertLess(size, 1024*1024)
+
+    def test_skip(self):
+        """Archive oversized resource.
+
+        Trying: oversize = skip
+        Expecting: no response record, metadata record lists resource
+        """
+        self.config["limits"]["oversize"] = "skip"
+        records = self._archive("/large")
+        self.assertEqual(
+            [rec_type for rec_type, _, _ in records], ["metadata"]
+        )
+
+    def test_read_timeout(self):
+        """Archive stalled resource.
+
+        Trying: resource is sent after read timeout
+        Expecting: resource is listed as skipped, next resource is archived
+        """
+        self.config["limits"]["max_body_size"] = str(2*1024*1024)
+        records = self._archive("/stalled", "/large")
+        self.assertEqual(
+            [rec_type for rec_type, _, _ in records],
+            ["response", "request", "metadata"]
+        )
+
+    def test_retry_after(self):
+        """Archive busy resource.
+
+        Trying: first response is 429 with Retry-After: 1
+        Expecting: resource is archived after 1 second, 429 response is
+        dropped
+        """
+        self.config["limits"]["max_body_size"] = str(2*1024*1024)
+        start = time.monotonic()
+        records = self._archive("/busy")
+        self.assertGreaterEqual(time.monotonic() - start, 1.0)
+        self.assertEqual(
+            [rec_type for rec_type, _, _ in records], ["response", "request"]
+        )
+        self.assertEqual(records[0][2], 1024*1024)
+
+    def test_transient_error(self):
+        """Archive flaky resource.
+
+        Trying: first response is 502
+        Expecting: resource is archived, 502 response is dropped
+        """
+        self.config["limits"]["max_body_size"] = str(2*1024*1024)
+        self.config["retry"] = {"backoff": "0.01"}
+        records = self._archive("/flaky")
+        self.assertEqual(
+            [rec_type for rec_type, _, _ in records], ["response", "request"]
+        )
+        self.assertEqual(
+            records[0][1].get_header("WARC-Target-URI"),
+            "http://127.0.0.1:{}/flaky".format(self.server.server_port)
+        )
+
+    def test_error(self):
+        """Archive resource that cannot be fetched.
+
+        Trying: invalid URL
+        Expecting: capture is not aborted, metadata record lists resource
+        """
+        self.config["limits"]["max_body_size"] = str(2*1024*1024)
+        records = self._archive("/large", ":0/foo")
+        self.assertEqual(
+            [rec_type for rec_type, _, _ in records],
+            ["response", "request", "metadata"]
+        )
@@ -0,0 +1,155 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: SQLite interface test cases.
+"""
+
+# standard library imports
+import os
+import datetime
+import tempfile
+import unittest
+import configparser
+
+# third party imports
+# library specific imports
+import src.sqlite
+import src.ticket
+
+
+class TestSQLiteClient(unittest.TestCase):
+    """OpenDACHS database client test cases.
+
+    :ivar ConfigParser sqlite: SQLite configuration
+    :ivar list tickets: OpenDACHS tickets
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        fp, self.database = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fp)
+        self.sqlite = configparser.ConfigParser()
+        self.sqlite.read_dict(
+            {
+                "SQLite": {"database": self.database, "table": "tickets"},
+                "column_defs": {
+                    "ticket": "TEXT PRIMARY KEY",
+                    "user": "TEXT",
+                    "archive": "TEXT",
+                    "metadata": "TEXT",
+                    "flag": "TEXT",
+                    "timestamp": "TIMESTAMP"
+                }
+            }
+        )
+        self.tickets = [
+            src.ticket.Ticket(
+                id_,
+                src.ticket.User(
+                    "user" + id_, "archivist", "password", id_ + "@bar.com"
+                ),
+                "tmp/warcs/{}.warc".format(id_),
+                {
+                    "url": "http://{}.com".format(id_),
+                    "title": {"romanization": id_, "script": ""},
+                    "publicationDate": "20181113"
+                },
+                "pending",
+                datetime.datetime.now()
+            )
+            for id_ in ["foo", "bar"]
+        ]
+
+    def tearDown(self):
+        """Tear test cases down."""
+        os.unlink(self.database)
+
+    def _insert(self, normalized):
+        """Create table and insert OpenDACHS tickets.
+
+        :param bool normalized: toggle normalized table layout on/off
+
+        :returns: OpenDACHS database client
+        :rtype: SQLiteClient
+        """
+        if normalized:
+            self.sqlite["SQLite"]["schema"] = "normalized"
+        sqlite_client = src.sqlite.SQLiteClient(self.sqlite)
+        sqlite_client.create_table()
+        sqlite_client.insert(
+            [ticket.get_row(normalized=normalized) for ticket in self.tickets]
+        )
+        return sqlite_client
+
+    def test_normalized_select(self):
+        """Select row.
+
+        Trying: normalized table layout, email_addr = foo@bar.com
+        Expecting: corresponding OpenDACHS ticket
+        """
+        sqlite_client = self._insert(True)
+        row = sqlite_client.select_row("email_addr", ("foo@bar.com",))
+        ticket = src.ticket.Ticket.get_ticket(row, normalized=True)
+        self.assertEqual(self.tickets[0].user, ticket.user)
+        self.assertEqual(self.tickets[0].metadata, ticket.metadata)
+        self.assertEqual(self.tickets[0].timestamp, ticket.timestamp)
+
+    def test_normalized_indexes(self):
+        """Create table.
+
+        Trying: normalized table layout
+        Expecting: query by URL uses index
+        """
+        sqlite_client = self._insert(True)
+        connection = sqlite_client.connect()
+        plan = connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM tickets WHERE url = ?",
+            ("http://foo.com",)
+        ).fetchall()
+        connection.close()
+        self.assertIn("tickets_url", " ".join(str(tuple(row)) for row in plan))
+
+    def test_migrate(self):
+        """Create table.
+
+        Trying: existing table with blob layout, normalized table layout
+        Expecting: rows are migrated to normalized table layout
+        """
+        self._insert(False)
+        self.sqlite["SQLite"]["schema"] = "normalized"
+        sqlite_client = src.sqlite.SQLiteClient(self.sqlite)
+        sqlite_client.create_table()
+        rows = sqlite_client.select_rows()
+        self.assertEqual(2, len(rows))
+        for ticket, row in zip(self.tickets, rows):
+            migrated = src.ticket.Ticket.get_ticket(row, normalized=True)
+            self.assertEqual(ticket.id_, migrated.id_)
+            self.assertEqual(ticket.user, migrated.user)
+            self.assertEqual(ticket.metadata, migrated.metadata)
+        row = sqlite_client.select_row("url", ("http://bar.com",))
+        self.assertEqual("bar", row[0])
+
+    def test_unknown_schema(self):
+        """Initialize OpenDACHS database client.
+
+        Trying: schema = foo
+        Expecting: RuntimeError
+        """
+        self.sqlite["SQLite"]["schema"] = "foo"
+        with self.assertRaises(RuntimeError):
+            src.sqlite.SQLiteClient(self.sqlite)
@@ -0,0 +1,284 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: WARC archive storage test cases.
+"""
+
+# standard library imports
+import io
+import os
+import errno
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+# third party imports
+import warcio.warcwriter
+import warcio.statusandheaders
+import warcio.archiveiterator
+
+# library specific imports
+import src.storage
+
+
+class TestStorage(unittest.TestCase):
+    """WARC archive storage test cases.
+
+    :ivar str tmpdir: temporary directory
+    :ivar str source: source file path
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmpdir, "foo.warc")
+        with open(self.source, mode="wb") as fp:
+            fp.write(os.urandom(3*src.storage.CHUNK_SIZE+1))
+        self.checksum = src.storage._checksum(self.source)
+
+    def tearDown(self):
+        """Tear test cases down."""
+        shutil.rmtree(self.tmpdir)
+
+    def test_move_file(self):
+        """Move file.
+
+        Trying: source and destination on the same device
+        Expecting: file is renamed (same inode)
+        """
+        inode = os.stat(self.source).st_ino
+        destination = os.path.join(self.tmpdir, "bar.warc")
+        src.storage.move_file(self.source, destination)
+        self.assertFalse(os.path.exists(self.source))
+        self.assertEqual(inode, os.stat(destination).st_ino)
+
+    def test_move_file_cross_device(self):
+        """Move file.
+
+        Trying: source and destination on different devices (EXDEV)
+        Expecting: file is copied, verified and source removed
+        """
+        destination = os.path.join(self.tmpdir, "bar.warc")
+        exdev = OSError(errno.EXDEV, "Invalid cross-device link")
+        with unittest.mock.patch("os.replace", side_effect=[exdev, None]):
+            with unittest.mock.patch("os.unlink") as unlink:
+                src.storage.move_file(self.source, destination)
+        unlink.assert_called_once_with(self.source)
+        tmp = "{}.part".format(destination)
+        self.assertEqual(self.checksum, src.storage._checksum(tmp))
+
+    def test_copy_file(self):
+        """Copy file.
+
+        Trying: file larger than chunk size
+        Expecting: identical copy, no temporary file left
+        """
+        destination = os.path.join(self.tmpdir, "bar.warc")
+        src.storage.copy_file(self.source, destination)
+        self.assertEqual(self.checksum, src.storage._checksum(destination))
+        self.assertFalse(os.path.exists("{}.part".format(destination)))
+
+    def test_copy_file_checksum_mismatch(self):
+        """Copy file.
+
+        Trying: checksums of source and copy differ
+        Expecting: RuntimeError, no destination file
+        """
+        destination = os.path.join(self.tmpdir, "bar.warc")
+        with unittest.mock.patch(
+            "src.storage._checksum", side_effect=["foo", "bar"]
+        ):
+            with self.assertRaises(RuntimeError):
+                src.storage.copy_file(self.source, destination)
+        self.assertFalse(os.path.exists(destination))
+        self.assertFalse(os.path.exists("{}.part".format(destination)))
+
+    def test_link_tree(self):
+        """Hardlink directory tree.
+
+        Trying: directory with nested file
+        Expecting: hardlinked files (same inode), source is kept
+        """
+        source = os.path.join(self.tmpdir, "foo")
+        os.makedirs(os.path.join(source, "bar"))
+        shutil.move(self.source, os.path.join(source, "bar", "baz.warc"))
+        destination = os.path.join(self.tmpdir, "storage")
+        src.storage.link_tree(source, destination)
+        linked = os.path.join(destination, "bar", "baz.warc")
+        self.assertEqual(
+            os.stat(os.path.join(source, "bar", "baz.warc")).st_ino,
+            os.stat(linked).st_ino
+        )
+
+
+def write_warc(filename, url, payload):
+    """Write WARC archive with one response record.
+
+    :param str filename: filename
+    :param str url: URL
+    :param bytes payload: payload
+    """
+    with open(filename, mode="wb") as fp:
+        writer = warcio.warcwriter.WARCWriter(fp, gzip=False)
+        http_headers = warcio.statusandheaders.StatusAndHeaders(
+            "200 OK", [("Content-Type", "text/html; charset=utf-8")],
+            protocol="HTTP/1.1"
+        )
+        record = writer.create_warc_record(
+            url, "response", payload=io.BytesIO(payload),
+            http_headers=http_headers
+        )
+        writer.write_record(record)
+    return
+
+
+class FakeS3Client(object):
+    """In-memory S3 client stand-in.
+
+    :ivar dict objects: objects
+    """
+
+    class NotFound(Exception):
+        """Object not found."""
+
+        response = {"Error": {"Code": "404"}}
+
+    def __init__(self):
+        """Initialize in-memory S3 client stand-in."""
+        self.objects = {}
+
+    def upload_file(self, filename, bucket, key):
+        with open(filename, mode="rb") as fp:
+            self.objects[(bucket, key)] = fp.read()
+
+    def download_file(self, bucket, key, filename):
+        with open(filename, mode="wb") as fp:
+            fp.write(self.objects[(bucket, key)])
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.NotFound()
+        return {}
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = Body
+
+    def list_objects_v2(self, Bucket, Prefix, **kwargs):
+        return {
+            "Contents": [
+                {"Key": key} for bucket, key in self.objects
+                if bucket == Bucket and key.startswith(Prefix)
+            ]
+        }
+
+
+class TestWARCStore(unittest.TestCase):
+    """WARC archive store test cases.
+
+    :ivar str tmpdir: temporary directory
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Tear test cases down."""
+        shutil.rmtree(self.tmpdir)
+
+    def _store(self, warc_store):
+        """Store two WARC archives with identical payloads.
+
+        :param WARCStore warc_store: WARC archive store
+        """
+        for name in ["foo", "bar"]:
+            filename = os.path.join(self.tmpdir, "{}.warc".format(name))
+            write_warc(filename, "http://www.example.org/", b"<p>foo</p>")
+            warc_store.store(name, [filename])
+        return
+
+    def test_store(self):
+        """Store WARC archives.
+
+        Trying: two WARC archives with identical payloads
+        Expecting: compressed WARC archives, second payload is a revisit
+        """
+        root = os.path.join(self.tmpdir, "storage")
+        warc_store = src.storage.WARCStore(src.storage.LocalBackend(root))
+        self._store(warc_store)
+        rec_types = []
+        for name in ["foo", "bar"]:
+            filename = os.path.join(root, "warcs", "{}.warc.gz".format(name))
+            with open(filename, mode="rb") as fp:
+                self.assertEqual(fp.read(2), b"\x1f\x8b")
+                fp.seek(0)
+                rec_types.append([
+                    record.rec_type for record in
+                    warcio.archiveiterator.ArchiveIterator(fp)
+                ])
+        self.assertEqual(rec_types, [["response"], ["revisit"]])
+        self.assertEqual(
+            len(os.listdir(os.path.join(root, "digests", "sha1"))), 1
+        )
+
+    def test_lookup(self):
+        """Look URL up.
+
+        Trying: two stored WARC archives
+        Expecting: CDXJ entries with offsets of the records
+        """
+        root = os.path.join(self.tmpdir, "storage")
+        warc_store = src.storage.WARCStore(src.storage.LocalBackend(root))
+        self._store(warc_store)
+        entries = warc_store.lookup("http://example.org/")
+        self.assertEqual(
+            sorted(entry["mime"] for entry in entries),
+            ["text/html", "warc/revisit"]
+        )
+        for entry in entries:
+            filename = os.path.join(root, *entry["filename"].split("/"))
+            with open(filename, mode="rb") as fp:
+                fp.seek(int(entry["offset"]))
+                record = next(
+                    iter(warcio.archiveiterator.ArchiveIterator(fp))
+                )
+                self.assertEqual(
+                    record.rec_headers.get_header("WARC-Target-URI"),
+                    "http://www.example.org/"
+                )
+
+    def test_s3_backend(self):
+        """Store WARC archives.
+
+        Trying: S3-compatible storage backend
+        Expecting: WARC archives, digests and indexes are uploaded
+        """
+        client = FakeS3Client()
+        warc_store = src.storage.WARCStore(
+            src.storage.S3Backend("foo", prefix="bar/", client=client)
+        )
+        self._store(warc_store)
+        keys = sorted(key for _, key in client.objects)
+        self.assertEqual(len(keys), 5)
+        self.assertIn("bar/warcs/foo.warc.gz", keys)
+        self.assertIn("bar/indexes/bar.cdxj", keys)
+        self.assertEqual(len(warc_store.lookup("http://example.org/")), 2)
@@ -26,6 +26,7 @@ import json
 
 # third party imports
 # library specific imports
+import src.codec
 import src.ticket
 
 
@@ -52,9 +53,9 @@ class TestTicket(unittest.TestCase):
         """
         row = self.ticket.get_row()
         self.assertEqual(row[0], self.ticket.id_)
-        self.assertEqual(row[1], json.dumps(list(self.ticket.user)))
+        self.assertEqual(row[1], src.codec.dumps(list(self.ticket.user)))
         self.assertEqual(row[2], self.ticket.archive)
-        self.assertEqual(row[3], json.dumps(self.ticket.metadata))
+        self.assertEqual(row[3], src.codec.dumps(self.ticket.metadata))
         self.assertEqual(row[4], self.ticket.flag)
         self.assertEqual(row[5], self.ticket.timestamp)
 
@@ -88,4 +89,73 @@ class TestTicket(unittest.TestCase):
         self.assertEqual(python_obj["flag"], self.ticket.flag)
         self.assertEqual(
             python_obj["timestamp"], self.ticket.timestamp.isoformat()
-        )
\ No newline at end of file
+        )
+
+    def test_get_json_json_backend(self):
+        """Get JSON formatted string.
+
+        Trying: standard library JSON codec backend
+        Expecting: corresponding JSON formatted string
+        """
+        backend = src.codec.backend
+        src.codec.set_backend("json")
+        try:
+            self.ticket.metadata = {"foo": ["bar"]}
+            python_obj = json.loads(self.ticket.get_json())
+        finally:
+            src.codec.set_backend(backend)
+        self.assertEqual(python_obj["id"], self.ticket.id_)
+        self.assertEqual(python_obj["metadata"], {"foo": ["bar"]})
+
+    def test_metadata_json_cache(self):
+        """Get JSON serialization of metadata.
+
+        Trying: metadata is reassigned after serialization
+        Expecting: serialization of new metadata
+        """
+        self.assertEqual("{}", self.ticket.get_metadata_json())
+        self.ticket.metadata = {"foo": "bar"}
+        self.assertEqual(
+            {"foo": "bar"}, json.loads(self.ticket.get_metadata_json())
+        )
+
+    def test_get_ticket_metadata_json(self):
+        """Get OpenDACHS ticket based on SQLite row.
+
+        Trying: SQLite row
+        Expecting: serialized metadata of the row is reused
+        """
+        row = list(self.ticket.get_row())
+        row[3] = '{"foo":  "bar"}'
+        ticket = self.ticket.get_ticket(row)
+        self.assertEqual(row[3], ticket.get_metadata_json())
+
+    def test_slots(self):
+        """Initialize OpenDACHS ticket.
+
+        Trying: initialised OpenDACHS ticket (setUp method)
+        Expecting: no per-instance __dict__
+        """
+        self.assertFalse(hasattr(self.ticket, "__dict__"))
+        with self.assertRaises(AttributeError):
+            self.ticket.foo = "bar"
+
+    def test_get_ticket_normalized(self):
+        """Get OpenDACHS ticket based on normalized SQLite row.
+
+        Trying: output of get_row method (normalized = True)
+        Expecting: corresponding OpenDACHS ticket
+        """
+        self.ticket.metadata = {
+            "url": "http://foo.com",
+            "title": {"romanization": "foo", "script": ""}
+        }
+        row = self.ticket.get_row(normalized=True)
+        self.assertEqual(row[4], self.ticket.user.email_addr)
+        self.assertEqual(row[6], "http://foo.com")
+        self.assertEqual(row[7], "foo")
+        ticket = self.ticket.get_ticket(row, normalized=True)
+        self.assertEqual(self.ticket.user, ticket.user)
+        self.assertEqual(self.ticket.archive, ticket.archive)
+        self.assertEqual(self.ticket.metadata, ticket.metadata)
+        self.assertEqual(self.ticket.flag, ticket.flag)
\ No newline at end of file
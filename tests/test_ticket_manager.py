@@ -20,14 +20,29 @@
 """
 
 # standard library imports
+import os
+import json
+import shutil
 import unittest
+import unittest.mock
+import pstats
 import random
+import datetime
+import tempfile
 import configparser
 
 # third party imports
 import requests
 
 # library specific imports
+import src.email
+import src.lease
+import src.sqlite
+import src.ticket
+import src.metrics
+import src.profiling
+import src.workers
+import src.scheduler
 import src.ticket_manager
 
 
@@ -190,4 +205,368 @@ class TestGenerateTicket(TestTicketManager):
             }, ticket.metadata
         )
         self.assertEqual(data["flag"], ticket.flag)
-        self.assertTrue(hasattr(ticket, "timestamp"))
\ No newline at end of file
+        self.assertTrue(hasattr(ticket, "timestamp"))
+
+
+class TestDigest(TestTicketManager):
+    """Operator notification digest test cases.
+
+    :ivar list sent: sent email messages
+    """
+
+    def setUp(self):
+        """Set digest test cases up."""
+        super().setUp()
+        self.ticket_manager.digest = []
+        self.sent = []
+        self.ticket_manager._deliver = (
+            lambda to_addrs, email_msg: self.sent.append(email_msg)
+        )
+        src.email.set_environment(
+            src.email.create_environment(path="./../templates_sample")
+        )
+
+    def tearDown(self):
+        """Tear digest test cases down."""
+        src.email._environments.pop("templates", None)
+
+    def _get_ticket(self, id_):
+        """Get OpenDACHS ticket.
+
+        :param str id_: ticket ID
+
+        :returns: OpenDACHS ticket
+        :rtype: Ticket
+        """
+        user = src.ticket.User("username", "archivist", "password", "foo")
+        return src.ticket.Ticket(
+            id_, user, "archive", {"url": "http://foo.com"}, "confirmed",
+            datetime.datetime.now()
+        )
+
+    def test_collect(self):
+        """Send email.
+
+        Trying: 'confirmed' and 'error' notifications
+        Expecting: notifications are collected instead of sent
+        """
+        self.ticket_manager.sendmail(self._get_ticket("foo"), "confirmed")
+        self.ticket_manager.sendmail(self._get_ticket("bar"), "error")
+        self.assertEqual([], self.sent)
+        self.assertEqual(
+            ["foo", "bar"],
+            [entry["ticket"] for entry in self.ticket_manager.digest]
+        )
+
+    def test_send_digest(self):
+        """Send digest.
+
+        Trying: 2 'confirmed' and 1 'error' notification
+        Expecting: 1 email message with 2 attachments
+        """
+        for id_ in ["foo", "bar"]:
+            self.ticket_manager.sendmail(self._get_ticket(id_), "confirmed")
+        self.ticket_manager.sendmail(self._get_ticket("baz"), "error")
+        self.ticket_manager.send_digest()
+        self.assertEqual(1, len(self.sent))
+        parts = self.sent[0].get_payload()
+        self.assertEqual(3, len(parts))
+        self.assertIn("3 OpenDACHS request(s)", parts[0].get_payload())
+        self.assertEqual("info_foo.txt", parts[1].get_filename())
+        self.assertEqual([], self.ticket_manager.digest)
+
+    def test_send_empty_digest(self):
+        """Send digest.
+
+        Trying: no notifications
+        Expecting: no email message
+        """
+        self.ticket_manager.send_digest()
+        self.assertEqual([], self.sent)
+
+
+class TestBulkTransitions(TestTicketManager):
+    """Bulk state transition test cases.
+
+    :ivar str cwd: current working directory
+    :ivar str tmpdir: temporary working directory
+    """
+
+    def setUp(self):
+        """Set bulk state transition test cases up."""
+        super().setUp()
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+        os.makedirs("tmp/json_files")
+        os.makedirs("tmp/warcs")
+        self.ticket_manager.sqlite["SQLite"]["database"] = "tickets.sqlite"
+        sqlite_client = src.sqlite.SQLiteClient(self.ticket_manager.sqlite)
+        sqlite_client.create_table()
+        rows = []
+        for id_ in ["foo", "bar", "baz"]:
+            ticket = src.ticket.Ticket(
+                id_,
+                src.ticket.User(id_, "archivist", "password", "foo@bar.com"),
+                "tmp/warcs/{}.warc".format(id_),
+                {"url": "http://foo.com"},
+                "pending",
+                datetime.datetime.now()
+            )
+            with open(ticket.archive, mode="w") as fp:
+                fp.write(id_)
+            rows.append(ticket.get_row())
+        sqlite_client.insert(rows)
+
+    def tearDown(self):
+        """Tear bulk state transition test cases down."""
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def test_confirm_many(self):
+        """Confirm tickets.
+
+        Trying: tickets foo, bar and unknown ticket qux
+        Expecting: foo and bar confirmed, qux failed
+        """
+        datas = [
+            {"ticket": id_, "flag": "confirmed"}
+            for id_ in ["foo", "bar", "qux"]
+        ]
+        results = self.ticket_manager.confirm_many(datas)
+        self.assertEqual(
+            ["foo", "bar", None],
+            [result.ticket and result.ticket.id_ for result in results]
+        )
+        self.assertEqual("confirmed", results[0].ticket.flag)
+        self.assertIsInstance(results[2].exception, RuntimeError)
+        sqlite_client = src.sqlite.SQLiteClient(self.ticket_manager.sqlite)
+        rows = sqlite_client.select_rows("flag", ("confirmed",))
+        self.assertEqual(2, len(rows))
+
+    def test_confirm_unknown(self):
+        """Confirm ticket.
+
+        Trying: unknown ticket qux
+        Expecting: RuntimeError
+        """
+        with self.assertRaises(RuntimeError):
+            self.ticket_manager.confirm({"ticket": "qux", "flag": "confirmed"})
+
+    def test_deny_many(self):
+        """Deny tickets.
+
+        Trying: tickets foo and bar, WARC archive of bar is missing
+        Expecting: foo denied and deleted, bar failed and kept
+        """
+        os.unlink("tmp/warcs/bar.warc")
+        datas = [{"ticket": id_, "flag": "denied"} for id_ in ["foo", "bar"]]
+        results = self.ticket_manager.deny_many(datas)
+        self.assertEqual("deleted", results[0].ticket.flag)
+        self.assertIsNotNone(results[1].exception)
+        self.assertFalse(os.path.exists("tmp/warcs/foo.warc"))
+        sqlite_client = src.sqlite.SQLiteClient(self.ticket_manager.sqlite)
+        rows = sqlite_client.select_rows()
+        self.assertEqual(["bar", "baz"], sorted(row[0] for row in rows))
+
+    def test_accept_many(self):
+        """Accept tickets.
+
+        Trying: tickets foo and baz
+        Expecting: WARC archives moved to storage, tickets deleted
+        """
+        datas = [{"ticket": id_, "flag": "accepted"} for id_ in ["foo", "baz"]]
+        results = self.ticket_manager.accept_many(datas)
+        self.assertTrue(all(result.ticket for result in results))
+        for id_ in ["foo", "baz"]:
+            self.assertTrue(
+                os.path.exists("storage/{id}/{id}.warc".format(id=id_))
+            )
+            self.assertTrue(
+                os.path.exists("tmp/json_files/{id}.json".format(id=id_))
+            )
+        sqlite_client = src.sqlite.SQLiteClient(self.ticket_manager.sqlite)
+        self.assertEqual(
+            ["bar"], [row[0] for row in sqlite_client.select_rows()]
+        )
+
+    def test_manage(self):
+        """Manage OpenDACHS tickets.
+
+        Trying: ticket files confirming foo and denying bar
+        Expecting: foo confirmed, bar denied, users notified once per
+        ticket, Webrecorder API called by TicketManager.call_api
+        """
+        files = []
+        for id_, flag in [("foo", "confirmed"), ("bar", "denied")]:
+            filename = "{}.json".format(id_)
+            with open(filename, mode="w") as fp:
+                json.dump({"ticket": id_, "flag": flag}, fp)
+            files.append(filename)
+        sent = []
+        calls = []
+        self.ticket_manager.call_api = lambda: calls.append(None)
+        self.ticket_manager.sendmail = lambda ticket, name: sent.append(
+            (ticket.id_, name)
+        )
+        with unittest.mock.patch(
+                "src.ftp.retrieve_files", return_value=files
+        ):
+            self.ticket_manager.manage()
+        self.assertEqual(
+            [("foo", "confirmed"), ("bar", "denied")], sent
+        )
+        self.assertEqual(2, len(calls))
+        sqlite_client = src.sqlite.SQLiteClient(self.ticket_manager.sqlite)
+        self.assertEqual(
+            ["baz", "foo"],
+            sorted(row[0] for row in sqlite_client.select_rows())
+        )
+
+    def test_manage_profiled(self):
+        """Manage OpenDACHS tickets.
+
+        Trying: ticket files confirming foo and denying bar, deterministic
+        profiler
+        Expecting: stages run on the profiled thread, pstats file of the
+        run and of each ticket
+        """
+        files = []
+        for id_, flag in [("foo", "confirmed"), ("bar", "denied")]:
+            filename = "{}.json".format(id_)
+            with open(filename, mode="w") as fp:
+                json.dump({"ticket": id_, "flag": flag}, fp)
+            files.append(filename)
+        self.ticket_manager.call_api = lambda: None
+        self.ticket_manager.sendmail = lambda ticket, name: None
+        profiler = src.profiling.get_profiler("cprofile")
+        src.metrics.enable()
+        try:
+            profiler.start()
+            with unittest.mock.patch(
+                    "src.ftp.retrieve_files", return_value=files
+            ):
+                self.ticket_manager.manage()
+            profiler.stop()
+        finally:
+            src.metrics.enable(False)
+            src.metrics.reset()
+        self.assertEqual(
+            [], [
+                profile for (ticket, ident), profile
+                in profiler.profiles.items() if ident != profiler.ident
+            ]
+        )
+        profiler.dump("profile")
+        self.assertEqual(
+            ["manage.pstats", "ticket_bar.pstats", "ticket_foo.pstats"],
+            sorted(os.listdir("profile"))
+        )
+        functions = {
+            function for _, _, function in pstats.Stats(
+                os.path.join("profile", "manage.pstats")
+            ).stats
+        }
+        self.assertTrue({"claim_many", "confirm_many", "deny_many"} <= functions)
+
+    def test_manage_held(self):
+        """Manage OpenDACHS tickets.
+
+        Trying: ticket files confirming foo and bar, lease on bar is held
+        by another ticket manager
+        Expecting: foo confirmed, bar skipped without error notification
+        """
+        self.ticket_manager.sqlite.read_dict(
+            {"leases": {"table": "leases", "ttl": "60", "wait": "0"}}
+        )
+        self.ticket_manager.leases = src.lease.Leases(
+            self.ticket_manager.sqlite, owner="foo"
+        )
+        self.ticket_manager.leases.create_table()
+        other = src.lease.Leases(self.ticket_manager.sqlite, owner="bar")
+        other.claim("ticket:bar")
+        files = []
+        for id_ in ["foo", "bar"]:
+            filename = "{}.json".format(id_)
+            with open(filename, mode="w") as fp:
+                json.dump({"ticket": id_, "flag": "confirmed"}, fp)
+            files.append(filename)
+        sent = []
+        errors = []
+        self.ticket_manager.call_api = lambda: None
+        self.ticket_manager.sendmail = lambda ticket, name: sent.append(
+            (ticket.id_, name)
+        )
+        self.ticket_manager._send_error = lambda data: errors.append(data)
+        with unittest.mock.patch(
+                "src.ftp.retrieve_files", return_value=files
+        ):
+            self.ticket_manager.manage()
+        self.assertEqual([("foo", "confirmed")], sent)
+        self.assertEqual([], errors)
+        sqlite_client = src.sqlite.SQLiteClient(self.ticket_manager.sqlite)
+        rows = sqlite_client.select_rows("flag", ("confirmed",))
+        self.assertEqual(["foo"], [row[0] for row in rows])
+
+    def test_manage_spooled(self):
+        """Manage OpenDACHS tickets.
+
+        Trying: spooled pending ticket qux, run fails before submitting it,
+        then run succeeds
+        Expecting: spooled ticket file is kept, then discarded
+        """
+        self.ticket_manager.scheduler = src.scheduler.Scheduler(spool="spool")
+        self.ticket_manager.scheduler.write(
+            [{"ticket": "qux", "flag": "pending"}]
+        )
+        self.ticket_manager.call_api = lambda: None
+        self.ticket_manager.sendmail = lambda ticket, name: None
+        self.ticket_manager.submit = lambda data, ticket=None: (
+            src.ticket.Ticket(data["ticket"], *(5*(None, )))
+        )
+        with unittest.mock.patch("src.ftp.retrieve_files", return_value=[]):
+            with unittest.mock.patch.object(
+                    self.ticket_manager, "claim_many",
+                    side_effect=RuntimeError("foo")
+            ):
+                with self.assertRaises(RuntimeError):
+                    self.ticket_manager.manage()
+            self.assertEqual(
+                1, len(self.ticket_manager.scheduler.get_spooled())
+            )
+            self.ticket_manager.manage()
+        self.assertEqual([], self.ticket_manager.scheduler.get_spooled())
+
+    def test_manage_exhausted_pool(self):
+        """Manage OpenDACHS tickets.
+
+        Trying: ticket file submitting qux, worker processes, time budget
+        exhausted
+        Expecting: qux is spooled without being scraped or submitted
+        """
+        self.ticket_manager.scheduler = src.scheduler.Scheduler(
+            budget=1e-9, spool="spool"
+        )
+        self.ticket_manager.worker_pool = src.workers.WorkerPool(workers=1)
+        with open("qux.json", mode="w") as fp:
+            json.dump(
+                {
+                    "ticket": "qux", "email": "foo@bar.com",
+                    "url": "http://foo.com", "flag": "pending"
+                },
+                fp
+            )
+        submitted = []
+        self.ticket_manager.call_api = lambda: None
+        self.ticket_manager.submit = lambda data, ticket=None: (
+            submitted.append(data)
+        )
+        with unittest.mock.patch(
+                "src.ftp.retrieve_files", return_value=["qux.json"]
+        ):
+            self.ticket_manager.manage()
+        self.assertEqual([], submitted)
+        self.assertEqual(0, self.ticket_manager.worker_pool.spawned)
+        self.assertEqual(
+            1, len(self.ticket_manager.scheduler.get_spooled())
+        )
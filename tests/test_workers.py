@@ -0,0 +1,193 @@
+#    OpenDACHS 1.0
+#    Copyright (C) 2018  Carine Dengler, Heidelberg University
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+
+"""
+:synopsis: Process-pool scraping worker test cases.
+"""
+
+# standard library imports
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+import unittest.mock
+import configparser
+import http.server
+
+# third party imports
+# library specific imports
+import src.ticket
+import src.workers
+import tests.server
+
+
+class HTTPRequestHandler(http.server.BaseHTTPRequestHandler):
+    """HTTP request handler serving a page with one image."""
+
+    def do_GET(self):
+        """Serve GET request."""
+        if self.path.endswith(".html"):
+            body = "<img src='/foo.png'>".encode()
+        else:
+            body = b"\0" * 1024
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Suppress logging."""
+        return
+
+
+def scrape_or_die(ticket, config=None):
+    """Scrape OpenDACHS ticket, exit worker process for ticket 'bar'."""
+    if ticket.id_ == "bar":
+        os._exit(1)
+    return {"ticket": ticket.id_}
+
+
+class TestWorkerPool(unittest.TestCase):
+    """Process-pool scraping worker test cases.
+
+    :ivar str tmpdir: temporary directory
+    :ivar HTTPServer server: HTTP server
+    """
+
+    def setUp(self):
+        """Set test cases up."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.server = tests.server.start(HTTPRequestHandler)
+
+    def tearDown(self):
+        """Tear test cases down."""
+        tests.server.stop(self.server)
+        shutil.rmtree(self.tmpdir)
+
+    def _get_ticket(self, id_, path="/page.html"):
+        """Get OpenDACHS ticket.
+
+        :param str id_: ticket ID
+        :param str path: path
+
+        :returns: OpenDACHS ticket
+        :rtype: Ticket
+        """
+        return src.ticket.Ticket(
+            id_,
+            src.ticket.User("username", "role", "password", "email_addr"),
+            os.path.join(self.tmpdir, "{}.warc".format(id_)),
+            {"url": "http://127.0.0.1:{}{}".format(
+                self.server.server_port, path
+            )},
+            "pending",
+            datetime.datetime.now()
+        )
+
+    def test_map(self):
+        """Scrape tickets.
+
+        Trying: three tickets, two workers, recycled after each ticket
+        Expecting: result records in order, one worker per ticket
+        """
+        pool = src.workers.WorkerPool(workers=2, max_tickets=1)
+        tickets = [self._get_ticket(id_) for id_ in ["foo", "bar", "baz"]]
+        outcomes = pool.map(tickets)
+        self.assertEqual(
+            [outcome["ticket"] for outcome in outcomes], ["foo", "bar", "baz"]
+        )
+        for ticket, outcome in zip(tickets, outcomes):
+            self.assertEqual(outcome["size"], os.path.getsize(ticket.archive))
+        self.assertEqual(pool.spawned, 3)
+
+    def test_error(self):
+        """Scrape tickets.
+
+        Trying: URL of second ticket cannot be connected to
+        Expecting: RuntimeError for second ticket, others are scraped
+        """
+        pool = src.workers.WorkerPool(workers=1)
+        tickets = [
+            self._get_ticket("foo"),
+            self._get_ticket("bar"),
+            self._get_ticket("baz")
+        ]
+        tickets[1].metadata["url"] = "http://127.0.0.1:1/"
+        outcomes = pool.map(tickets)
+        self.assertIsInstance(outcomes[1], RuntimeError)
+        self.assertEqual(outcomes[2]["ticket"], "baz")
+        self.assertEqual(pool.spawned, 1)
+
+    def test_exhausted(self):
+        """Scrape tickets.
+
+        Trying: three tickets, one worker, time budget exhausted after
+        sending the first ticket
+        Expecting: result record of first ticket, others are not sent
+        """
+        pool = src.workers.WorkerPool(workers=1)
+        tickets = [self._get_ticket(id_) for id_ in ["foo", "bar", "baz"]]
+        checks = iter([False])
+        outcomes = pool.map(tickets, exhausted=lambda: next(checks, True))
+        self.assertEqual(outcomes[0]["ticket"], "foo")
+        self.assertEqual(outcomes[1:], [None, None])
+        self.assertFalse(os.path.exists(tickets[1].archive))
+
+    def test_worker_died(self):
+        """Scrape tickets.
+
+        Trying: worker process exits while scraping second ticket
+        Expecting: RuntimeError for second ticket, worker is replaced
+        """
+        pool = src.workers.WorkerPool(workers=1, max_tickets=0)
+        tickets = [self._get_ticket(id_) for id_ in ["foo", "bar", "baz"]]
+        with unittest.mock.patch("src.workers.scrape", scrape_or_die):
+            outcomes = pool.map(tickets)
+        self.assertEqual(outcomes[0], {"ticket": "foo"})
+        self.assertIsInstance(outcomes[1], RuntimeError)
+        self.assertEqual(outcomes[2], {"ticket": "baz"})
+        self.assertEqual(pool.spawned, 2)
+
+    def test_workers_died(self):
+        """Scrape tickets.
+
+        Trying: two workers, every worker process exits while scraping
+        Expecting: RuntimeError for every ticket, no worker waited for
+        """
+        pool = src.workers.WorkerPool(workers=2, max_tickets=0)
+        tickets = [self._get_ticket("bar") for _ in range(3)]
+        with unittest.mock.patch("src.workers.scrape", scrape_or_die):
+            outcomes = pool.map(tickets)
+        for outcome in outcomes:
+            self.assertIsInstance(outcome, RuntimeError)
+        self.assertEqual(pool.spawned, 3)
+
+    def test_get_worker_pool(self):
+        """Get pool of scraping worker processes.
+
+        Trying: mode = inline and mode = process
+        Expecting: None and WorkerPool
+        """
+        config = configparser.ConfigParser()
+        config.read_dict({"workers": {"mode": "inline"}})
+        self.assertIsNone(src.workers.WorkerPool.get_worker_pool(config))
+        config["workers"]["mode"] = "process"
+        config["workers"]["max_memory"] = "256"
+        pool = src.workers.WorkerPool.get_worker_pool(config)
+        self.assertEqual(pool.max_memory, 256 * 2**20)
+        self.assertEqual(pool.config, {"workers": dict(config["workers"])})